@@ -0,0 +1,90 @@
+"""Report the frequency error of the sample clock planner from 20 Hz to 20 MHz.
+
+Compares plan_sample_clock against the integer-divider layout that
+start_waveform_generation used before it. Run from the repository root:
+
+    python -m benchmarks.clock_accuracy
+"""
+
+import time
+
+from generation.clock import achieved_frequency, plan_sample_clock
+from generation.constants import SYSTEM_FREQUENCY
+
+MAX_SAMPLE_COUNT = 4096
+POINTS_PER_DECADE = 8
+LOWEST_FREQUENCY = 20
+HIGHEST_FREQUENCY = 20e6
+
+
+def legacy_plan(target_frequency, system_frequency, max_sample_count):
+    # The layout start_waveform_generation computed before plan_sample_clock
+    clock_division_factor = system_frequency / (target_frequency * max_sample_count)
+    if clock_division_factor < 1.0:
+        duplication_factor = int(1.0 / clock_division_factor)
+        sample_count = (
+            int(
+                (max_sample_count * clock_division_factor * duplication_factor + 0.5)
+                / 4
+            )
+            * 4
+        )
+        divider = 1
+    else:
+        divider = int(clock_division_factor) + 1
+        sample_count = (
+            int((max_sample_count * clock_division_factor / divider + 0.5) / 4) * 4
+        )
+        duplication_factor = 1
+    return sample_count, duplication_factor, min(divider, 65535), 0
+
+
+def frequencies():
+    frequency = LOWEST_FREQUENCY
+    step = 10 ** (1 / POINTS_PER_DECADE)
+    while frequency <= HIGHEST_FREQUENCY * 1.0001:
+        yield round(frequency, 3)
+        frequency *= step
+
+
+def error_ppm(target_frequency, plan):
+    achieved = achieved_frequency(SYSTEM_FREQUENCY, plan)
+    return abs(achieved - target_frequency) / target_frequency * 1e6
+
+
+def main():
+    print(
+        f"{'target Hz':>14}  {'legacy ppm':>11}{'samples':>8}"
+        f"  {'planned ppm':>11}{'samples':>8}{'divider':>12}"
+    )
+    legacy_errors = []
+    planned_errors = []
+    planning_time = 0.0
+    for target_frequency in frequencies():
+        legacy = legacy_plan(target_frequency, SYSTEM_FREQUENCY, MAX_SAMPLE_COUNT)
+        start = time.perf_counter()
+        planned = plan_sample_clock(
+            target_frequency, SYSTEM_FREQUENCY, MAX_SAMPLE_COUNT
+        )
+        planning_time = max(planning_time, time.perf_counter() - start)
+        legacy_errors.append(error_ppm(target_frequency, legacy))
+        planned_errors.append(error_ppm(target_frequency, planned))
+        print(
+            f"{target_frequency:>14,.1f}  {legacy_errors[-1]:>11.1f}{legacy[0]:>8}"
+            f"  {planned_errors[-1]:>11.3f}{planned[0]:>8}"
+            f"{planned[2] + planned[3] / 256:>12.4f}"
+        )
+
+    print(
+        f"worst error: legacy {max(legacy_errors):.1f} ppm,"
+        f" planned {max(planned_errors):.3f} ppm"
+    )
+    print(
+        f"mean error: legacy {sum(legacy_errors) / len(legacy_errors):.1f} ppm,"
+        f" planned {sum(planned_errors) / len(planned_errors):.3f} ppm"
+    )
+    print(f"slowest uncached plan: {planning_time * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+"""Compare two benchmarks.suite result files and flag regressions.
+
+A scenario regresses when it got slower than the baseline by more than the
+threshold, 10% unless given. Exits with 1 if any scenario regressed.
+
+With --normalize, every time is taken relative to the calibration scenario
+of its own run, which cancels a host that is faster or slower as a whole,
+such as a shared CI machine. From the repository root:
+
+    python -m benchmarks.compare baseline.json results.json [--threshold 0.1]
+"""
+
+import argparse
+import json
+import sys
+
+DEFAULT_THRESHOLD = 0.10
+CALIBRATION = "calibration/loop"
+
+
+def load(path):
+    with open(path) as file:
+        return json.load(file)
+
+
+def normalized(report):
+    """The report with every time divided by its calibration time."""
+    reference = report["results"][CALIBRATION]["us"]
+    results = {}
+    for name, result in report["results"].items():
+        if name != CALIBRATION:
+            results[name] = dict(result, us=result["us"] / reference)
+    return dict(report, results=results)
+
+
+def compare(baseline, current, threshold=DEFAULT_THRESHOLD):
+    """(name, baseline_us, current_us, change, status) for every scenario."""
+    rows = []
+    names = sorted(set(baseline["results"]) | set(current["results"]))
+    for name in names:
+        before = baseline["results"].get(name)
+        after = current["results"].get(name)
+        if before is None:
+            rows.append((name, None, after["us"], None, "new"))
+        elif after is None:
+            rows.append((name, before["us"], None, None, "missing"))
+        else:
+            change = after["us"] / before["us"] - 1 if before["us"] else 0.0
+            if change > threshold:
+                status = "REGRESSION"
+            elif change < -threshold:
+                status = "faster"
+            else:
+                status = ""
+            rows.append((name, before["us"], after["us"], change, status))
+    return rows
+
+
+def format_time(value):
+    return "-" if value is None else "{:.3g}".format(value)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("baseline")
+    parser.add_argument("current")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD)
+    parser.add_argument(
+        "--normalize",
+        action="store_true",
+        help="compare times relative to each run's calibration loop",
+    )
+    arguments = parser.parse_args()
+
+    baseline = load(arguments.baseline)
+    current = load(arguments.current)
+    unit = "us"
+    if arguments.normalize:
+        baseline = normalized(baseline)
+        current = normalized(current)
+        unit = "x cal"
+    if baseline["implementation"] != current["implementation"]:
+        print(
+            "warning: comparing {} against {}".format(
+                current["implementation"], baseline["implementation"]
+            )
+        )
+    if baseline["sample_count"] != current["sample_count"]:
+        print("warning: the render scenarios used different sample counts")
+
+    rows = compare(baseline, current, arguments.threshold)
+    print(
+        "{:<40} {:>12} {:>12} {:>8}".format(
+            "scenario", "baseline " + unit, "current " + unit, "change"
+        )
+    )
+    for name, before, after, change, status in rows:
+        print(
+            "{:<40} {:>12} {:>12} {:>8} {}".format(
+                name,
+                format_time(before),
+                format_time(after),
+                "-" if change is None else "{:+.1%}".format(change),
+                status,
+            )
+        )
+    regressions = [row[0] for row in rows if row[4] == "REGRESSION"]
+    print("{} regression(s) above {:.0%}".format(len(regressions), arguments.threshold))
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,116 @@
+"""Check the fixed-point render path against the float path on the host.
+
+Every waveform flagged WaveformEntries.FIXED_POINT is rendered both ways
+over a sweep of amplitudes, offsets and shape parameters. The float path
+reads the same float wavetable the generator would use otherwise, and no
+DAC code may differ from it by more than one LSB. The speedup of the
+fixed-point path is reported for each waveform.
+
+Run from the repository root:
+
+    python -m benchmarks.fixed_point_benchmark
+"""
+
+import time
+
+from generation.constants import ParamNames, WaveformEntries
+from generation.fixed import FixedTableBank
+from generation.render import SampleRenderer
+from generation.waveforms import WAVEFORMS, WaveformParams
+from generation.wavetable import WavetableBank
+
+SAMPLE_COUNTS = (4096, 1000)
+DUPLICATION_FACTORS = (1, 3)
+AMPLITUDES = [step / 10 for step in range(1, 51)]
+OFFSETS = (-1.0, -0.25, 0, 0.3, 1.0)
+DUTY_CYCLES = (1, 25, 50, 99)
+MAX_DIFFERENCE = 1
+REPEATS = 5
+
+
+def shape_variants(waveform):
+    if ParamNames.DUTY_CYCLE in waveform.get(WaveformEntries.WAVETABLE, ()):
+        return [{ParamNames.DUTY_CYCLE: duty_cycle} for duty_cycle in DUTY_CYCLES]
+    return [{}]
+
+
+def sweep(waveform, float_renderer, fixed_renderer):
+    """Largest code difference and the number of renders compared."""
+    largest = 0
+    renders = 0
+    for sample_count in SAMPLE_COUNTS:
+        expected = bytearray(sample_count)
+        actual = bytearray(sample_count)
+        for duplication_factor in DUPLICATION_FACTORS:
+            for shape in shape_variants(waveform):
+                for amplitude in AMPLITUDES:
+                    for offset in OFFSETS:
+                        parameters = dict(shape)
+                        parameters[ParamNames.AMPLITUDE] = amplitude
+                        parameters[ParamNames.OFFSET] = offset
+                        float_renderer.render(
+                            expected,
+                            waveform,
+                            parameters,
+                            sample_count,
+                            duplication_factor,
+                        )
+                        fixed_renderer.render(
+                            actual,
+                            waveform,
+                            parameters,
+                            sample_count,
+                            duplication_factor,
+                        )
+                        largest = max(
+                            largest, max(abs(a - b) for a, b in zip(expected, actual))
+                        )
+                        renders += 1
+    return largest, renders
+
+
+def best_time(renderer, buffer, waveform, parameters):
+    best = None
+    for _ in range(REPEATS):
+        renderer.invalidate()
+        start = time.perf_counter()
+        renderer.render(buffer, waveform, parameters, len(buffer), 1)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def main():
+    float_renderer = SampleRenderer(max(SAMPLE_COUNTS), wavetables=WavetableBank())
+    fixed_renderer = SampleRenderer(max(SAMPLE_COUNTS), fixed_tables=FixedTableBank())
+    buffer = bytearray(max(SAMPLE_COUNTS))
+    failures = 0
+
+    print(
+        f"{'waveform':<14}{'renders':>8}{'max diff':>9}"
+        f"{'float S/s':>14}{'fixed S/s':>14}{'speedup':>9}"
+    )
+    for waveform in WAVEFORMS:
+        if not waveform.get(WaveformEntries.FIXED_POINT):
+            continue
+        largest, renders = sweep(waveform, float_renderer, fixed_renderer)
+        parameters = {ParamNames.AMPLITUDE: WaveformParams.AMPLITUDE.default}
+        parameters.update(shape_variants(waveform)[0])
+        float_time = best_time(float_renderer, buffer, waveform, parameters)
+        fixed_time = best_time(fixed_renderer, buffer, waveform, parameters)
+        if largest > MAX_DIFFERENCE:
+            failures += 1
+        print(
+            f"{waveform[WaveformEntries.NAME]:<14}{renders:>8}{largest:>9}"
+            f"{len(buffer) / float_time:>14,.0f}{len(buffer) / fixed_time:>14,.0f}"
+            f"{float_time / fixed_time:>8.2f}x"
+        )
+
+    if failures:
+        raise SystemExit(
+            f"{failures} waveform(s) differ by more than {MAX_DIFFERENCE} LSB"
+        )
+
+
+if __name__ == "__main__":
+    main()
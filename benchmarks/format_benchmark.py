@@ -0,0 +1,134 @@
+"""Compare the string-building parameter formatter with LineFormatter.
+
+Formats the main screen parameter line of every waveform at several values
+and reports time per line, peak bytes allocated per line (tracemalloc), lines
+that differ from the old output and lines too long for the LCD. Run from
+the repository root:
+
+    python -m benchmarks.format_benchmark
+"""
+
+import time
+import tracemalloc
+
+from generation.constants import WaveformEntries
+from generation.waveforms import WAVEFORMS
+from utils.formatting import LineFormatter, format_params_line
+
+REPEATS = 2000
+# Steps applied to every parameter between the measured rounds
+ROUNDS = (0, 1, 25)
+
+
+def get_params_values_string(current_params):
+    # The formatter used before LineFormatter, without its debug print
+    return " ".join(
+        [
+            f"{param.short_name}{format_numeric_value(param.current_value, param.unit)}"
+            for param in current_params
+        ]
+    )
+
+
+def format_numeric_value(number_string, unit=None):
+    number = float(number_string)
+    if number % 1 == 0:
+        number = int(number)
+    else:
+        number = round(number, 1)
+
+    suffix = ""
+    if number >= 1_000_000:
+        number /= 1_000_000
+        suffix = "M"
+    elif number >= 1_000:
+        number /= 1_000
+        suffix = "K"
+
+    if isinstance(number, int) or number % 1 == 0:
+        formatted_number = f"{number}"
+    else:
+        formatted_number = f"{number:.1f}"
+
+    integer_part, _, decimal_part = formatted_number.partition(".")
+    integer_part_with_commas = "{:,}".format(int(integer_part))
+    if decimal_part:
+        formatted_number = f"{integer_part_with_commas}.{decimal_part}"
+    else:
+        formatted_number = integer_part_with_commas
+
+    if unit:
+        formatted_number += suffix
+        formatted_number += unit
+    return formatted_number
+
+
+def time_per_line(format_line):
+    start = time.perf_counter()
+    for _ in range(REPEATS):
+        format_line()
+    return (time.perf_counter() - start) / REPEATS
+
+
+def bytes_per_line(format_line):
+    format_line()  # the first call fills the caches
+    tracemalloc.start()
+    total = 0
+    for _ in range(REPEATS):
+        tracemalloc.reset_peak()
+        before, _ = tracemalloc.get_traced_memory()
+        format_line()
+        _, peak = tracemalloc.get_traced_memory()
+        total += peak - before
+    tracemalloc.stop()
+    return total / REPEATS
+
+
+def main():
+    formatter = LineFormatter()
+    old_total = new_total = 0.0
+    old_bytes = new_bytes = 0.0
+    lines = mismatches = too_long = 0
+    for steps in ROUNDS:
+        for waveform in WAVEFORMS:
+            params = waveform[WaveformEntries.PARAMS]
+            for param in params:
+                param.increase(press_duration=steps * param.check_interval)
+
+            def old_line():
+                return get_params_values_string(params)
+
+            def new_line():
+                return format_params_line(formatter, params)
+
+            old_text = old_line()
+            fits = new_line()
+            new_text = bytes(formatter.buffer).decode().rstrip()
+            if not fits:
+                too_long += 1
+            elif new_text != old_text:
+                mismatches += 1
+                print("differs: {!r} -> {!r}".format(old_text, new_text))
+            old_total += time_per_line(old_line)
+            new_total += time_per_line(new_line)
+            old_bytes += bytes_per_line(old_line)
+            new_bytes += bytes_per_line(new_line)
+            lines += 1
+
+    print("lines formatted:        {}".format(lines))
+    print("longer than 16 columns: {}".format(too_long))
+    print("differing lines:        {}".format(mismatches))
+    print(
+        "string formatter: {:6.2f} us/line, {:6.1f} bytes/line".format(
+            old_total / lines * 1e6, old_bytes / lines
+        )
+    )
+    print(
+        "LineFormatter:    {:6.2f} us/line, {:6.1f} bytes/line".format(
+            new_total / lines * 1e6, new_bytes / lines
+        )
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,167 @@
+"""Run every kernel chosen by generation.kernels against its Python version.
+
+Each kernel in kernels.KERNELS is run both ways on the same input, and the
+outputs must be identical: the same floats from the shape kernels and the
+same DAC codes from the quantize and fixed-point kernels. The speedup of
+the chosen variant is reported alongside.
+
+On a host the simulator is installed first, so the compiled kernels run as
+plain Python with its pointer casts: the outputs are checked, but the
+speedups mean nothing. If no compiled kernel was chosen, as on firmware
+without the code emitters, there is nothing to compare and the check fails.
+On the board, copy generation/ and benchmarks/ to it and run
+`import benchmarks.kernel_conformance as k; k.main()`. On a host:
+
+    python -m benchmarks.kernel_conformance
+"""
+
+import sys
+
+# Imported before the simulator, so timings on a host use the host clock
+from utils.ticks import ticks_diff, ticks_us
+
+if sys.implementation.name != "micropython":
+    import simulator
+
+    simulator.install()
+
+from generation import kernels  # noqa: E402
+from generation.constants import (  # noqa: E402
+    ParamNames,
+    WaveformEntries,
+    WaveformNames,
+)
+from generation.fixed import FixedTableBank  # noqa: E402
+from generation.functions import sine_buffer  # noqa: E402
+from generation.render import float_buffer  # noqa: E402
+from generation.waveforms import WAVEFORMS  # noqa: E402
+from generation.wavetable import PHASE_MASK  # noqa: E402
+
+SAMPLE_COUNT = 1024
+REPEATS = 3
+SHAPE_PARAMS = {ParamNames.DUTY_CYCLE: 37}
+AMPLITUDES = (0.1, 0.5, 1.3, 5.0)
+OFFSETS = (-1.0, 0, 0.3)
+# Renders split into chunks at these sample indices, as SampleRenderer does
+CHUNK_STARTS = (0, 256, 700)
+FIXED_WAVEFORMS = (WaveformNames.SINE, WaveformNames.SQUARE)
+# Shared so each table is built once, not in every timed run
+FIXED_TABLES = FixedTableBank()
+
+
+def positions():
+    """Sample positions over one period, plus a few outside it."""
+    values = float_buffer(SAMPLE_COUNT)
+    for index in range(SAMPLE_COUNT):
+        values[index] = (index + 0.5) / SAMPLE_COUNT
+    values[0] = -0.3
+    values[1] = 1.7
+    return values
+
+
+def shape_case(kernel):
+    values = positions()
+    kernel(values, 0, SAMPLE_COUNT, SHAPE_PARAMS)
+    return [list(values)]
+
+
+def quantize_case(kernel):
+    shape = positions()
+    sine_buffer(shape, 0, SAMPLE_COUNT, SHAPE_PARAMS)
+    buffer = bytearray(SAMPLE_COUNT)
+    outputs = []
+    for amplitude in AMPLITUDES:
+        for offset in OFFSETS:
+            kernel(buffer, shape, 0, SAMPLE_COUNT, amplitude, offset)
+            outputs.append(bytes(buffer))
+    return outputs
+
+
+def fill_codes_case(kernel):
+    bank = FIXED_TABLES
+    buffer = bytearray(SAMPLE_COUNT)
+    outputs = []
+    for waveform in WAVEFORMS:
+        if waveform[WaveformEntries.NAME] not in FIXED_WAVEFORMS:
+            continue
+        for amplitude in AMPLITUDES:
+            for offset in OFFSETS:
+                parameters = dict(SHAPE_PARAMS)
+                parameters[ParamNames.AMPLITUDE] = amplitude
+                parameters[ParamNames.OFFSET] = offset
+                table, phase, increment, gain, bias = bank.plan(
+                    waveform, parameters, SAMPLE_COUNT, 3
+                )
+                settings = bank.settings
+                bounds = CHUNK_STARTS + (SAMPLE_COUNT,)
+                for chunk in range(len(CHUNK_STARTS)):
+                    start = bounds[chunk]
+                    settings[0] = start
+                    settings[1] = bounds[chunk + 1]
+                    settings[2] = (phase + start * increment) & PHASE_MASK
+                    settings[3] = increment
+                    settings[4] = gain
+                    settings[5] = bias
+                    kernel(buffer, table, settings)
+                outputs.append(bytes(buffer))
+    return outputs
+
+
+CASES = {
+    "sine_buffer": shape_case,
+    "square_buffer": shape_case,
+    "triangle_buffer": shape_case,
+    "sawtooth_buffer": shape_case,
+    "quantize_plain": quantize_case,
+    "fill_codes": fill_codes_case,
+}
+
+
+def best_time(case, kernel):
+    best = None
+    for _ in range(REPEATS):
+        start = ticks_us()
+        case(kernel)
+        elapsed = ticks_diff(ticks_us(), start)
+        best = elapsed if best is None or elapsed < best else best
+    return best
+
+
+def main():
+    failures = 0
+    compared = 0
+    print("compiled kernels:", "yes" if kernels.COMPILED else "no, Python only")
+    print(
+        "{:<18} {:<10} {:>10} {:>10} {:>8}".format(
+            "kernel", "result", "python us", "chosen us", "speedup"
+        )
+    )
+    for name, python_function, chosen in kernels.KERNELS:
+        case = CASES.get(name)
+        if case is None:
+            print("{:<18} {:<10}".format(name, "NO CASE"))
+            failures += 1
+            continue
+        if chosen is not python_function:
+            compared += 1
+        if case(python_function) == case(chosen):
+            result = "identical"
+        else:
+            result = "DIFFERENT"
+            failures += 1
+        python_us = best_time(case, python_function)
+        chosen_us = best_time(case, chosen)
+        print(
+            "{:<18} {:<10} {:>10} {:>10} {:>7.2f}x".format(
+                name, result, python_us, chosen_us, python_us / max(chosen_us, 1)
+            )
+        )
+    if failures:
+        print("{} kernel(s) failed".format(failures))
+    if not compared:
+        print("no compiled kernel was compared")
+    return 1 if failures or not compared else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
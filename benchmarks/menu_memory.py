@@ -0,0 +1,95 @@
+"""Measure the heap held by the menu model with tracemalloc.
+
+Builds the settings and pages of the menu once with plain __dict__ classes,
+as they were before, and once with the slot-based WaveformControl and Page.
+Run from the repository root:
+
+    python -m benchmarks.menu_memory
+"""
+
+import tracemalloc
+
+from control.menu import Page
+from control.signal import WaveformControl
+from generation.waveforms import WAVEFORMS, WaveformParams
+
+
+class DictControl:
+    def __init__(
+        self,
+        name,
+        short_name,
+        min=0.0,
+        default=0.0,
+        max=0.0,
+        step=0.0,
+        unit="",
+        options=None,
+        dynamic_step=False,
+        check_interval=300,
+    ):
+        self.name = name
+        self.short_name = short_name
+        self.min = min
+        self.default = default
+        self.max = max
+        self.step = step
+        self.unit = unit
+        self.options = options if options else []
+        self.current_value = options[0] if options else default if default else min
+        self.dynamic_step = dynamic_step
+        self.check_interval = check_interval
+        self.version = 0
+
+
+class DictPage:
+    def __init__(self, name, setting):
+        self.name = name
+        self.setting = setting
+
+
+SPECS = [
+    param.spec
+    for param in WaveformParams.__dict__.values()
+    if isinstance(param, WaveformControl)
+] + [
+    WaveformControl(
+        "Waveform",
+        short_name="Wf",
+        options=[waveform["name"] for waveform in WAVEFORMS],
+    ).spec
+]
+
+
+def build_model(control_class, page_class):
+    # The specs already exist in both cases, so only the instances are counted
+    controls = [control_class(*spec) for spec in SPECS]
+    pages = [page_class("Main", None)]
+    pages += [page_class(control.name, control) for control in controls]
+    return controls, pages
+
+
+def measure(control_class, page_class):
+    tracemalloc.start()
+    model = build_model(control_class, page_class)
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del model
+    return size
+
+
+def main():
+    before = measure(DictControl, DictPage)
+    after = measure(WaveformControl, Page)
+    print("settings: {}, pages: {}".format(len(SPECS), len(SPECS) + 1))
+    print("__dict__ model: {:>6} bytes".format(before))
+    print("slots model:    {:>6} bytes".format(after))
+    print(
+        "saved:          {:>6} bytes ({:.0%})".format(
+            before - after, 1 - after / before
+        )
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""Time menu navigation as the number of waveforms grows.
+
+Compares the scanning Menu that rebuilt its page list on every page change
+with the indexed Menu. Run from the repository root:
+
+    python -m benchmarks.menu_navigation
+"""
+
+import time
+
+from control.menu import Menu, Page
+from control.signal import WaveformControl
+from generation.constants import WaveformEntries
+from generation.waveforms import WAVEFORMS, WaveformParams
+
+WAVEFORM_COUNTS = (len(WAVEFORMS), 32, 128, 512)
+STEPS = 20000
+
+
+class ScanningMenu(Menu):
+    # The lookups Menu used before the index
+    def get_current_waveform(self):
+        for page in self.default_pages:
+            if page.name == "Waveform":
+                waveform = self.default_waveform
+                for waveform in self.waveforms:
+                    if waveform["name"] == page.setting.current_value:
+                        break
+                return waveform
+        return self.default_waveform
+
+    def update_pages_list(self):
+        self.current_waveform = self.get_current_waveform()
+        self.current_params = self.current_waveform["params"]
+        signal_params_names = [param.name for param in self.current_waveform["params"]]
+        params_pages = [
+            page for page in self.optional_pages if page.name in signal_params_names
+        ]
+        self.active_pages = self.default_pages + params_pages
+
+
+def build_menu(menu_class, waveform_count):
+    waveforms = []
+    for index in range(waveform_count):
+        waveform = dict(WAVEFORMS[index % len(WAVEFORMS)])
+        waveform[WaveformEntries.NAME] = "{} {}".format(waveform["name"], index)
+        waveforms.append(waveform)
+    waveform_setting = WaveformControl(
+        "Waveform",
+        short_name="Wf",
+        options=[waveform[WaveformEntries.NAME] for waveform in waveforms],
+    )
+    # The last waveform is the worst case for the scan
+    waveform_setting.current_value = waveform_setting.options[-1]
+    default_pages = [Page("Main", setting=None), Page("Waveform", waveform_setting)]
+    optional_pages = [
+        Page(param.name, setting=param)
+        for param in WaveformParams.__dict__.values()
+        if isinstance(param, WaveformControl)
+    ]
+    return menu_class(default_pages, optional_pages, waveforms)
+
+
+def time_navigation(menu):
+    start = time.perf_counter()
+    for _ in range(STEPS):
+        menu.go_to_next_page()
+    return (time.perf_counter() - start) / STEPS
+
+
+def main():
+    print(
+        "{:>9} {:>12} {:>12} {:>8}".format(
+            "waveforms", "scan us", "index us", "speedup"
+        )
+    )
+    for waveform_count in WAVEFORM_COUNTS:
+        scanning = time_navigation(build_menu(ScanningMenu, waveform_count))
+        indexed = time_navigation(build_menu(Menu, waveform_count))
+        print(
+            "{:>9} {:>12.2f} {:>12.2f} {:>7.1f}x".format(
+                waveform_count, scanning * 1e6, indexed * 1e6, scanning / indexed
+            )
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+"""Time the noise generators and check the color of their spectrum on the host.
+
+White noise should have a flat spectrum and pink noise should fall by about
+3 dB per octave. Run from the repository root:
+
+    python -m benchmarks.noise_benchmark
+"""
+
+import cmath
+import time
+from math import log10
+
+from generation.constants import ParamNames
+from generation.functions import white_noise
+from generation.noise import GAUSSIAN_QUALITY, NoiseSource
+from generation.render import float_buffer
+
+SAMPLE_COUNT = 4096
+QUALITIES = (1, 2, GAUSSIAN_QUALITY)
+SEGMENT_SIZE = 1024
+SEGMENT_COUNT = 32
+# (name, expected slope in dB/octave, tolerance)
+EXPECTED_SLOPES = (("white", 0.0, 0.5), ("pink", -3.01, 0.5))
+
+
+def fft(values):
+    size = len(values)
+    if size == 1:
+        return list(values)
+    even = fft(values[0::2])
+    odd = fft(values[1::2])
+    result = [0] * size
+    for index in range(size // 2):
+        twiddle = cmath.exp(-2j * cmath.pi * index / size) * odd[index]
+        result[index] = even[index] + twiddle
+        result[index + size // 2] = even[index] - twiddle
+    return result
+
+
+def spectral_slope(fill):
+    # Average periodograms over segments, then fit power per octave band
+    power = [0.0] * (SEGMENT_SIZE // 2)
+    segment = float_buffer(SEGMENT_SIZE)
+    for _ in range(SEGMENT_COUNT):
+        fill(segment, 0, SEGMENT_SIZE)
+        spectrum = fft(list(segment))
+        for index in range(1, SEGMENT_SIZE // 2):
+            power[index] += abs(spectrum[index]) ** 2
+
+    octaves = []
+    band_start = 2
+    while band_start * 2 <= SEGMENT_SIZE // 2:
+        band = power[band_start : band_start * 2]
+        octaves.append(10 * log10(sum(band) / len(band)))
+        band_start *= 2
+
+    count = len(octaves)
+    mean_x = (count - 1) / 2
+    mean_y = sum(octaves) / count
+    covariance = sum(
+        (index - mean_x) * (octaves[index] - mean_y) for index in range(count)
+    )
+    variance = sum((index - mean_x) ** 2 for index in range(count))
+    return covariance / variance
+
+
+def samples_per_second(fill):
+    values = float_buffer(SAMPLE_COUNT)
+    start = time.perf_counter()
+    fill(values, 0, SAMPLE_COUNT)
+    return SAMPLE_COUNT / (time.perf_counter() - start)
+
+
+def main():
+    source = NoiseSource()
+
+    print(f"{'generator':<22}{'S/s':>14}")
+    for quality in QUALITIES:
+        parameters = {ParamNames.QUALITY: quality}
+
+        def per_sample(values, start, stop):
+            for index in range(start, stop):
+                values[index] = white_noise(0.0, parameters)
+
+        def engine(values, start, stop):
+            source.white(values, start, stop, quality)
+
+        print(f"{f'random() Q={quality}':<22}{samples_per_second(per_sample):>14,.0f}")
+        print(f"{f'xorshift Q={quality}':<22}{samples_per_second(engine):>14,.0f}")
+    print(f"{'xorshift pink':<22}{samples_per_second(source.pink):>14,.0f}")
+
+    failures = 0
+    generators = {
+        "white": lambda values, start, stop: source.white(
+            values, start, stop, GAUSSIAN_QUALITY
+        ),
+        "pink": source.pink,
+    }
+    for name, expected, tolerance in EXPECTED_SLOPES:
+        slope = spectral_slope(generators[name])
+        passed = abs(slope - expected) <= tolerance
+        failures += not passed
+        print(
+            f"{name} slope: {slope:+.2f} dB/octave"
+            f" (expected {expected:+.2f} +/- {tolerance}) {'ok' if passed else 'FAIL'}"
+        )
+
+    if failures:
+        raise SystemExit(f"{failures} noise color check(s) failed")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+"""Compare the per-sample render loop against SampleRenderer on the host.
+
+The batch renderer must match the per-sample loop byte for byte, except for
+the noise shapes, which draw from a different generator. Wavetable rendering
+is reported separately with its largest deviation in DAC codes.
+
+Run from the repository root:
+
+    python -m benchmarks.render_benchmark
+"""
+
+import random
+import time
+
+from generation.constants import WaveformEntries, WaveformNames
+from generation.render import (
+    FRACTIONAL_ROUNDING_OFFSET,
+    MAX_VALUE,
+    MIN_VALUE,
+    RESOLUTION,
+    SampleRenderer,
+    evaluate_waveform,
+)
+from generation.waveforms import WAVEFORMS
+from generation.wavetable import WavetableBank
+
+SAMPLE_COUNT = 4096
+DUPLICATION_FACTORS = (1, 3)
+REPEATS = 3
+SEED = 1234
+RANDOM_WAVEFORMS = (WaveformNames.WHITE_NOISE, WaveformNames.PINK_NOISE)
+
+
+def render_per_sample(buffer, waveform, parameters, sample_count, duplication_factor):
+    # The fill loop start_waveform_generation used before the batch renderer
+    for sample_index in range(sample_count):
+        normalized_sample_position = (
+            duplication_factor
+            * (sample_index + FRACTIONAL_ROUNDING_OFFSET)
+            / sample_count
+        )
+        sample_value = evaluate_waveform(
+            waveform, parameters, normalized_sample_position
+        )
+        sample_scaled = int(RESOLUTION * sample_value)
+        sample_clamped = max(MIN_VALUE, min(MAX_VALUE, sample_scaled))
+        buffer[sample_index] = sample_clamped
+
+
+def best_time(render, buffer, waveform, parameters, duplication_factor, renderer=None):
+    best = None
+    for _ in range(REPEATS):
+        random.seed(SEED)
+        if renderer is not None:
+            renderer.invalidate()
+        start = time.perf_counter()
+        render(buffer, waveform, parameters, SAMPLE_COUNT, duplication_factor)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def main():
+    renderer = SampleRenderer(SAMPLE_COUNT)
+    table_renderer = SampleRenderer(SAMPLE_COUNT, wavetables=WavetableBank())
+    reference = bytearray(SAMPLE_COUNT)
+    batch = bytearray(SAMPLE_COUNT)
+    table = bytearray(SAMPLE_COUNT)
+    mismatches = 0
+
+    print(
+        f"{'waveform':<14}{'dup':>4}{'per-sample S/s':>16}{'batch S/s':>14}"
+        f"{'speedup':>9}  {'bytes':<10}{'table S/s':>14}{'max diff':>9}"
+    )
+    for waveform in WAVEFORMS:
+        parameters = {
+            param.name: param.current_value
+            for param in waveform[WaveformEntries.PARAMS]
+        }
+        for duplication_factor in DUPLICATION_FACTORS:
+            reference_time = best_time(
+                render_per_sample, reference, waveform, parameters, duplication_factor
+            )
+            batch_time = best_time(
+                renderer.render,
+                batch,
+                waveform,
+                parameters,
+                duplication_factor,
+                renderer,
+            )
+            if waveform[WaveformEntries.NAME] in RANDOM_WAVEFORMS:
+                comparison = "random"
+            elif reference == batch:
+                comparison = "identical"
+            else:
+                comparison = "DIFFERENT"
+                mismatches += 1
+            table_columns = ""
+            if WaveformEntries.WAVETABLE in waveform:
+                table_time = best_time(
+                    table_renderer.render,
+                    table,
+                    waveform,
+                    parameters,
+                    duplication_factor,
+                )
+                max_difference = max(abs(a - b) for a, b in zip(reference, table))
+                table_columns = (
+                    f"{SAMPLE_COUNT / table_time:>14,.0f}{max_difference:>9}"
+                )
+            print(
+                f"{waveform[WaveformEntries.NAME]:<14}{duplication_factor:>4}"
+                f"{SAMPLE_COUNT / reference_time:>16,.0f}"
+                f"{SAMPLE_COUNT / batch_time:>14,.0f}"
+                f"{reference_time / batch_time:>8.2f}x"
+                f"  {comparison:<10}"
+                f"{table_columns}"
+            )
+
+    if mismatches:
+        raise SystemExit(f"{mismatches} scenario(s) produced different bytes")
+
+
+if __name__ == "__main__":
+    main()
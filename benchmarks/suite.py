@@ -0,0 +1,305 @@
+"""Time the render, display and control hot paths and write the results as JSON.
+
+Scenarios:
+
+- render/<waveform>/<min|default|max>: start_waveform_generation for every
+  entry in WAVEFORMS, with all its parameters at that end of their range
+- render-float/<waveform>/<min|default|max>: the same for the waveforms
+  flagged FIXED_POINT, forced onto the float path for comparison
+- display/<full|one-char|unchanged>: DisplayLCD.render of a frame that
+  differs everywhere, in one character, or not at all
+- control/check-buttons: Control.check_buttons with no input pending
+- navigation/<next-page|step>: moving through the menu and stepping a value
+- format/<waveform>: the main screen parameter line
+- calibration/loop: a fixed integer loop, for benchmarks.compare --normalize
+
+It runs unchanged on MicroPython, timed with ticks_us. On CPython the
+hardware modules come from the simulator. From the repository root:
+
+    python -m benchmarks.suite [--out results.json] [--only render/] [--samples 2048]
+
+On the board, copy benchmarks/ to it and run
+`import benchmarks.suite as s; s.main(["--out", "results.json"])`.
+Compare two result files with benchmarks.compare.
+"""
+
+import json
+import sys
+import time
+
+if sys.implementation.name != "micropython":
+    import simulator
+
+    board = simulator.install()
+    # The LCD the display scenarios draw on, where main.py expects it
+    board.attach_lcd(1, 0x3F)
+
+from control.control import Control, ControlType  # noqa: E402
+from generation.constants import WaveformEntries  # noqa: E402
+from generation.fixed import FixedTableBank  # noqa: E402
+from generation.generation import (  # noqa: E402
+    start_waveform_generation,
+    stop_dma_transfer,
+)
+from generation.render import SampleRenderer  # noqa: E402
+from generation.waveforms import WAVEFORMS  # noqa: E402
+from generation.wavetable import WavetableBank  # noqa: E402
+from utils.formatting import LineFormatter, format_params_line  # noqa: E402
+
+if hasattr(time, "perf_counter_ns"):
+
+    def ticks_us():
+        return time.perf_counter_ns() // 1000
+
+    def ticks_diff(end, start):
+        return end - start
+
+else:
+    from time import ticks_diff, ticks_us
+
+DEFAULT_SAMPLE_COUNT = 2048
+DEFAULT_OUTPUT = "benchmark_results.json"
+REPEATS = 7
+RENDER_ITERATIONS = 3
+DISPLAY_ITERATIONS = 10
+FAST_ITERATIONS = 200
+LIMITS = ("min", "default", "max")
+CALIBRATION_STEPS = 1000
+CALIBRATION_ITERATIONS = 20
+
+
+def parameters_at(waveform, limit):
+    parameters = {}
+    for param in waveform[WaveformEntries.PARAMS]:
+        if limit == "min":
+            value = param.min
+        elif limit == "max":
+            value = param.max
+        else:
+            value = param.default
+        parameters[param.name] = value
+    return parameters
+
+
+def render_scenario(waveform, limit, sample_count, fixed_point=True):
+    def setup():
+        buffer = bytearray(sample_count)
+        # Configured like WaveformGenerator, without the render cache that
+        # would skip the work being timed
+        renderer = SampleRenderer(
+            sample_count,
+            wavetables=WavetableBank(),
+            fixed_tables=FixedTableBank() if fixed_point else None,
+        )
+        parameters = parameters_at(waveform, limit)
+
+        def run():
+            renderer.invalidate()
+            start_waveform_generation(
+                buffer, waveform, parameters, sample_count, renderer=renderer
+            )
+
+        return run
+
+    return setup
+
+
+def new_display():
+    from display.display import DisplayLCD
+
+    return DisplayLCD(
+        i2c_bus=1,
+        sda_pin=26,
+        scl_pin=27,
+        i2c_frequency=400000,
+        i2c_address=0x3F,
+        line_count=2,
+        column_count=16,
+    )
+
+
+DISPLAY_FRAMES = {
+    "full": ([b"Sine wave", b"F150KHz A0.5"], [b"Pink noise wave", b"A2.5 O-1.2"]),
+    "one-char": ([b"Sine wave", b"F150KHz A0.5"], [b"Sine wave", b"F151KHz A0.5"]),
+    "unchanged": ([b"Sine wave", b"F150KHz A0.5"], [b"Sine wave", b"F150KHz A0.5"]),
+}
+
+
+def display_scenario(frames):
+    def setup():
+        display = new_display()
+        state = [0]
+
+        def run():
+            state[0] ^= 1
+            display.render(frames[state[0]])
+
+        return run
+
+    return setup
+
+
+def check_buttons_scenario():
+    control = Control(None, ControlType.BUTTONS)
+    return control.check_buttons
+
+
+def next_page_scenario():
+    control = Control(None, ControlType.NONE)
+    return control.menu.go_to_next_page
+
+
+def step_scenario():
+    setting = WAVEFORMS[0][WaveformEntries.PARAMS][0]
+    state = [0]
+
+    def run():
+        state[0] ^= 1
+        if state[0]:
+            setting.step_up(0)
+        else:
+            setting.step_down(0)
+
+    return run
+
+
+def format_scenario(waveform):
+    def setup():
+        formatter = LineFormatter()
+        params = waveform[WaveformEntries.PARAMS]
+
+        def run():
+            format_params_line(formatter, params)
+
+        return run
+
+    return setup
+
+
+def calibration_scenario():
+    def run():
+        total = 0
+        for index in range(CALIBRATION_STEPS):
+            total += index & 7
+        return total
+
+    return run
+
+
+def scenarios(sample_count):
+    """(name, setup, iterations) for every scenario; setup() returns the call to time."""
+    found = [("calibration/loop", calibration_scenario, CALIBRATION_ITERATIONS)]
+    for waveform in WAVEFORMS:
+        for limit in LIMITS:
+            found.append(
+                (
+                    "render/{}/{}".format(waveform[WaveformEntries.NAME], limit),
+                    render_scenario(waveform, limit, sample_count),
+                    RENDER_ITERATIONS,
+                )
+            )
+    for waveform in WAVEFORMS:
+        if not waveform.get(WaveformEntries.FIXED_POINT):
+            continue
+        for limit in LIMITS:
+            found.append(
+                (
+                    "render-float/{}/{}".format(waveform[WaveformEntries.NAME], limit),
+                    render_scenario(waveform, limit, sample_count, fixed_point=False),
+                    RENDER_ITERATIONS,
+                )
+            )
+    for name in ("full", "one-char", "unchanged"):
+        found.append(
+            (
+                "display/" + name,
+                display_scenario(DISPLAY_FRAMES[name]),
+                DISPLAY_ITERATIONS,
+            )
+        )
+    found.append(("control/check-buttons", check_buttons_scenario, FAST_ITERATIONS))
+    found.append(("navigation/next-page", next_page_scenario, FAST_ITERATIONS))
+    found.append(("navigation/step", step_scenario, FAST_ITERATIONS))
+    for waveform in WAVEFORMS:
+        found.append(
+            (
+                "format/" + waveform[WaveformEntries.NAME],
+                format_scenario(waveform),
+                FAST_ITERATIONS,
+            )
+        )
+    return found
+
+
+def time_scenario(run, iterations, repeats=REPEATS):
+    """Best mean time of one call in microseconds, over repeats."""
+    run()  # warm up caches and wavetables
+    best = None
+    for _ in range(repeats):
+        start = ticks_us()
+        for _ in range(iterations):
+            run()
+        elapsed = ticks_diff(ticks_us(), start) / iterations
+        if best is None or elapsed < best:
+            best = elapsed
+    return best
+
+
+def run_suite(sample_count=DEFAULT_SAMPLE_COUNT, only=None, verbose=True):
+    results = {}
+    skipped = {}
+    for name, setup, iterations in scenarios(sample_count):
+        if only is not None and not name.startswith(only):
+            continue
+        try:
+            run = setup()
+        except OSError as error:
+            # No LCD answering on the bus
+            skipped[name] = str(error)
+            continue
+        microseconds = time_scenario(run, iterations)
+        results[name] = {"us": microseconds, "iterations": iterations}
+        if verbose:
+            print("{:<40} {:>12.1f} us".format(name, microseconds))
+    # The render scenarios leave the DMA pointed at a buffer that is now garbage
+    stop_dma_transfer()
+    return {
+        "implementation": "{} {}".format(
+            sys.implementation.name, ".".join(str(n) for n in sys.version_info[:3])
+        ),
+        "platform": sys.platform,
+        "sample_count": sample_count,
+        "results": results,
+        "skipped": skipped,
+    }
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    output = DEFAULT_OUTPUT
+    only = None
+    sample_count = DEFAULT_SAMPLE_COUNT
+    index = 0
+    # Parsed by hand, as MicroPython has no argparse
+    while index < len(argv):
+        if argv[index] == "--out":
+            output = argv[index + 1]
+        elif argv[index] == "--only":
+            only = argv[index + 1]
+        elif argv[index] == "--samples":
+            sample_count = int(argv[index + 1])
+        else:
+            print("unknown argument: " + argv[index])
+            return 2
+        index += 2
+    report = run_suite(sample_count, only)
+    with open(output, "w") as file:
+        json.dump(report, file)
+    print("{} scenarios written to {}".format(len(report["results"]), output))
+    for name in report["skipped"]:
+        print("skipped {}: {}".format(name, report["skipped"][name]))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,6 +1,9 @@
+import micropython
 import utime
 from machine import Pin
 
+from control.events import PRESS
+
 
 def switch_power_supply_to_pwm():
     # set GP23 to high to switch Pico power supply from PFM to PWM to reduce noise
@@ -8,12 +11,54 @@ def switch_power_supply_to_pwm():
 
 
 class ButtonControl:
-    def __init__(self, pin, mode=Pin.IN, pull=Pin.PULL_UP):
+    def __init__(self, pin, mode=Pin.IN, pull=Pin.PULL_UP, events=None):
         self.pin = Pin(pin, mode=mode, pull=pull)
         self.button_press_start = None
         self.press_detected = False
+        self.repeats = 0
+        # With an InputEvents ring, edges are timestamped by a pin interrupt
+        # instead of sampled when the control loop polls
+        self.events = events
+        self.button_id = None
+        self.pending_presses = 0
+        self.pending_duration = 0
+        if events is not None:
+            self.button_id = events.register(self.pin.value(), utime.ticks_ms())
+            # Bound once, so neither the interrupt nor settle() allocates it
+            self._edge_handler = self._on_edge
+            self.pin.irq(self._edge_handler, Pin.IRQ_FALLING | Pin.IRQ_RISING)
+
+    def _on_edge(self, pin):
+        self.events.record_edge(self.button_id, pin.value(), utime.ticks_ms())
+
+    def settle(self):
+        # An edge swallowed by the debounce window leaves the recorded level
+        # stale. It is recorded through the scheduler, like pin interrupts, so
+        # the ring keeps a single producer.
+        if self.pin.value() != self.events.level(self.button_id):
+            try:
+                micropython.schedule(self._edge_handler, self.pin)
+            except RuntimeError:
+                pass  # the schedule queue is full; try again on the next poll
+
+    def handle_event(self, kind, timestamp):
+        if kind == PRESS:
+            self.button_press_start = timestamp
+            self.press_detected = True
+            self.repeats = 0
+        elif self.button_press_start is not None:
+            self.pending_duration = utime.ticks_diff(timestamp, self.button_press_start)
+            self.pending_presses += 1
+            self.button_press_start = None
+            self.press_detected = False
 
     def check_pressed(self):
+        if self.events is not None:
+            if not self.pending_presses:
+                return False, 0
+            self.pending_presses -= 1
+            return True, self.pending_duration
+
         current_state = self.pin.value()
         current_time = utime.ticks_ms()
 
@@ -21,6 +66,7 @@ class ButtonControl:
         if current_state == 0 and self.button_press_start is None:
             self.button_press_start = current_time
             self.press_detected = True
+            self.repeats = 0
 
         # If the button is released and was previously detected as pressed
         elif current_state == 1 and self.press_detected:
@@ -35,3 +81,16 @@ class ButtonControl:
 
         # Default return when no press/release detected
         return False, 0
+
+    def is_held(self):
+        return self.button_press_start is not None
+
+    def check_repeat(self, interval):
+        """Return the held duration once per interval while held, else None."""
+        if self.button_press_start is None:
+            return None
+        held_duration = utime.ticks_diff(utime.ticks_ms(), self.button_press_start)
+        if held_duration < (self.repeats + 1) * interval:
+            return None
+        self.repeats += 1
+        return held_duration
@@ -1,74 +1,54 @@
 from control.signal import WaveformControl
-from generation.constants import WaveformEntries
 from generation.waveforms import WAVEFORMS, WaveformParams
-from utils.helpers import get_params_values_string
+from utils.formatting import LineFormatter, format_params_line
 
 from control.button import ButtonControl
+from control.events import InputEvents
+from control.menu import WAVEFORM_PAGE_NAME, Menu, Page
+
+APPLY_NOW_PRESS_MS = 800  # a main button press this long applies changes at once
+
 
 class ControlType:
     NONE = 0
     BUTTONS = 1
 
-class Page:
-    def __init__(self, name, setting):
-        self.name = name
-        self.setting = setting
-
-
-class Menu:
-    def __init__(self, default_pages, optional_pages, waveforms, default_waveform=None):
-        self.default_pages = default_pages
-        self.optional_pages = optional_pages
-        self.active_pages = default_pages
-        self.current_page_index = 0
-        self.current_page = self.active_pages[self.current_page_index]
-        self.waveforms = waveforms
-        self.default_waveform = default_waveform or waveforms[0]
-        self.current_waveform = self.default_waveform
-        self.current_params = self.current_waveform[WaveformEntries.PARAMS]
-
-    def get_current_waveform(self):
-        for page in self.default_pages:
-            if page.name == "Waveform":
-                waveform = self.default_waveform
-                for waveform in WAVEFORMS:
-                    if waveform["name"] == page.setting.current_value:
-                        break
-                return waveform
-        return self.default_waveform
-
-    def update_pages_list(self):
-        self.current_waveform = self.get_current_waveform()
-        self.current_params = self.current_waveform["params"]
-        signal_params_names = [param.name for param in self.current_waveform["params"]]
-        params_pages = [
-            page for page in self.optional_pages if page.name in signal_params_names
-        ]
-        self.active_pages = self.default_pages + params_pages
-
-    def go_to_next_page(self):
-        self.update_pages_list()
-        self.current_page_index = (self.current_page_index + 1) % len(self.active_pages)
-        self.current_page = self.active_pages[self.current_page_index]
-
 
 class Control:
     def __init__(self, display=None, control_type=ControlType.NONE):
 
         self.display = display
+        self.apply_requested = False
+        # (setting, value before the first auto-repeat) while a button is held
+        self.repeat_preview = None
+        # Set while Increase and Decrease are held together, until both are up
+        self.chord_held = False
+        self.title_line = LineFormatter()
+        self.params_line = LineFormatter()
+        self.params_line_fits = True
+        self.main_lines = [self.title_line.buffer, self.params_line.buffer]
 
         if control_type == ControlType.BUTTONS:
-            self.main_button = ButtonControl(pin=19)
-            self.increase_button = ButtonControl(pin=18)
-            self.decrease_button = ButtonControl(pin=20)
+            self.input_events = InputEvents()
+            self.main_button = ButtonControl(pin=19, events=self.input_events)
+            self.increase_button = ButtonControl(pin=18, events=self.input_events)
+            self.decrease_button = ButtonControl(pin=20, events=self.input_events)
+            # Indexed by button id, which follows the registration order above
+            self.buttons = [
+                self.main_button,
+                self.increase_button,
+                self.decrease_button,
+            ]
         else:
+            self.input_events = None
             self.main_button = None
             self.increase_button = None
             self.decrease_button = None
+            self.buttons = []
 
         self.main_page = Page("Main", setting=None)
         self.waveform_page = Page(
-            "Waveform",
+            WAVEFORM_PAGE_NAME,
             setting=WaveformControl(
                 "Waveform",
                 short_name="Wf",
@@ -77,16 +57,25 @@ class Control:
         )
         self.menu = self.setup_menu()
 
+    def take_apply_request(self):
+        """Return True once after the "apply now" gesture (a long main press)."""
+        apply_requested = self.apply_requested
+        self.apply_requested = False
+        return apply_requested
+
     def update_display(self):
         if not self.display:
             return
 
-        lines = []
         if self.menu.current_page.name == self.main_page.name:
-            lines = [
-                f"{self.menu.current_waveform['name']} wave",
-                get_params_values_string(self.menu.current_params),
-            ]
+            # Written into preallocated lines, so the main page allocates nothing
+            self.title_line.clear()
+            self.title_line.put_text(self.menu.current_waveform["name"])
+            self.title_line.put_text(" wave")
+            self.params_line_fits = format_params_line(
+                self.params_line, self.menu.current_params
+            )
+            lines = self.main_lines
         else:
             lines = [
                 f"{self.menu.current_page.setting.name}:",
@@ -96,9 +85,29 @@ class Control:
         return
 
     def check_buttons(self):
+        if not self.main_button:
+            return
+        if self.input_events is not None:
+            self.dispatch_input_events()
+        # Each pass takes at most one press from every button
+        while self.handle_button_presses():
+            pass
+        self.repeat_held_buttons()
+
+    def dispatch_input_events(self):
+        for button in self.buttons:
+            button.settle()
+        event = self.input_events.pop()
+        while event is not None:
+            button_id, kind, timestamp = event
+            self.buttons[button_id].handle_event(kind, timestamp)
+            self.check_chord()
+            event = self.input_events.pop()
+
+    def handle_button_presses(self):
         if self.main_button:
             default_value = (False, 0)
-            main_pressed, _ = (
+            main_pressed, main_duration = (
                 self.main_button.check_pressed() if self.main_button else default_value
             )
             increase_pressed, increase_duration = (
@@ -112,31 +121,97 @@ class Control:
                 else default_value
             )
 
+            self.check_chord()
+
             if not (main_pressed or increase_pressed or decrease_pressed):
-                return
+                return False
+
+            if self.chord_held and (increase_pressed or decrease_pressed):
+                # Releases that end a two-button press never step the setting,
+                # however far apart they come
+                self.finish_chord()
+                if not main_pressed:
+                    return True
+                increase_pressed = decrease_pressed = False
 
-            if increase_pressed and decrease_pressed:
+            elif increase_pressed and decrease_pressed:
                 self.display.toggle_backlight() if self.display else None
-                return
+                return True
+
+            if main_pressed and main_duration >= APPLY_NOW_PRESS_MS:
+                self.apply_requested = True
+                return True
 
             if main_pressed:
                 self.menu.go_to_next_page()
                 self.update_display()
-                return
+                return True
 
             if increase_pressed and self.menu.current_page.setting:
+                self.end_repeat_preview()
                 self.menu.current_page.setting.increase(
                     press_duration=increase_duration
                 )
                 self.update_display()
-                return
+                return True
 
             if decrease_pressed and self.menu.current_page.setting:
+                self.end_repeat_preview()
                 self.menu.current_page.setting.decrease(
                     press_duration=decrease_duration
                 )
                 self.update_display()
-                return
+                return True
+            # A press on a page without a setting is still consumed
+            return True
+        return False
+
+    def repeat_held_buttons(self):
+        # Numeric settings keep stepping while a button is held, so the display
+        # follows the value instead of jumping on release
+        setting = self.menu.current_page.setting
+        if not setting or setting.options:
+            return
+        if self.chord_held:
+            return
+        held_duration = self.increase_button.check_repeat(setting.check_interval)
+        if held_duration is not None:
+            self.start_repeat_preview(setting)
+            setting.step_up(held_duration)
+            self.update_display()
+            return
+        held_duration = self.decrease_button.check_repeat(setting.check_interval)
+        if held_duration is not None:
+            self.start_repeat_preview(setting)
+            setting.step_down(held_duration)
+            self.update_display()
+
+    def check_chord(self):
+        if self.chord_held:
+            return
+        if self.increase_button.is_held() and self.decrease_button.is_held():
+            self.chord_held = True
+            # Steps repeated before the second button went down are undone
+            self.end_repeat_preview()
+
+    def finish_chord(self):
+        if self.increase_button.is_held() or self.decrease_button.is_held():
+            return
+        self.chord_held = False
+        self.display.toggle_backlight() if self.display else None
+
+    def start_repeat_preview(self, setting):
+        if self.repeat_preview is None:
+            self.repeat_preview = (setting, setting.current_value)
+
+    def end_repeat_preview(self):
+        # The steps shown while the button was held are only a preview: the
+        # release applies the ramp for the whole press from the value before
+        # them, so a held press ends where the release-only ramp did
+        preview = self.repeat_preview
+        self.repeat_preview = None
+        if preview is not None and preview[0] is self.menu.current_page.setting:
+            preview[0].set_value(preview[1])
 
     def setup_menu(self):
         default_pages = [self.main_page, self.waveform_page]
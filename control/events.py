@@ -0,0 +1,88 @@
+from array import array
+
+from utils.ticks import ticks_diff
+
+EVENT_CAPACITY = 32  # a power of two, so indices wrap with a mask
+MAX_BUTTONS = 8
+DEBOUNCE_MS = 20
+PRESSED_LEVEL = 0  # buttons pull the pin to ground
+
+RELEASE = 0
+PRESS = 1
+
+
+class InputEvents:
+    """Debounced button edges in a lock-free ring buffer.
+
+    Pin interrupt handlers call record_edge() and the control loop pops the
+    events. There is one producer and one consumer: only the producer writes
+    head and only the consumer writes tail, and head is advanced after the
+    slot is written, so neither side needs a lock. All storage is allocated
+    up front, so recording an edge never allocates.
+
+    An edge is accepted when the level differs from the last accepted level
+    of that button and at least debounce_ms have passed since then.
+    """
+
+    def __init__(self, capacity=EVENT_CAPACITY, debounce_ms=DEBOUNCE_MS):
+        self.capacity = capacity
+        self.debounce_ms = debounce_ms
+        self.head = 0
+        self.tail = 0
+        self.overflows = 0
+        self.bounces = 0
+        self._mask = capacity - 1
+        self._buttons = bytearray(capacity)
+        self._kinds = bytearray(capacity)
+        self._times = array("i", [0] * capacity)
+        self._levels = bytearray(MAX_BUTTONS)
+        self._last_edge = array("i", [0] * MAX_BUTTONS)
+        self._button_count = 0
+        # Called after an event is stored, e.g. the set() of a ThreadSafeFlag
+        self.wake = None
+
+    def register(self, level, timestamp=0):
+        """Add a button whose pin currently reads level. Returns its id."""
+        button_id = self._button_count
+        self._levels[button_id] = level
+        self._last_edge[button_id] = timestamp
+        self._button_count += 1
+        return button_id
+
+    def level(self, button_id):
+        return self._levels[button_id]
+
+    def record_edge(self, button_id, level, timestamp):
+        """Record a pin edge. Returns True if it was accepted as an event."""
+        if (
+            level == self._levels[button_id]
+            or ticks_diff(timestamp, self._last_edge[button_id]) < self.debounce_ms
+        ):
+            self.bounces += 1
+            return False
+        self._levels[button_id] = level
+        self._last_edge[button_id] = timestamp
+        head = self.head
+        next_head = (head + 1) & self._mask
+        if next_head == self.tail:
+            self.overflows += 1
+            return False
+        self._buttons[head] = button_id
+        self._kinds[head] = PRESS if level == PRESSED_LEVEL else RELEASE
+        self._times[head] = timestamp
+        self.head = next_head
+        if self.wake is not None:
+            self.wake()
+        return True
+
+    def __len__(self):
+        return (self.head - self.tail) & self._mask
+
+    def pop(self):
+        """Return the oldest (button_id, kind, timestamp), or None when empty."""
+        tail = self.tail
+        if tail == self.head:
+            return None
+        event = (self._buttons[tail], self._kinds[tail], self._times[tail])
+        self.tail = (tail + 1) & self._mask
+        return event
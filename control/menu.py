@@ -0,0 +1,68 @@
+from generation.constants import WaveformEntries
+
+WAVEFORM_PAGE_NAME = "Waveform"
+
+
+class Page:
+    __slots__ = ("name", "setting")
+
+    def __init__(self, name, setting):
+        self.name = name
+        self.setting = setting
+
+
+class Menu:
+    """Pages of the menu, with lookups precomputed for every waveform.
+
+    The waveform for each name and the active page list for each waveform are
+    built once here, so selecting a waveform or moving to the next page is a
+    dict lookup that neither scans nor allocates.
+    """
+
+    def __init__(self, default_pages, optional_pages, waveforms, default_waveform=None):
+        self.default_pages = default_pages
+        self.optional_pages = optional_pages
+        self.active_pages = default_pages
+        self.current_page_index = 0
+        self.current_page = self.active_pages[self.current_page_index]
+        self.waveforms = waveforms
+        self.default_waveform = default_waveform or waveforms[0]
+        self.current_waveform = self.default_waveform
+        self.current_params = self.current_waveform[WaveformEntries.PARAMS]
+
+        self.waveform_page = None
+        for page in default_pages:
+            if page.name == WAVEFORM_PAGE_NAME:
+                self.waveform_page = page
+        self.waveforms_by_name = {}
+        self.pages_by_waveform = {}
+        for waveform in waveforms:
+            name = waveform[WaveformEntries.NAME]
+            self.waveforms_by_name[name] = waveform
+            self.pages_by_waveform[name] = self._build_pages(waveform)
+
+    def _build_pages(self, waveform):
+        signal_params_names = [param.name for param in waveform[WaveformEntries.PARAMS]]
+        params_pages = [
+            page for page in self.optional_pages if page.name in signal_params_names
+        ]
+        return self.default_pages + params_pages
+
+    def get_current_waveform(self):
+        if self.waveform_page is None:
+            return self.default_waveform
+        return self.waveforms_by_name.get(
+            self.waveform_page.setting.current_value, self.default_waveform
+        )
+
+    def update_pages_list(self):
+        self.current_waveform = self.get_current_waveform()
+        self.current_params = self.current_waveform[WaveformEntries.PARAMS]
+        self.active_pages = self.pages_by_waveform[
+            self.current_waveform[WaveformEntries.NAME]
+        ]
+
+    def go_to_next_page(self):
+        self.update_pages_list()
+        self.current_page_index = (self.current_page_index + 1) % len(self.active_pages)
+        self.current_page = self.active_pages[self.current_page_index]
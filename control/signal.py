@@ -1,10 +1,33 @@
+# Field positions in a control's spec, the immutable part of a WaveformControl
+NAME = 0
+SHORT_NAME = 1
+MIN = 2
+DEFAULT = 3
+MAX = 4
+STEP = 5
+UNIT = 6
+OPTIONS = 7
+DYNAMIC_STEP = 8
+CHECK_INTERVAL = 9
+
+
 class WaveformControl:
+    """A menu setting. The metadata lives in one shared spec tuple, so an
+    instance only carries the spec, its current value and a version.
+    """
+
+    __slots__ = ("spec", "current_value", "version")
+
+    # Bumped on every value change of any control, so a change anywhere in the
+    # menu can be detected without comparing values
+    revision = 0
+
     def __init__(
         self,
         name,
         short_name,
         min=0.0,
-        default=0.0,
+        default=None,
         max=0.0,
         step=0.0,
         unit="",
@@ -12,17 +35,75 @@ class WaveformControl:
         dynamic_step=False,
         check_interval=300,
     ):
-        self.name = name
-        self.short_name = short_name
-        self.min = min
-        self.default = default
-        self.max = max
-        self.step = step
-        self.unit = unit
-        self.options = options if options else []
-        self.current_value = options[0] if options else default if default else min
-        self.dynamic_step = dynamic_step
-        self.check_interval = check_interval
+        # Without a default a control starts at its minimum
+        if default is None:
+            default = min
+        self.spec = (
+            name,
+            short_name,
+            min,
+            default,
+            max,
+            step,
+            unit,
+            tuple(options) if options else (),
+            dynamic_step,
+            check_interval,
+        )
+        self.current_value = options[0] if options else default
+        self.version = 0
+
+    @property
+    def name(self):
+        return self.spec[NAME]
+
+    @property
+    def short_name(self):
+        return self.spec[SHORT_NAME]
+
+    @property
+    def min(self):
+        return self.spec[MIN]
+
+    @property
+    def default(self):
+        return self.spec[DEFAULT]
+
+    @property
+    def max(self):
+        return self.spec[MAX]
+
+    @property
+    def step(self):
+        return self.spec[STEP]
+
+    @property
+    def unit(self):
+        return self.spec[UNIT]
+
+    @property
+    def options(self):
+        return self.spec[OPTIONS]
+
+    @property
+    def dynamic_step(self):
+        return self.spec[DYNAMIC_STEP]
+
+    @property
+    def check_interval(self):
+        return self.spec[CHECK_INTERVAL]
+
+    def set_value(self, value):
+        """Set the current value as is, e.g. to undo steps previewed while a
+        button was held."""
+        self._set_value(value)
+
+    def _set_value(self, value):
+        if value == self.current_value:
+            return
+        self.current_value = value
+        self.version += 1
+        WaveformControl.revision += 1
 
     def _update_value(self, direction, press_duration):
         """Update the current value in a specified direction ('increase' or 'decrease') based on press duration."""
@@ -33,21 +114,20 @@ class WaveformControl:
                 if direction == "increase"
                 else (index - 1) % len(self.options)
             )
-            self.current_value = self.options[new_index]
+            self._set_value(self.options[new_index])
         else:
             while press_duration >= 0:
-                dynamic_step = self.update_step_size(press_duration)
-                if direction == "increase":
-                    self.current_value = min(
-                        self.current_value + dynamic_step, self.max
-                    )
-                else:  # direction == 'decrease'
-                    self.current_value = max(
-                        self.current_value - dynamic_step, self.min
-                    )
-                self.current_value = round(self.current_value, 1)
+                self._step(direction, press_duration)
                 press_duration -= self.check_interval
 
+    def _step(self, direction, press_duration):
+        dynamic_step = self.update_step_size(press_duration)
+        if direction == "increase":
+            value = min(self.current_value + dynamic_step, self.max)
+        else:  # direction == 'decrease'
+            value = max(self.current_value - dynamic_step, self.min)
+        self._set_value(round(value, 1))
+
     def update_step_size(self, press_duration):
         """Determine the step size based on the press duration, ensuring it does not exceed one order of magnitude less than max."""
         max_dynamic_step = int(max(1, self.max / 10))
@@ -61,3 +141,11 @@ class WaveformControl:
     def decrease(self, press_duration=0):
         """Decrease the current value based on press duration."""
         self._update_value("decrease", press_duration)
+
+    def step_up(self, press_duration):
+        """Apply a single increase step sized for a button held for press_duration."""
+        self._step("increase", press_duration)
+
+    def step_down(self, press_duration):
+        """Apply a single decrease step sized for a button held for press_duration."""
+        self._step("decrease", press_duration)
@@ -1,5 +1,15 @@
 from machine import I2C, Pin
 from display.lcd_driver import I2cLcd
+from utils.memory import allocated_heap
+from utils.telemetry import telemetry
+
+SPACE = 0x20
+# Unchanged characters between two changed runs are resent rather than paying
+# for a cursor move and a new transfer when the gap is at most this long
+MAX_MERGE_GAP = 1
+
+_render_timer = telemetry.timer("display.render")
+
 
 class DisplayLCD:
     def __init__(
@@ -19,15 +29,68 @@ class DisplayLCD:
         self.backlight_on = True
         self.line_count = line_count
         self.column_count = column_count
+        # What is currently on the glass, and the frame being rendered
+        self.shadow = [bytearray(column_count) for _ in range(line_count)]
+        self.frame = bytearray(column_count)
+        # Heap bytes allocated by the last render, None where it cannot be measured
+        self.render_allocated = None
+        self.clear()
 
         self.lcd.backlight_on() if self.backlight_on else self.lcd.backlight_off()
 
-    def render(self, lines):
+    def clear(self):
         self.lcd.clear()
-        for i, line in enumerate(lines[: self.line_count]):
-            cropped_line = line[: self.column_count]
-            self.lcd.move_to(0, i)
-            self.lcd.putstr(cropped_line)
+        for shadow_line in self.shadow:
+            for column in range(self.column_count):
+                shadow_line[column] = SPACE
+
+    def render(self, lines):
+        # Only the characters that differ from the shadow framebuffer are sent.
+        # Lines given as bytes or bytearray render without allocating.
+        started = telemetry.start()
+        allocated_before = allocated_heap()
+        frame = self.frame
+        for row in range(self.line_count):
+            line = lines[row] if row < len(lines) else b""
+            if isinstance(line, str):
+                line = line.encode()
+            length = min(len(line), self.column_count)
+            for column in range(length):
+                frame[column] = line[column]
+            for column in range(length, self.column_count):
+                frame[column] = SPACE
+            self._send_changes(row, frame)
+        if allocated_before is not None:
+            self.render_allocated = allocated_heap() - allocated_before
+        telemetry.stop(_render_timer, started)
+
+    def _send_changes(self, row, frame):
+        shadow_line = self.shadow[row]
+        column = 0
+        while column < self.column_count:
+            if frame[column] == shadow_line[column]:
+                column += 1
+                continue
+            start = column
+            stop = column + 1
+            column += 1
+            while column < self.column_count and column - stop <= MAX_MERGE_GAP:
+                if frame[column] != shadow_line[column]:
+                    stop = column + 1
+                column += 1
+            self._write_run(row, frame, start, stop)
+            for index in range(start, stop):
+                shadow_line[index] = frame[index]
+            column = stop
+
+    def _write_run(self, row, frame, start, stop):
+        lcd = self.lcd
+        if lcd.cursor_x != start or lcd.cursor_y != row:
+            lcd.move_to(start, row)
+        lcd.hal_write_data_run(frame, start, stop)
+        # Past the last column the LCD address is off screen, so the next run
+        # always moves the cursor
+        lcd.cursor_x = stop
 
     def toggle_backlight(self):
         self.backlight_on = not self.backlight_on
@@ -6,7 +6,8 @@ https://github.com/dhylands/python_lcd
 
 import time
 import utime
-import gc
+
+NEWLINE = 0x0A
 
 
 class LcdApi:
@@ -154,15 +155,21 @@ class LcdApi:
                 # self.implied_newline means we advanced due to a wraparound,
                 # so if we get a newline right after that we ignore it.
                 self.implied_newline = False
-            else:
-                self.cursor_x = self.num_columns
+                return
+            self.cursor_x = self.num_columns
         else:
             self.hal_write_data(ord(char))
             self.cursor_x += 1
-        if self.cursor_x >= self.num_columns:
-            self.cursor_x = 0
-            self.cursor_y += 1
-            self.implied_newline = char != "\n"
+        self._wrap_cursor(char != "\n")
+
+    def _wrap_cursor(self, implied_newline):
+        # The LCD advances its address after every write, so the cursor only
+        # has to be moved when it runs off the end of a line
+        if self.cursor_x < self.num_columns:
+            return
+        self.cursor_x = 0
+        self.cursor_y += 1
+        self.implied_newline = implied_newline
         if self.cursor_y >= self.num_lines:
             self.cursor_y = 0
         self.move_to(self.cursor_x, self.cursor_y)
@@ -171,8 +178,23 @@ class LcdApi:
         """Write the indicated string to the LCD at the current cursor
         position and advances the cursor position appropriately.
         """
-        for char in string:
-            self.putchar(char)
+        data = string.encode()
+        start = 0
+        length = len(data)
+        while start < length:
+            if data[start] == NEWLINE:
+                self.putchar("\n")
+                start += 1
+                continue
+            # Send everything up to the next newline or the end of the line at once
+            stop = min(length, start + self.num_columns - self.cursor_x)
+            newline = data.find(b"\n", start, stop)
+            if newline != -1:
+                stop = newline
+            self.hal_write_data_run(data, start, stop)
+            self.cursor_x += stop - start
+            self._wrap_cursor(True)
+            start = stop
 
     def custom_char(self, location, charmap):
         """Write a character to one of the 8 CGRAM locations, available
@@ -216,6 +238,14 @@ class LcdApi:
         """
         raise NotImplementedError
 
+    def hal_write_data_run(self, data, start, stop):
+        """Write the character codes data[start:stop] to the LCD.
+
+        A derived HAL class may override this to send them in one transfer.
+        """
+        for index in range(start, stop):
+            self.hal_write_data(data[index])
+
     # This is a default implementation of hal_sleep_us which is suitable
     # for most micropython implementations. For platforms which don't
     # support `time.sleep_us()` they should provide their own implementation
@@ -234,6 +264,10 @@ MASK_E = 0x04  # P2
 
 SHIFT_BACKLIGHT = 3  # P3
 SHIFT_DATA = 4  # P4-P7
+# Each byte is an E-high/E-low pair per nibble. At 400 kHz the four I2C bytes
+# of one character take longer than the 37 us the LCD needs to execute it, so
+# consecutive characters can go out in a single transfer.
+BYTES_PER_WRITE = 4
 
 
 class I2cLcd(LcdApi):
@@ -243,7 +277,17 @@ class I2cLcd(LcdApi):
     def __init__(self, i2c, i2c_addr, num_lines, num_columns):
         self.i2c = i2c
         self.i2c_addr = i2c_addr
-        self.i2c.writeto(self.i2c_addr, bytes([0]))
+        # Scratch buffers are allocated once so that writes never allocate
+        self._byte_buffer = bytearray(1)
+        self._command_buffer = bytearray(BYTES_PER_WRITE)
+        # A run never extends past the end of a line
+        run_length = min(num_columns, 40)
+        run_buffer = memoryview(bytearray(BYTES_PER_WRITE * run_length))
+        # Slicing a memoryview allocates, so there is a view for every run length
+        self._run_views = [
+            run_buffer[: BYTES_PER_WRITE * count] for count in range(run_length + 1)
+        ]
+        self._write_byte(0)
         utime.sleep_ms(20)  # Allow LCD time to powerup
         # Send reset 3 times
         self.hal_write_init_nibble(self.LCD_FUNCTION_RESET)
@@ -260,53 +304,54 @@ class I2cLcd(LcdApi):
         if num_lines > 1:
             cmd |= self.LCD_FUNCTION_2LINES
         self.hal_write_command(cmd)
-        gc.collect()
 
     def hal_write_init_nibble(self, nibble):
         # Writes an initialization nibble to the LCD.
         # This particular function is only used during initialization.
         byte = ((nibble >> 4) & 0x0F) << SHIFT_DATA
-        self.i2c.writeto(self.i2c_addr, bytes([byte | MASK_E]))
-        self.i2c.writeto(self.i2c_addr, bytes([byte]))
-        gc.collect()
+        self._write_byte(byte | MASK_E)
+        self._write_byte(byte)
 
     def hal_backlight_on(self):
         # Allows the hal layer to turn the backlight on
-        self.i2c.writeto(self.i2c_addr, bytes([1 << SHIFT_BACKLIGHT]))
-        gc.collect()
+        self._write_byte(1 << SHIFT_BACKLIGHT)
 
     def hal_backlight_off(self):
         # Allows the hal layer to turn the backlight off
-        self.i2c.writeto(self.i2c_addr, bytes([0]))
-        gc.collect()
+        self._write_byte(0)
+
+    def _write_byte(self, byte):
+        self._byte_buffer[0] = byte
+        self.i2c.writeto(self.i2c_addr, self._byte_buffer)
+
+    def _pack(self, buffer, offset, value, mode):
+        # Data is latched on the falling edge of E, high nibble first
+        base = mode | (self.backlight << SHIFT_BACKLIGHT)
+        byte = base | (((value >> 4) & 0x0F) << SHIFT_DATA)
+        buffer[offset] = byte | MASK_E
+        buffer[offset + 1] = byte
+        byte = base | ((value & 0x0F) << SHIFT_DATA)
+        buffer[offset + 2] = byte | MASK_E
+        buffer[offset + 3] = byte
 
     def hal_write_command(self, cmd):
         # Write a command to the LCD. Data is latched on the falling edge of E.
-        byte = (self.backlight << SHIFT_BACKLIGHT) | (((cmd >> 4) & 0x0F) << SHIFT_DATA)
-        self.i2c.writeto(self.i2c_addr, bytes([byte | MASK_E]))
-        self.i2c.writeto(self.i2c_addr, bytes([byte]))
-        byte = (self.backlight << SHIFT_BACKLIGHT) | ((cmd & 0x0F) << SHIFT_DATA)
-        self.i2c.writeto(self.i2c_addr, bytes([byte | MASK_E]))
-        self.i2c.writeto(self.i2c_addr, bytes([byte]))
+        self._pack(self._command_buffer, 0, cmd, 0)
+        self.i2c.writeto(self.i2c_addr, self._command_buffer)
         if cmd <= 3:
             # The home and clear commands require a worst case delay of 4.1 msec
             utime.sleep_ms(5)
-        gc.collect()
 
     def hal_write_data(self, data):
         # Write data to the LCD. Data is latched on the falling edge of E.
-        byte = (
-            MASK_RS
-            | (self.backlight << SHIFT_BACKLIGHT)
-            | (((data >> 4) & 0x0F) << SHIFT_DATA)
-        )
-        self.i2c.writeto(self.i2c_addr, bytes([byte | MASK_E]))
-        self.i2c.writeto(self.i2c_addr, bytes([byte]))
-        byte = (
-            MASK_RS
-            | (self.backlight << SHIFT_BACKLIGHT)
-            | ((data & 0x0F) << SHIFT_DATA)
-        )
-        self.i2c.writeto(self.i2c_addr, bytes([byte | MASK_E]))
-        self.i2c.writeto(self.i2c_addr, bytes([byte]))
-        gc.collect()
+        self._pack(self._command_buffer, 0, data, MASK_RS)
+        self.i2c.writeto(self.i2c_addr, self._command_buffer)
+
+    def hal_write_data_run(self, data, start, stop):
+        # Write a run of characters in a single I2C transfer
+        buffer = self._run_views[stop - start]
+        offset = 0
+        for index in range(start, stop):
+            self._pack(buffer, offset, data[index], MASK_RS)
+            offset += BYTES_PER_WRITE
+        self.i2c.writeto(self.i2c_addr, buffer)
@@ -0,0 +1,49 @@
+try:
+    import uasyncio as asyncio
+except ImportError:
+    import asyncio
+
+DEFAULT_FPS = 15
+
+
+class DisplayUpdater:
+    """Draws frames from an asyncio task instead of inside the caller.
+
+    render() only records the latest frame and returns, so input handling is
+    never held up by the I2C transfer. Requests are coalesced: a burst of
+    changes between two draws costs one draw of the newest frame.
+
+    A scheduler task calls draw() when ready is set, with runs at least
+    frame_interval_ms (1 / fps seconds) apart; see build_scheduler in main.
+    """
+
+    def __init__(self, display, fps=DEFAULT_FPS):
+        self.display = display
+        self.frame_interval_ms = 1000 // fps
+        self.requests = 0
+        self.draws = 0
+        self._lines = None
+        # Set whenever a frame is waiting to be drawn
+        self.ready = asyncio.Event()
+
+    def render(self, lines):
+        self._lines = lines
+        self.requests += 1
+        self.ready.set()
+
+    def toggle_backlight(self):
+        self.display.toggle_backlight()
+
+    @property
+    def coalesced(self):
+        return self.requests - self.draws
+
+    def draw(self):
+        """Draw the newest requested frame, if any. Returns True if one was drawn."""
+        lines = self._lines
+        self._lines = None
+        if lines is None:
+            return False
+        self.display.render(lines)
+        self.draws += 1
+        return True
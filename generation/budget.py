@@ -0,0 +1,78 @@
+import gc
+
+from generation.cache import DEFAULT_MAX_BYTES as CACHE_BYTES
+from generation.constants import WaveformEntries, WaveformNames
+from generation.fixed import FIXED_ENTRY_SIZE
+from generation.render import FLOAT_SIZE
+from generation.wavetable import MAX_TABLES, TABLE_SIZE
+from utils.memory import free_heap
+
+DEFAULT_SAMPLE_BUDGET = 4096  # used where the free heap cannot be measured
+MIN_SAMPLE_BUDGET = 1024
+MAX_SAMPLE_BUDGET = 16384
+BUDGET_GRANULARITY = 1024
+HEAP_HEADROOM = 32 * 1024  # left for the menu, display, render garbage and GC slack
+
+# Shapes without a wavetable, or whose length sets their spectral quality,
+# get the whole budget
+LONG_BUFFER_WAVEFORMS = (
+    WaveformNames.PULSE,
+    WaveformNames.SINC,
+    WaveformNames.GAUSSIAN,
+    WaveformNames.EXPONENTIAL,
+    WaveformNames.WHITE_NOISE,
+    WaveformNames.PINK_NOISE,
+)
+
+# Two ping-pong sample buffers plus the renderer's float scratch buffer
+BYTES_PER_SAMPLE = 2 + FLOAT_SIZE
+# Reserved up front for the render cache and the float and Q15 wavetables
+RESERVED_BYTES = CACHE_BYTES + MAX_TABLES * TABLE_SIZE * (FLOAT_SIZE + FIXED_ENTRY_SIZE)
+
+
+class BufferBudget:
+    """Sample buffer size chosen at startup, and the heap it left free.
+
+    free_at_start is the free heap when the plan was made, and headroom is
+    the free heap measured after the buffers were allocated. Both are None
+    where the runtime cannot report the heap.
+    """
+
+    def __init__(self, sample_budget, free_at_start=None):
+        self.sample_budget = sample_budget
+        self.free_at_start = free_at_start
+        self.headroom = None
+
+    def sample_limit(self, waveform):
+        """Largest sample count worth rendering for a waveform."""
+        if waveform.get(WaveformEntries.NAME) in LONG_BUFFER_WAVEFORMS:
+            return self.sample_budget
+        # Periodic shapes gain nothing from more samples than their wavetable holds
+        return min(self.sample_budget, TABLE_SIZE)
+
+    def measure_headroom(self):
+        gc.collect()
+        self.headroom = free_heap()
+        return self.headroom
+
+    def __repr__(self):
+        return "BufferBudget(samples={}, free_at_start={}, headroom={})".format(
+            self.sample_budget, self.free_at_start, self.headroom
+        )
+
+
+def plan_buffer_budget(
+    headroom=HEAP_HEADROOM,
+    reserved=RESERVED_BYTES,
+    max_samples=MAX_SAMPLE_BUDGET,
+):
+    """Pick the largest sample buffer that leaves headroom on the heap."""
+    gc.collect()
+    free = free_heap()
+    if free is None:
+        return BufferBudget(min(DEFAULT_SAMPLE_BUDGET, max_samples))
+
+    samples = (free - headroom - reserved) // BYTES_PER_SAMPLE
+    samples -= samples % BUDGET_GRANULARITY
+    samples = max(MIN_SAMPLE_BUDGET, min(samples, max_samples))
+    return BufferBudget(samples, free)
@@ -0,0 +1,65 @@
+from generation.constants import WaveformEntries
+
+DEFAULT_MAX_BYTES = 16 * 1024  # four full 4096-sample buffers
+
+
+def render_key(waveform, parameters, sample_count, clock_divider):
+    return (
+        waveform.get(WaveformEntries.NAME),
+        tuple(sorted(parameters.items())),
+        sample_count,
+        clock_divider,
+    )
+
+
+class RenderCache:
+    """Least-recently-used store of finished sample buffers, bounded in bytes."""
+
+    def __init__(self, max_bytes=DEFAULT_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.entries = {}
+        self._order = []
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key):
+        samples = self.entries.get(key)
+        if samples is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self._order.remove(key)
+        self._order.append(key)
+        return samples
+
+    def put(self, key, samples):
+        if len(samples) > self.max_bytes:
+            return
+        if key in self.entries:
+            self._remove(key)
+        while self.size + len(samples) > self.max_bytes:
+            self._remove(self._order[0])
+            self.evictions += 1
+        self.entries[key] = bytes(samples)
+        self._order.append(key)
+        self.size += len(samples)
+
+    def _remove(self, key):
+        self.size -= len(self.entries.pop(key))
+        self._order.remove(key)
+
+    def clear(self):
+        self.entries = {}
+        self._order = []
+        self.size = 0
+
+    def stats(self):
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "entries": len(self.entries),
+            "bytes": self.size,
+        }
@@ -0,0 +1,108 @@
+from math import ceil
+
+SAMPLE_ALIGNMENT_FACTOR = 4  # the DMA moves 32-bit words of four samples
+FRACTIONAL_STEPS = 256  # the PIO divider has an 8-bit fractional part
+MIN_DIVIDER = FRACTIONAL_STEPS  # 1.0 in 1/256 units
+MAX_DIVIDER = 65535 * FRACTIONAL_STEPS + FRACTIONAL_STEPS - 1
+MIN_FILL = 0.5  # never give up more than half of the buffer for accuracy
+TOLERANCE = 2e-6  # stop searching once the error is below 2 ppm
+MEMO_SIZE = 16
+
+_plans = {}
+
+
+def _candidate_error(
+    target_frequency, system_frequency, sample_count, duplication_factor, fractional
+):
+    clock_cycles_per_period = system_frequency / target_frequency
+    divider = (
+        duplication_factor * clock_cycles_per_period * FRACTIONAL_STEPS / sample_count
+    )
+    if fractional:
+        divider = int(divider + 0.5)
+    else:
+        divider = int(divider / FRACTIONAL_STEPS + 0.5) * FRACTIONAL_STEPS
+    if divider < MIN_DIVIDER or divider > MAX_DIVIDER:
+        return None, None
+    achieved_frequency = (
+        system_frequency
+        * FRACTIONAL_STEPS
+        * duplication_factor
+        / (divider * sample_count)
+    )
+    return divider, abs(achieved_frequency - target_frequency) / target_frequency
+
+
+def plan_sample_clock(
+    target_frequency, system_frequency, max_sample_count, fractional=True
+):
+    """Choose the sample count, duplication factor and PIO clock divider.
+
+    Returns (sample_count, duplication_factor, divider_integer,
+    divider_fraction). Sample counts are scanned from the largest
+    4-aligned value down to MIN_FILL of the buffer. For each count, the
+    smallest duplication factors that keep the divider at 1.0 or more are
+    tried. The first plan within TOLERANCE wins, so accuracy never costs
+    more samples than it has to. Otherwise the plan with the smallest error
+    wins. A fractional divider makes the PIO alternate between two integer
+    periods, which adds a little jitter. fractional=False keeps the divider
+    integral.
+
+    Plans are memoized per target frequency.
+    """
+    key = (target_frequency, system_frequency, max_sample_count, fractional)
+    plan = _plans.get(key)
+    if plan is not None:
+        return plan
+
+    clock_cycles_per_period = system_frequency / target_frequency
+    largest_count = max_sample_count - max_sample_count % SAMPLE_ALIGNMENT_FACTOR
+    smallest_count = max(
+        SAMPLE_ALIGNMENT_FACTOR,
+        int(largest_count * MIN_FILL)
+        - int(largest_count * MIN_FILL) % SAMPLE_ALIGNMENT_FACTOR,
+    )
+
+    best = None
+    best_error = None
+    for sample_count in range(
+        largest_count, smallest_count - 1, -SAMPLE_ALIGNMENT_FACTOR
+    ):
+        minimum_duplication = max(1, ceil(sample_count / clock_cycles_per_period))
+        for duplication_factor in (minimum_duplication, minimum_duplication + 1):
+            divider, error = _candidate_error(
+                target_frequency,
+                system_frequency,
+                sample_count,
+                duplication_factor,
+                fractional,
+            )
+            if divider is None:
+                continue
+            if best_error is None or error < best_error:
+                best = (sample_count, duplication_factor, divider)
+                best_error = error
+        if best_error is not None and best_error <= TOLERANCE:
+            break
+
+    if best is None:
+        # Below the slowest divider: play one period per buffer as slowly as possible
+        best = (largest_count, 1, MAX_DIVIDER)
+
+    sample_count, duplication_factor, divider = best
+    plan = (
+        sample_count,
+        duplication_factor,
+        divider // FRACTIONAL_STEPS,
+        divider % FRACTIONAL_STEPS,
+    )
+    if len(_plans) >= MEMO_SIZE:
+        _plans.clear()
+    _plans[key] = plan
+    return plan
+
+
+def achieved_frequency(system_frequency, plan):
+    sample_count, duplication_factor, divider_integer, divider_fraction = plan
+    divider = divider_integer + divider_fraction / FRACTIONAL_STEPS
+    return system_frequency * duplication_factor / (divider * sample_count)
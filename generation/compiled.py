@@ -0,0 +1,92 @@
+"""Native and viper builds of the render inner loops.
+
+Each function repeats the arithmetic of the Python kernel of the same name
+line for line, so both produce the same bytes; generation.kernels picks
+them up and benchmarks.kernel_conformance checks them. Importing this
+module fails on firmware without the emitters and on CPython without the
+simulator, which is how kernels.py tells.
+"""
+
+from math import pi, sin
+
+import micropython
+
+from generation.constants import (
+    MAX_VALUE,
+    MIN_VALUE,
+    RESOLUTION,
+    SUM_OFFSET,
+    ParamNames,
+)
+
+
+@micropython.native
+def sine_buffer(values, start, stop, params):
+    angular_factor = 2 * pi
+    for index in range(start, stop):
+        values[index] = sin(angular_factor * values[index])
+
+
+@micropython.native
+def square_buffer(values, start, stop, params):
+    threshold = params[ParamNames.DUTY_CYCLE] / 100.0
+    for index in range(start, stop):
+        values[index] = 1 if values[index] < threshold else -1
+
+
+@micropython.native
+def triangle_buffer(values, start, stop, params):
+    for index in range(start, stop):
+        x = values[index] % 1
+        values[index] = 4 * x - 1 if x < 0.5 else -4 * x + 3
+
+
+@micropython.native
+def sawtooth_buffer(values, start, stop, params):
+    for index in range(start, stop):
+        x = values[index]
+        values[index] = 2 * (x - round(x))
+
+
+@micropython.native
+def quantize_plain(buffer, values, start, stop, amplitude, offset):
+    for index in range(start, stop):
+        sample = int(RESOLUTION * (values[index] * amplitude + offset + SUM_OFFSET))
+        if sample < MIN_VALUE:
+            sample = MIN_VALUE
+        elif sample > MAX_VALUE:
+            sample = MAX_VALUE
+        buffer[index] = sample
+
+
+@micropython.viper
+def fill_codes(buffer, table, settings):
+    # Viper takes at most four arguments, hence the settings array; see
+    # generation.fixed.fill_codes for its layout
+    out = ptr8(buffer)  # noqa: F821
+    shape = ptr16(table)  # noqa: F821
+    setting = ptr32(settings)  # noqa: F821
+    index = setting[0]
+    stop = setting[1]
+    phase = setting[2]
+    increment = setting[3]
+    gain = setting[4]
+    bias = setting[5]
+    index_shift = setting[6]
+    phase_mask = setting[7]
+    code_shift = setting[8]
+    low = int(MIN_VALUE)
+    high = int(MAX_VALUE)
+    while index < stop:
+        # ptr16 loads are unsigned; the table holds signed Q15
+        value = shape[phase >> index_shift]
+        if value & 0x8000:
+            value -= 0x10000
+        code = (value * gain + bias) >> code_shift
+        if code < low:
+            code = low
+        elif code > high:
+            code = high
+        out[index] = code
+        phase = (phase + increment) & phase_mask
+        index += 1
@@ -1,10 +1,20 @@
 SYSTEM_FREQUENCY = 250_000_000
 
+# DAC codes of the 8-bit R2R ladder
+MIN_VALUE = 0
+MAX_VALUE = 255
+RESOLUTION = 256
+SUM_OFFSET = 0.5  # centers the waveform around mid-scale
+
 
 class WaveformEntries:
     PARAMS = "params"
     NAME = "name"
     FUNCTION = "function"
+    BUFFER_FUNCTION = "buffer_function"
+    WAVETABLE = "wavetable"
+    STREAMING = "streaming"
+    FIXED_POINT = "fixed_point"
 
 
 class ParamNames:
@@ -0,0 +1,140 @@
+"""Integer rendering from the phase accumulator to the DAC code.
+
+Shapes come from Q15 tables, sampled like the float wavetables. Each sample
+is scaled, offset and clamped with integer arithmetic only:
+
+    code = (table[phase >> INDEX_SHIFT] * gain + bias) >> CODE_SHIFT
+
+where gain is the amplitude and bias the offset plus mid-scale, both in
+fixed point. gain is Q11 rather than Q16 so that the product of a Q15
+sample and an amplitude of up to 5 stays below 2**30, a small int on the
+Pico that never allocates. The codes stay within one LSB of the float path
+that reads the same table.
+"""
+
+from array import array
+
+from generation import kernels
+from generation.constants import (
+    MAX_VALUE,
+    MIN_VALUE,
+    RESOLUTION,
+    SUM_OFFSET,
+    ParamNames,
+)
+from generation.wavetable import (
+    INDEX_SHIFT,
+    MAX_TABLES,
+    MIN_FREE_BYTES,
+    PHASE_MASK,
+    TABLE_BITS,
+    WavetableBank,
+    build_table,
+    phase_step,
+)
+
+VALUE_BITS = 15
+VALUE_MAX = (1 << VALUE_BITS) - 1
+VALUE_MIN = -(1 << VALUE_BITS)
+GAIN_BITS = 11
+RESOLUTION_BITS = 8  # RESOLUTION == 1 << RESOLUTION_BITS
+# Fraction bits left below one DAC step after a sample is multiplied by gain
+CODE_SHIFT = VALUE_BITS + GAIN_BITS - RESOLUTION_BITS
+FIXED_ENTRY_SIZE = 2
+
+
+def to_fixed_table(table):
+    """Round a float table to Q15, saturating +1.0 to the largest Q15 value."""
+    fixed = array("h", bytearray(len(table) * FIXED_ENTRY_SIZE))
+    for index in range(len(table)):
+        value = int(table[index] * (1 << VALUE_BITS) + 0.5)
+        if value > VALUE_MAX:
+            value = VALUE_MAX
+        elif value < VALUE_MIN:
+            value = VALUE_MIN
+        fixed[index] = value
+    return fixed
+
+
+def scaling(parameters):
+    """(gain, bias) for the amplitude and offset in parameters."""
+    amplitude = parameters.get(ParamNames.AMPLITUDE, 1.0)
+    offset = parameters.get(ParamNames.OFFSET, 0)
+    gain = int(amplitude * (1 << GAIN_BITS) + 0.5)
+    bias = int((offset + SUM_OFFSET) * RESOLUTION * (1 << CODE_SHIFT) + 0.5)
+    return gain, bias
+
+
+def new_settings():
+    """The int array fill_codes reads: start, stop, phase, increment, gain,
+    bias, then the index shift, phase mask and code shift."""
+    return array("i", [0, 0, 0, 0, 0, 0, INDEX_SHIFT, PHASE_MASK, CODE_SHIFT])
+
+
+def fill_codes(buffer, table, settings):
+    """Write DAC codes into buffer[start:stop], starting the table at phase."""
+    (
+        start,
+        stop,
+        phase,
+        increment,
+        gain,
+        bias,
+        index_shift,
+        phase_mask,
+        code_shift,
+    ) = settings
+    for index in range(start, stop):
+        code = (table[phase >> index_shift] * gain + bias) >> code_shift
+        if code < MIN_VALUE:
+            code = MIN_VALUE
+        elif code > MAX_VALUE:
+            code = MAX_VALUE
+        buffer[index] = code
+        phase = (phase + increment) & phase_mask
+
+
+_fill_codes = kernels.select("fill_codes", fill_codes)
+
+
+class FixedTableBank(WavetableBank):
+    """WavetableBank holding Q15 tables, half the size of float ones.
+
+    SampleRenderer asks for a plan once per render and then fills the buffer
+    chunk by chunk; a chunk starts at the phase its first sample would have
+    reached, so chunks can be rendered separately.
+    """
+
+    entry_size = FIXED_ENTRY_SIZE
+
+    def __init__(
+        self, table_bits=TABLE_BITS, max_tables=MAX_TABLES, min_free=MIN_FREE_BYTES
+    ):
+        super().__init__(table_bits, max_tables, min_free)
+        # Reused for every chunk, so filling does not allocate
+        self.settings = new_settings()
+
+    def build(self, waveform, parameters):
+        return to_fixed_table(build_table(waveform, parameters, self.table_size))
+
+    def plan(self, waveform, parameters, count, duplication_factor):
+        """(table, phase, increment, gain, bias), or None without a table."""
+        table = self.lookup(waveform, parameters)
+        if table is None:
+            return None
+        return (
+            (table,)
+            + phase_step(count, duplication_factor, parameters)
+            + scaling(parameters)
+        )
+
+    def fill_codes(self, buffer, start, stop, plan):
+        table, phase, increment, gain, bias = plan
+        settings = self.settings
+        settings[0] = start
+        settings[1] = stop
+        settings[2] = (phase + start * increment) & PHASE_MASK
+        settings[3] = increment
+        settings[4] = gain
+        settings[5] = bias
+        _fill_codes(buffer, table, settings)
@@ -1,7 +1,8 @@
-from generation.waveforms import ParamNames
 from math import sin, pi, sqrt, exp
 from random import random
-from generation.waveforms import ParamNames
+from generation import kernels
+from generation.constants import ParamNames
+from generation.noise import noise_source
 
 
 def sine(x: float, params: dict) -> float:
@@ -70,3 +71,94 @@ def white_noise(x: float, params: dict) -> float:
     return (
         sum([random() - balance_factor for _ in range(quality)]) * normalization_factor
     )
+
+
+# Buffer variants: each one maps positions to values in place over
+# values[start:stop], with the same arithmetic as its per-sample counterpart.
+
+
+def sine_buffer(values, start: int, stop: int, params: dict) -> None:
+    angular_factor = 2 * pi
+    for index in range(start, stop):
+        values[index] = sin(angular_factor * values[index])
+
+
+def square_buffer(values, start: int, stop: int, params: dict) -> None:
+    threshold = params[ParamNames.DUTY_CYCLE] / 100.0
+    for index in range(start, stop):
+        values[index] = 1 if values[index] < threshold else -1
+
+
+def triangle_buffer(values, start: int, stop: int, params: dict) -> None:
+    for index in range(start, stop):
+        x = values[index] % 1
+        values[index] = 4 * x - 1 if x < 0.5 else -4 * x + 3
+
+
+def sawtooth_buffer(values, start: int, stop: int, params: dict) -> None:
+    for index in range(start, stop):
+        x = values[index]
+        values[index] = 2 * (x - round(x))
+
+
+# Compiled by the native emitter where the firmware has it
+sine_buffer = kernels.select("sine_buffer", sine_buffer)
+square_buffer = kernels.select("square_buffer", square_buffer)
+triangle_buffer = kernels.select("triangle_buffer", triangle_buffer)
+sawtooth_buffer = kernels.select("sawtooth_buffer", sawtooth_buffer)
+
+
+def sinc_buffer(values, start: int, stop: int, params: dict) -> None:
+    bandwidth = params[ParamNames.BANDWIDTH]
+    center_shift = 0.5
+    for index in range(start, stop):
+        x = values[index]
+        if x == center_shift:
+            values[index] = 1.0
+        else:
+            scaled = (x - center_shift) / bandwidth
+            values[index] = sin(scaled) / scaled
+
+
+def gaussian_buffer(values, start: int, stop: int, params: dict) -> None:
+    standard_deviation = params[ParamNames.STANDARD_DEVIATION]
+    center_shift = 0.5
+    denominator = 2 * standard_deviation**2
+    for index in range(start, stop):
+        values[index] = exp(-((values[index] - center_shift) ** 2) / denominator)
+
+
+def exponential_buffer(values, start: int, stop: int, params: dict) -> None:
+    time_constant = params[ParamNames.TIME_CONSTANT]
+    for index in range(start, stop):
+        values[index] = exp(-values[index] / time_constant)
+
+
+def pulse_buffer(values, start: int, stop: int, params: dict) -> None:
+    rise_time = params[ParamNames.RISE_TIME]
+    up_time = params[ParamNames.UP_TIME]
+    fall_time = params[ParamNames.FALL_TIME]
+    total_time = rise_time + up_time + fall_time
+    up_end = rise_time + up_time
+    for index in range(start, stop):
+        x = values[index]
+        if x < rise_time:
+            values[index] = x / rise_time
+        elif x < up_end:
+            values[index] = 1.0
+        elif x < total_time:
+            values[index] = 1.0 - (x - rise_time - up_time) / fall_time
+        else:
+            values[index] = 0.0
+
+
+def white_noise_buffer(values, start: int, stop: int, params: dict) -> None:
+    noise_source.white(values, start, stop, params[ParamNames.QUALITY])
+
+
+def pink_noise(x: float, params: dict) -> float:
+    return noise_source.pink_sample()
+
+
+def pink_noise_buffer(values, start: int, stop: int, params: dict) -> None:
+    noise_source.pink(values, start, stop)
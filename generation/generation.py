@@ -5,13 +5,27 @@
 # Sourced from: https://www.instructables.com/Arbitrary-Wave-Generator-With-the-Raspberry-Pi-Pic/
 # Modified by Fabio Vione, March 2024
 
+from generation.budget import BufferBudget, plan_buffer_budget
+from generation.cache import DEFAULT_MAX_BYTES, RenderCache, render_key
+from generation.clock import MAX_DIVIDER, plan_sample_clock
 from generation.constants import ParamNames, WaveformEntries
+from generation.fixed import FixedTableBank
+from generation.render import (  # noqa: F401
+    CHUNK_SIZE,
+    SampleRenderer,
+    apply_function,
+    evaluate_waveform,
+    float_buffer,
+    quantize_values,
+)
 from generation.waveforms import WaveformParams
-from machine import Pin, mem32, freq
+from generation.wavetable import WavetableBank
+from utils.telemetry import telemetry
+from machine import Pin, mem32, freq, disable_irq, enable_irq
 from rp2 import PIO, StateMachine, asm_pio
 from array import array
-from math import floor
 from uctypes import addressof
+import utime
 
 DMA_BASE = 0x50000000
 CH0_READ_ADDR = DMA_BASE + 0x000
@@ -24,11 +38,60 @@ CH1_WRITE_ADDR = DMA_BASE + 0x044
 CH1_TRANS_COUNT = DMA_BASE + 0x048
 CH1_CTRL_TRIG = DMA_BASE + 0x04C
 CH1_AL1_CTRL = DMA_BASE + 0x050
+CHAN_ABORT = DMA_BASE + 0x444
 
 PIO0_BASE = 0x50200000
 PIO0_TXF0 = PIO0_BASE + 0x10
 PIO0_SM0_CLKDIV = PIO0_BASE + 0xC8
 
+TREQ_PIO0_TX0 = 0x00  # paced by the PIO0 TX0 FIFO
+TREQ_UNPACED = 0x3F
+# Words of a buffer pushed before its clock divider is written: the depth of
+# the PIO TX FIFO, so the divider changes as the first of them reaches the pins
+HEAD_WORDS = 4
+
+# Checks for a hot swap that has not landed after the expected period end
+RETARGET_POLLS = 10
+RETARGET_POLL_MS = 1
+STREAM_SEGMENT_COUNT = 4  # a stream plays one sample buffer in this many segments
+# Largest share of a segment's play time that refilling one may take; the
+# stream clock is slowed down until the measured refill time fits
+STREAM_LOAD_PERCENT = 50
+# ...but never below 1/STREAM_MAX_SLOWDOWN of the requested rate. Past that,
+# refills fall behind and segments are replayed, counted as underruns
+STREAM_MAX_SLOWDOWN = 2
+
+# Planning, cache lookup and render, then the switch to the prepared buffer
+_prepare_timer = telemetry.timer("generator.prepare")
+_apply_timer = telemetry.timer("generator.apply")
+_dma_setup_timer = telemetry.timer("dma.setup")
+_retarget_timeouts = telemetry.counter("dma.retarget_timeouts")
+_stream_overruns = telemetry.counter("stream.overruns")
+_stream_underruns = telemetry.counter("stream.underruns")
+_stream_refill_timer = telemetry.timer("stream.refill")
+_stream_rate = telemetry.gauge("stream.sample_rate")
+_stream_requested_rate = telemetry.gauge("stream.requested_rate")
+
+# A buffer is played from a list of control blocks, each the READ_ADDR,
+# WRITE_ADDR, TRANS_COUNT and CTRL_TRIG values CH1 copies into CH0 when CH0
+# finishes the previous block, followed by the buffer's clock divider:
+#   1. the first HEAD_WORDS words of the buffer, into the PIO TX FIFO
+#   2. the divider, into PIO0_SM0_CLKDIV, once the FIFO has room again, which
+#      is when the last word of the previous buffer has left it
+#   3. the rest of the buffer
+#   4. list_pointer, into CH1_READ_ADDR, so CH1 goes back to a list start
+# There is one list per sample buffer being switched between. They live at
+# module level so they are never collected while the DMA is still reading them.
+BLOCK_WORDS = 4
+BLOCK_COUNT = 4
+DIVIDER_WORD = BLOCK_WORDS * BLOCK_COUNT
+control_lists = (
+    array("I", [0] * (DIVIDER_WORD + 1)),
+    array("I", [0] * (DIVIDER_WORD + 1)),
+)
+# Address of the list CH1 starts from at the end of every period
+list_pointer = array("I", [0])
+
 
 # state machine that just pushes bytes to the pins
 @asm_pio(
@@ -53,13 +116,145 @@ def stream():
 def stop_dma_transfer():
     mem32[CH0_AL1_CTRL] = 0
     mem32[CH1_AL1_CTRL] = 0
+    # Clearing EN only pauses a channel, and a paused channel ignores the next
+    # trigger and resumes its old count, so abort both transfers as well
+    mem32[CHAN_ABORT] = 0b11
+    while mem32[CHAN_ABORT]:
+        pass
+
+
+def channel_control(treq, chain_to, incr_read=0, incr_write=0, ring_size=0):
+    """CTRL value of an enabled channel moving 32-bit words. A ring_size
+    wraps the write address; the read address is never wrapped here."""
+    IRQ_QUIET = 0x1  # do not generate an interrupt
+    RING_SEL = 1 if ring_size else 0  # wrap the write address
+    DATA_SIZE = 2  # 32-bit word transfer
+    HIGH_PRIORITY = 1
+    EN = 1
+    return (
+        (IRQ_QUIET << 21)
+        | (treq << 15)
+        | (chain_to << 11)
+        | (RING_SEL << 10)
+        | (ring_size << 6)
+        | (incr_write << 5)
+        | (incr_read << 4)
+        | (DATA_SIZE << 2)
+        | (HIGH_PRIORITY << 1)
+        | (EN << 0)
+    )
 
 
-def start_dma_transfer(data_array, word_count):
+def write_control_list(blocks, data_array, word_count, clock_divider):
+    start_address = addressof(data_array)
+    blocks[DIVIDER_WORD] = clock_divider
+    entries = (
+        (
+            start_address,
+            PIO0_TXF0,
+            HEAD_WORDS,
+            channel_control(TREQ_PIO0_TX0, chain_to=1, incr_read=1),
+        ),
+        (
+            addressof(blocks) + DIVIDER_WORD * 4,
+            PIO0_SM0_CLKDIV,
+            1,
+            channel_control(TREQ_PIO0_TX0, chain_to=1),
+        ),
+        (
+            start_address + HEAD_WORDS * 4,
+            PIO0_TXF0,
+            word_count - HEAD_WORDS,
+            channel_control(TREQ_PIO0_TX0, chain_to=1, incr_read=1),
+        ),
+        (
+            addressof(list_pointer),
+            CH1_READ_ADDR,
+            1,
+            channel_control(TREQ_UNPACED, chain_to=1),
+        ),
+    )
+    index = 0
+    for entry in entries:
+        for value in entry:
+            blocks[index] = value
+            index += 1
+
+
+def start_dma_transfer(data_array, word_count, clock_divider):
+    """Loop data_array through the PIO at clock_divider, from its first word.
+
+    word_count must be larger than HEAD_WORDS.
+    """
     # disable the DMAs to prevent corruption while writing
     stop_dma_transfer()
-    # setup first DMA which does the actual transfer
-    mem32[CH0_READ_ADDR] = addressof(data_array)
+    mem32[PIO0_SM0_CLKDIV] = clock_divider
+    blocks = control_lists[0]
+    write_control_list(blocks, data_array, word_count, clock_divider)
+    list_pointer[0] = addressof(blocks)
+
+    # CH1 copies one control block into CH0, wrapping its write address on
+    # the four CH0 registers, and CH0 chains back to it after every block
+    mem32[CH1_READ_ADDR] = addressof(blocks)
+    mem32[CH1_WRITE_ADDR] = CH0_READ_ADDR
+    mem32[CH1_TRANS_COUNT] = BLOCK_WORDS
+    mem32[CH1_CTRL_TRIG] = channel_control(
+        TREQ_UNPACED,
+        chain_to=1,  # its own number: no chaining
+        incr_read=1,
+        incr_write=1,
+        ring_size=(BLOCK_WORDS * 4).bit_length() - 1,
+    )
+
+
+def retarget_dma_transfer(data_array, word_count, clock_divider):
+    """Switch the running DMA chain to a new buffer at the next period boundary.
+
+    The new buffer gets the control list that is not playing, and pointing
+    list_pointer at it is the whole switch: the last block of the playing
+    list sends CH1 to it, and its own divider block sets the new sample
+    rate as its first word reaches the pins, so the output never stops and
+    each buffer plays at its own rate. Sleeps through the rest of the
+    current period, then returns True once the new buffer is playing, or
+    False if it is not after RETARGET_POLLS checks.
+    """
+    start_address = addressof(data_array)
+    end_address = start_address + word_count * 4
+    blocks = control_lists[0]
+    if list_pointer[0] == addressof(blocks):
+        blocks = control_lists[1]
+    write_control_list(blocks, data_array, word_count, clock_divider)
+
+    irq_state = disable_irq()
+    remaining_words = mem32[CH0_TRANS_COUNT]
+    playing_divider = mem32[PIO0_SM0_CLKDIV]
+    list_pointer[0] = addressof(blocks)
+    enable_irq(irq_state)
+
+    # Four samples per word, each (divider >> 8) / 256 system clocks long
+    utime.sleep_us(
+        remaining_words * 4 * (playing_divider >> 8) * 1_000_000 // (256 * freq())
+    )
+    for _ in range(RETARGET_POLLS):
+        # Past the head, the divider block has run, so the first new word is
+        # on the pins
+        if start_address + HEAD_WORDS * 4 < mem32[CH0_READ_ADDR] <= end_address:
+            return True
+        utime.sleep_ms(RETARGET_POLL_MS)
+    return False
+
+
+def start_segmented_dma_transfer(ring_address, segment_count, first_index, word_count):
+    """Play segments back to back instead of reloading one buffer.
+
+    CH1 reads the next segment address from a ring of segment_count words at
+    ring_address, which must be aligned to its size in bytes. CH1 keeps its
+    read address between triggers and wraps at the end of the ring, so every
+    segment is followed by the next one in the ring. Playback starts with
+    the segment in ring entry first_index.
+    """
+    stop_dma_transfer()
+    mem32[CH0_READ_ADDR] = mem32[ring_address + first_index * 4]
     mem32[CH0_WRITE_ADDR] = PIO0_TXF0
     mem32[CH0_TRANS_COUNT] = word_count
     IRQ_QUIET = 0x1  # do not generate an interrupt
@@ -77,7 +272,7 @@ def start_dma_transfer(data_array, word_count):
         | (TREQ_SEL << 15)
         | (CHAIN_TO << 11)
         | (RING_SEL << 10)
-        | (RING_SIZE << 9)
+        | (RING_SIZE << 6)
         | (INCR_WRITE << 5)
         | (INCR_READ << 4)
         | (DATA_SIZE << 2)
@@ -86,19 +281,18 @@ def start_dma_transfer(data_array, word_count):
     )
     mem32[CH0_AL1_CTRL] = CTRL0
 
-    # setup second DMA which reconfigures the first channel
-    p = array("I", [0])
-    p[0] = addressof(data_array)
-    mem32[CH1_READ_ADDR] = addressof(p)
+    # setup second DMA which walks the ring of segment addresses
+    next_index = (first_index + 1) % segment_count
+    mem32[CH1_READ_ADDR] = ring_address + next_index * 4
     mem32[CH1_WRITE_ADDR] = CH0_READ_ADDR
     mem32[CH1_TRANS_COUNT] = 1
     IRQ_QUIET = 0x1  # do not generate an interrupt
     TREQ_SEL = 0x3F  # no pacing
     CHAIN_TO = 0  # start channel 0 when done
-    RING_SEL = 0
-    RING_SIZE = 0  # no wrapping
+    RING_SEL = 0  # wrap the read address
+    RING_SIZE = (segment_count * 4).bit_length() - 1  # log2 of the ring size in bytes
     INCR_WRITE = 0  # single write
-    INCR_READ = 0  # single read
+    INCR_READ = 1  # step through the ring
     DATA_SIZE = 2  # 32-bit word transfer
     HIGH_PRIORITY = 1
     EN = 1
@@ -107,7 +301,7 @@ def start_dma_transfer(data_array, word_count):
         | (TREQ_SEL << 15)
         | (CHAIN_TO << 11)
         | (RING_SEL << 10)
-        | (RING_SIZE << 9)
+        | (RING_SIZE << 6)
         | (INCR_WRITE << 5)
         | (INCR_READ << 4)
         | (DATA_SIZE << 2)
@@ -117,140 +311,453 @@ def start_dma_transfer(data_array, word_count):
     mem32[CH1_CTRL_TRIG] = CTRL1
 
 
-def evaluate_waveform(waveform, parameters, position):
-    amplitude_multiplier, sum_offset, phase_modulation = (
-        1.0,
-        0.5,  # 0.5 to center the waveform around
-        0.0,
-    )
-
-    if "phasemod" in waveform:
-        phase_modulation = evaluate_waveform(waveform["phasemod"], parameters, position)
-
-    if "mult" in waveform:
-        amplitude_multiplier = evaluate_waveform(waveform["mult"], parameters, position)
-
-    if "sum" in waveform:
-        sum_offset = evaluate_waveform(waveform["sum"], parameters, position)
-
-    position = (
-        position * parameters.get("replicate", 1)
-        - parameters.get("phase", 0)
-        - phase_modulation
-    )
-    position = position - floor(position)  # reduce position to 0.0-1.0 range
-
-    base_amplitude = parameters.get(ParamNames.AMPLITUDE, 1.0)
-
-    value = waveform["function"](position, parameters)
-    value = value * base_amplitude * amplitude_multiplier
-    value = value + parameters.get("offset", 0) + sum_offset
-    return value
-
-
-def start_waveform_generation(buffer, waveform_type, parameters, max_sample_count):
-    MIN_VALUE = 0
-    MAX_VALUE = 255
-    RESOLUTION = 256
-    MAX_CLOCK_DIVIDER = 65535
+def plan_output_clock(parameters, max_sample_count):
+    """Return (sample_count, duplication_factor, clock_divider) for the parameters."""
     CLOCK_DIVIDER_BASE_SHIFT_AMOUNT = 16
     FRACTIONAL_CLOCK_DIVIDER_SHIFT_AMOUNT = 8
-    SAMPLE_ALIGNMENT_FACTOR = 4
-    FRACTIONAL_ROUNDING_OFFSET = 0.5
 
     target_frequency = parameters.get(
         ParamNames.FREQUENCY, WaveformParams.FREQUENCY.min
     )
-    # Determine clock division to accommodate the waveform frequency within the buffer capacity
-    clock_division_factor = freq() / (target_frequency * max_sample_count)
-
-    if clock_division_factor < 1.0:
-        # If the clock cannot be sped up, increase the number of waveform cycles in the buffer
-        waveform_duplication_factor = int(1.0 / clock_division_factor)
-        effective_sample_count = (
-            int(
-                (
-                    max_sample_count
-                    * clock_division_factor
-                    * waveform_duplication_factor
-                    + FRACTIONAL_ROUNDING_OFFSET
-                )
-                / SAMPLE_ALIGNMENT_FACTOR
-            )
-            * SAMPLE_ALIGNMENT_FACTOR
-        )
-        clock_divider_setting = 1
-    else:
-        # Apply integer clock division to match the waveform frequency and buffer capacity
-        clock_divider_setting = int(clock_division_factor) + 1
-        effective_sample_count = (
-            int(
-                (
-                    max_sample_count * clock_division_factor / clock_divider_setting
-                    + FRACTIONAL_ROUNDING_OFFSET
-                )
-                / SAMPLE_ALIGNMENT_FACTOR
-            )
-            * SAMPLE_ALIGNMENT_FACTOR
-        )
-        waveform_duplication_factor = 1
-
-    # Populate the buffer with the generated waveform data
-    for sample_index in range(effective_sample_count):
-        normalized_sample_position = (
-            waveform_duplication_factor
-            * (sample_index + FRACTIONAL_ROUNDING_OFFSET)
-            / effective_sample_count
-        )
-        sample_value = evaluate_waveform(
-            waveform_type, parameters, normalized_sample_position
-        )
-        sample_scaled = int(RESOLUTION * sample_value)
-        sample_clamped = max(MIN_VALUE, min(MAX_VALUE, sample_scaled))
-        buffer[sample_index] = sample_clamped
+    # Pick the sample count, waveform cycles per buffer and clock divider that best match the frequency
+    (
+        effective_sample_count,
+        waveform_duplication_factor,
+        clock_divider_integer_part,
+        clock_divider_fractional_part,
+    ) = plan_sample_clock(target_frequency, freq(), max_sample_count)
 
     # Set the clock divider for the Programmable I/O to match the required waveform generation rate
-    clock_divider_integer_part = min(clock_divider_setting, MAX_CLOCK_DIVIDER)
-    clock_divider_fractional_part = 0  # Use integer division for stability
-
     shifted_clock_divider_integer = (
         clock_divider_integer_part << CLOCK_DIVIDER_BASE_SHIFT_AMOUNT
     )
     shifted_clock_divider_fractional = (
         clock_divider_fractional_part << FRACTIONAL_CLOCK_DIVIDER_SHIFT_AMOUNT
     )
+    clock_divider = shifted_clock_divider_integer | shifted_clock_divider_fractional
+    return effective_sample_count, waveform_duplication_factor, clock_divider
+
+
+def render_waveform(
+    buffer,
+    waveform_type,
+    parameters,
+    max_sample_count,
+    renderer=None,
+    cache=None,
+    abort=None,
+):
+    """Render into buffer and return (word_count, clock_divider), or None if aborted."""
+    SAMPLE_ALIGNMENT_FACTOR = 4
 
-    mem32[PIO0_SM0_CLKDIV] = (
-        shifted_clock_divider_integer | shifted_clock_divider_fractional
-    )
+    (
+        effective_sample_count,
+        waveform_duplication_factor,
+        clock_divider,
+    ) = plan_output_clock(parameters, max_sample_count)
+
+    # Populate the buffer with the generated waveform data, reusing a cached render when available
+    cache_key = None
+    cached_samples = None
+    if cache is not None:
+        cache_key = render_key(
+            waveform_type, parameters, effective_sample_count, clock_divider
+        )
+        cached_samples = cache.get(cache_key)
+
+    if cached_samples is not None:
+        buffer[:effective_sample_count] = cached_samples
+    else:
+        if renderer is None:
+            renderer = SampleRenderer(max_sample_count)
+        completed = renderer.render(
+            buffer,
+            waveform_type,
+            parameters,
+            effective_sample_count,
+            waveform_duplication_factor,
+            abort=abort,
+        )
+        if not completed:
+            return None
+        if cache is not None:
+            cache.put(cache_key, memoryview(buffer)[:effective_sample_count])
 
-    # Initiate the transfer of the generated waveform to the output device
     word_count = int(effective_sample_count / SAMPLE_ALIGNMENT_FACTOR)
-    start_dma_transfer(buffer, word_count)
+    return word_count, clock_divider
+
+
+def program_output(buffer, word_count, clock_divider, hot_swap=False):
+    started = telemetry.start()
+    # Swap buffers under the running DMA, falling back to a restart if the swap never lands
+    if hot_swap:
+        if retarget_dma_transfer(buffer, word_count, clock_divider):
+            telemetry.stop(_dma_setup_timer, started)
+            return
+        telemetry.increment(_retarget_timeouts)
+
+    # Initiate the transfer of the generated waveform to the output device
+    start_dma_transfer(buffer, word_count, clock_divider)
+    telemetry.stop(_dma_setup_timer, started)
+
+
+def start_waveform_generation(
+    buffer,
+    waveform_type,
+    parameters,
+    max_sample_count,
+    renderer=None,
+    cache=None,
+    hot_swap=False,
+):
+    word_count, clock_divider = render_waveform(
+        buffer, waveform_type, parameters, max_sample_count, renderer, cache
+    )
+    program_output(buffer, word_count, clock_divider, hot_swap)
+
+
+class SegmentStream:
+    """Streams a waveform that must not repeat, such as noise, through one
+    sample buffer split into STREAM_SEGMENT_COUNT segments.
+
+    The DMA plays the segments round-robin, and service() renders fresh
+    samples into every segment that has finished playing since the last
+    call. The segment CH0 is reading is never written, nor is one CH0
+    would reach before its refill finished. When service() is called too
+    rarely, or refills are too slow, segments are replayed, which still
+    repeats far less regularly than looping one buffer; every time that
+    happens is counted in underruns.
+
+    Every refill is timed, and set_clock() slows the sample clock down until
+    refilling a segment takes at most STREAM_LOAD_PERCENT of its play time,
+    but not below 1/STREAM_MAX_SLOWDOWN of the requested rate. The rate
+    played and the rate requested are kept in sample_rate and
+    requested_rate, and in the stream.* telemetry gauges, and a slowed clock
+    is logged.
+
+    The other sample buffer is left alone, so the next waveform can be
+    rendered into it while the stream plays.
+    """
+
+    def __init__(self, buffers):
+        self.segment_size = len(buffers[0]) // STREAM_SEGMENT_COUNT
+        self.word_count = self.segment_size // 4
+        # Per buffer, the chunk views of every segment and the segment addresses
+        self.buffer_segments = []
+        self.buffer_addresses = []
+        for buffer in buffers:
+            segments = []
+            addresses = []
+            for index in range(STREAM_SEGMENT_COUNT):
+                start = index * self.segment_size
+                segment = memoryview(buffer)[start : start + self.segment_size]
+                # Views per render chunk, sliced once so refills do not allocate
+                segments.append(
+                    [
+                        segment[chunk : chunk + CHUNK_SIZE]
+                        for chunk in range(0, self.segment_size, CHUNK_SIZE)
+                    ]
+                )
+                addresses.append(addressof(buffer) + start)
+            self.buffer_segments.append(segments)
+            self.buffer_addresses.append(addresses)
+        self.buffer_index = 0
+        self.segments = self.buffer_segments[0]
+        self.addresses = self.buffer_addresses[0]
+        # CH1 wraps its read address on a boundary of the ring size, so the
+        # ring sits at an aligned offset inside storage twice its size
+        ring_bytes = STREAM_SEGMENT_COUNT * 4
+        self._ring_storage = array("I", [0] * (2 * STREAM_SEGMENT_COUNT))
+        self._ring_offset = (-addressof(self._ring_storage) % ring_bytes) // 4
+        self.ring_address = addressof(self._ring_storage) + self._ring_offset * 4
+        self.values = float_buffer(CHUNK_SIZE)
+        self._scratch = bytearray(CHUNK_SIZE)
+        # (waveform, parameters), replaced as a whole so a refill never mixes two
+        self.source = None
+        self.active = False
+        self.next_refill = 0
+        self.refills = 0
+        self.overruns = 0
+        self.underruns = 0
+        self.refill_us = 0  # time the latest segment refill took
+        self.segment_us = 0  # time a segment plays at the current clock
+        self.sample_rate = 0
+        self.requested_rate = 0
+        self.deadline = None  # ticks_us by which the next refill must start
+
+    def set_source(self, waveform, parameters):
+        self.source = (waveform, parameters)
+
+    def fill_chunk(self, chunk, waveform, parameters):
+        values = self.values
+        count = len(chunk)
+        apply_function(waveform, values, 0, count, parameters)
+        quantize_values(chunk, values, 0, count, parameters, None, None)
+
+    def fill_segment(self, chunks):
+        started = utime.ticks_us()
+        waveform, parameters = self.source
+        for chunk in chunks:
+            self.fill_chunk(chunk, waveform, parameters)
+        self.refill_us = utime.ticks_diff(utime.ticks_us(), started)
+        telemetry.record(_stream_refill_timer, self.refill_us)
+
+    def measure(self, waveform, parameters):
+        """Estimate the refill time for another source from one scratch chunk."""
+        started = utime.ticks_us()
+        self.fill_chunk(self._scratch, waveform, parameters)
+        elapsed = utime.ticks_diff(utime.ticks_us(), started)
+        self.refill_us = elapsed * self.segment_size // CHUNK_SIZE
+
+    def clock_divider(self, requested):
+        """requested, or the fastest divider at which refills keep up, up to
+        STREAM_MAX_SLOWDOWN times requested."""
+        # System clocks per sample, in 1/256 steps and rounded up, if a
+        # refill may only take STREAM_LOAD_PERCENT of the time a segment plays
+        refill_cycles = freq() // 1_000_000 * self.refill_us * 256 * 100
+        share = STREAM_LOAD_PERCENT * self.segment_size
+        fastest = (refill_cycles + share - 1) // share
+        slowest = min(requested * STREAM_MAX_SLOWDOWN, MAX_DIVIDER << 8)
+        return max(requested, min(fastest << 8, slowest))
+
+    def set_clock(self, clock_divider):
+        """Set the sample clock, slowed down to what refills sustain. Core 0 only."""
+        requested_rate = 256 * freq() // (clock_divider >> 8)
+        clock_divider = self.clock_divider(clock_divider)
+        mem32[PIO0_SM0_CLKDIV] = clock_divider
+        self.segment_us = (
+            self.segment_size * (clock_divider >> 8) * 1_000_000 // (256 * freq())
+        )
+        sample_rate = 256 * freq() // (clock_divider >> 8)
+        if sample_rate != requested_rate and (
+            sample_rate != self.sample_rate or requested_rate != self.requested_rate
+        ):
+            print("stream: %d S/s of %d S/s requested" % (sample_rate, requested_rate))
+        self.sample_rate = sample_rate
+        self.requested_rate = requested_rate
+        telemetry.set(_stream_rate, sample_rate)
+        telemetry.set(_stream_requested_rate, requested_rate)
+        # Work the deadline out again at the new rate on the next service()
+        self.deadline = None
+
+    def service_interval_ms(self):
+        """How long the caller may wait between service() calls: half a segment."""
+        return max(1, self.segment_us // 2000)
+
+    def fill(self, index):
+        """Render segment index of the buffer being played."""
+        self.fill_segment(self.segments[index])
+
+    def fill_buffer(self, buffer_index, abort=None):
+        """Render every segment of a buffer. Returns False if abort() stopped it."""
+        for chunks in self.buffer_segments[buffer_index]:
+            if abort is not None and abort():
+                return False
+            self.fill_segment(chunks)
+        return True
+
+    def play(self, buffer_index, clock_divider):
+        stop_dma_transfer()
+        self.buffer_index = buffer_index
+        self.segments = self.buffer_segments[buffer_index]
+        self.addresses = self.buffer_addresses[buffer_index]
+        for index, address in enumerate(self.addresses):
+            self._ring_storage[self._ring_offset + index] = address
+        self.set_clock(clock_divider)
+        start_segmented_dma_transfer(
+            self.ring_address, STREAM_SEGMENT_COUNT, 0, self.word_count
+        )
+        self.next_refill = 0
+        self.active = True
+
+    def playing_segment(self):
+        address = mem32[CH0_READ_ADDR]
+        for index, start in enumerate(self.addresses):
+            if start <= address < start + self.segment_size:
+                return index
+        # CH0 has finished a segment and CH1 has not yet loaded the next one
+        for index, start in enumerate(self.addresses):
+            if address == start + self.segment_size:
+                return index
+        return None
+
+    def time_until(self, index):
+        """Microseconds until CH0 starts reading segment index again."""
+        playing = self.playing_segment()
+        if playing is None or playing == index:
+            return 0
+        ahead = (index - playing - 1) % STREAM_SEGMENT_COUNT
+        return (
+            ahead * self.segment_us
+            + mem32[CH0_TRANS_COUNT] * self.segment_us // self.word_count
+        )
+
+    def service(self):
+        """Refill the segments played since the last call. Returns how many.
+
+        Only reads the DMA registers, so it can run on core 1.
+        """
+        if not self.active:
+            return 0
+        if (
+            self.deadline is not None
+            and utime.ticks_diff(utime.ticks_us(), self.deadline) > 0
+        ):
+            # CH0 has gone back into a segment that was never refilled
+            self.underruns += 1
+            telemetry.increment(_stream_underruns)
+            self.deadline = None
+        playing = self.playing_segment()
+        if playing is None:
+            return 0
+        refilled = 0
+        while self.next_refill != playing:
+            index = self.next_refill
+            self.next_refill = (index + 1) % STREAM_SEGMENT_COUNT
+            if self.refill_us > self.time_until(index):
+                # Replayed as it is rather than read while being rendered
+                self.underruns += 1
+                telemetry.increment(_stream_underruns)
+                continue
+            self.fill(index)
+            if self.playing_segment() == index:
+                # The DMA came all the way round before the refill finished
+                self.overruns += 1
+                telemetry.increment(_stream_overruns)
+            refilled += 1
+        self.refills += refilled
+        # Every segment but the playing one is fresh now, and that one comes
+        # round again after the rest of it and all the others have played
+        self.deadline = utime.ticks_add(
+            utime.ticks_us(),
+            (STREAM_SEGMENT_COUNT - 1) * self.segment_us
+            + mem32[CH0_TRANS_COUNT] * self.segment_us // self.word_count,
+        )
+        return refilled
+
+    def stop(self):
+        self.active = False
 
 
 class WaveformGenerator:
-    def __init__(self, maxnsamp=4096):
-        self.maxnsamp = maxnsamp
+    def __init__(self, maxnsamp=None, cache_bytes=DEFAULT_MAX_BYTES):
+        # Without an explicit size, take the largest buffer the free heap allows
+        self.budget = (
+            plan_buffer_budget() if maxnsamp is None else BufferBudget(maxnsamp)
+        )
+        self.maxnsamp = self.budget.sample_budget
         self.current_buffer_index = 0
         self.buffer = {}
         self.buffer[0] = bytearray(self.maxnsamp)
         self.buffer[1] = bytearray(self.maxnsamp)
+        self.renderer = SampleRenderer(
+            self.maxnsamp, wavetables=WavetableBank(), fixed_tables=FixedTableBank()
+        )
+        self.cache = RenderCache(cache_bytes)
+        self.stream = SegmentStream((self.buffer[0], self.buffer[1]))
+        self.running = False
         self.state_machine = StateMachine(0, stream, out_base=Pin(0))
         self.state_machine.active(1)
+        self.budget.measure_headroom()
 
-    def _switch_buffer(self):
-        self.current_buffer_index = (self.current_buffer_index + 1) % 2
+    def _idle_buffer_index(self):
+        return (self.current_buffer_index + 1) % 2
 
-    def start(self, waveform):
+    def prepare(self, waveform, abort=None):
+        """Render waveform into the idle buffer without touching the output.
+
+        Safe to call from the render worker. Returns what apply() needs, or None
+        if abort() stopped the render.
+        """
+        started = telemetry.start()
         parameters = {
             param.name: param.current_value
             for param in waveform[WaveformEntries.PARAMS]
         }
-        self._switch_buffer()
-        start_waveform_generation(
-            self.buffer[self.current_buffer_index], waveform, parameters, self.maxnsamp
+        if waveform.get(WaveformEntries.STREAMING):
+            prepared = self._prepare_stream(waveform, parameters, abort)
+        else:
+            prepared = self._prepare_buffer(waveform, parameters, abort)
+        if prepared is not None:
+            telemetry.stop(_prepare_timer, started)
+        return prepared
+
+    def _prepare_buffer(self, waveform, parameters, abort):
+        buffer_index = self._idle_buffer_index()
+        output_settings = render_waveform(
+            self.buffer[buffer_index],
+            waveform,
+            parameters,
+            self.budget.sample_limit(waveform),
+            renderer=self.renderer,
+            cache=self.cache,
+            abort=abort,
         )
+        if output_settings is None:
+            return None
+        return (buffer_index,) + output_settings + (None,)
+
+    def _prepare_stream(self, waveform, parameters, abort):
+        _, _, clock_divider = plan_output_clock(
+            parameters, self.budget.sample_limit(waveform)
+        )
+        stream_source = (waveform, parameters)
+        if self.stream.active:
+            # New settings reach the output as the played segments are
+            # refilled; the clock is set for their refill time
+            self.stream.measure(waveform, parameters)
+            return (None, self.stream.word_count, clock_divider, stream_source)
+
+        buffer_index = self._idle_buffer_index()
+        self.stream.set_source(waveform, parameters)
+        if not self.stream.fill_buffer(buffer_index, abort):
+            return None
+        return (buffer_index, self.stream.word_count, clock_divider, stream_source)
+
+    def apply(self, prepared):
+        """Switch the output to a prepared buffer, without stopping a running output."""
+        started = telemetry.start()
+        buffer_index, word_count, clock_divider, stream_source = prepared
+        if stream_source is not None:
+            self._apply_stream(buffer_index, clock_divider, stream_source)
+        else:
+            # CH1 walks the segment ring during a stream, so leaving one
+            # restarts the DMA
+            hot_swap = self.running and not self.stream.active
+            self.stream.stop()
+            self.current_buffer_index = buffer_index
+            program_output(
+                self.buffer[buffer_index], word_count, clock_divider, hot_swap=hot_swap
+            )
+            self.running = True
+        telemetry.stop(_apply_timer, started)
+
+    def _apply_stream(self, buffer_index, clock_divider, stream_source):
+        self.stream.set_source(*stream_source)
+        if self.stream.active:
+            self.stream.set_clock(clock_divider)
+            return
+
+        if buffer_index is None:
+            # The stream was stopped after prepare() found it running
+            buffer_index = self._idle_buffer_index()
+            self.stream.fill_buffer(buffer_index)
+        self.current_buffer_index = buffer_index
+        self.stream.play(buffer_index, clock_divider)
+        self.running = True
+
+    def service(self):
+        """Keep a streaming output fed. The render worker calls it on core 1,
+        at least every service_interval_ms() while a stream is active."""
+        return self.stream.service()
+
+    def service_interval_ms(self):
+        return self.stream.service_interval_ms()
+
+    def start(self, waveform):
+        self.apply(self.prepare(waveform))
 
     def stop(self):
         stop_dma_transfer()
+        self.stream.stop()
+        self.running = False
@@ -0,0 +1,31 @@
+"""Render inner loops, compiled by MicroPython's native and viper emitters.
+
+Each hot loop is written once in plain Python next to its caller, which
+passes it to select() at import. Where generation.compiled imports, which
+is MicroPython firmware built with the code emitters, select() returns the
+compiled variant of the same name instead. On CPython it imports only with
+the simulator installed, whose emitters run the compiled variants as plain
+Python; otherwise the Python function is used unchanged.
+
+Every choice is recorded in KERNELS, so benchmarks.kernel_conformance can
+run both variants on the same input.
+"""
+
+try:
+    from generation import compiled
+except (ImportError, SyntaxError, ValueError):
+    # CPython without the simulator, firmware without the native or viper
+    # emitter, or a .mpy built for another architecture
+    compiled = None
+
+COMPILED = compiled is not None
+
+# (name, python function, chosen function) for every selected kernel
+KERNELS = []
+
+
+def select(name, python_function):
+    """The compiled kernel called name if there is one, else python_function."""
+    chosen = getattr(compiled, name, python_function)
+    KERNELS.append((name, python_function, chosen))
+    return chosen
@@ -0,0 +1,169 @@
+from math import log, sqrt
+
+from generation.render import float_buffer
+
+UNIFORM_RANGE = 1 << 16
+UNIFORM_CENTER = UNIFORM_RANGE // 2
+GAUSSIAN_TABLE_BITS = 10
+GAUSSIAN_TABLE_SHIFT = 16 - GAUSSIAN_TABLE_BITS
+# From this many summed draws on, the sum is close enough to a normal
+# distribution that it is read from the inverse-CDF table instead
+GAUSSIAN_QUALITY = 4
+PINK_ROWS = 12
+PINK_COUNTER_MASK = (1 << PINK_ROWS) - 1
+
+_gaussian_table = None
+
+
+def _normal_quantile(p):
+    # Acklam's rational approximation of the inverse normal CDF
+    a = (
+        -3.969683028665376e01,
+        2.209460984245205e02,
+        -2.759285104469687e02,
+        1.383577518672690e02,
+        -3.066479806614716e01,
+        2.506628277459239e00,
+    )
+    b = (
+        -5.447609879822406e01,
+        1.615858368580409e02,
+        -1.556989798598866e02,
+        6.680131188771972e01,
+        -1.328068155288572e01,
+    )
+    c = (
+        -7.784894002430293e-03,
+        -3.223964580411365e-01,
+        -2.400758277161838e00,
+        -2.549732539343734e00,
+        4.374664141464968e00,
+        2.938163982698783e00,
+    )
+    d = (
+        7.784695709041462e-03,
+        3.224671290700398e-01,
+        2.445134137142996e00,
+        3.754408661907416e00,
+    )
+    if p < 0.02425 or p > 0.97575:
+        q = sqrt(-2 * log(min(p, 1 - p)))
+        x = (((((c[0] * q + c[1]) * q + c[2]) * q + c[3]) * q + c[4]) * q + c[5]) / (
+            (((d[0] * q + d[1]) * q + d[2]) * q + d[3]) * q + 1
+        )
+        return x if p < 0.5 else -x
+    q = p - 0.5
+    r = q * q
+    return (
+        (((((a[0] * r + a[1]) * r + a[2]) * r + a[3]) * r + a[4]) * r + a[5])
+        * q
+        / (((((b[0] * r + b[1]) * r + b[2]) * r + b[3]) * r + b[4]) * r + 1)
+    )
+
+
+def gaussian_table():
+    """Standard normal quantiles at the center of each slot, scaled to unit variance."""
+    global _gaussian_table
+    if _gaussian_table is None:
+        size = 1 << GAUSSIAN_TABLE_BITS
+        table = float_buffer(size)
+        power = 0.0
+        for index in range(size):
+            table[index] = _normal_quantile((index + 0.5) / size)
+            power += table[index] * table[index]
+        correction = 1 / sqrt(power / size)
+        for index in range(size):
+            table[index] *= correction
+        _gaussian_table = table
+    return _gaussian_table
+
+
+class NoiseSource:
+    """White and pink noise from an integer xorshift generator.
+
+    The generator runs on two 16-bit words (shifts 5, 3, 1), which gives
+    a period of 2**32 - 1. Every intermediate value stays a small int on
+    MicroPython, so filling a buffer never allocates. All state carries
+    over between calls, so consecutive buffers continue one stream.
+    """
+
+    def __init__(self, seed=0x2545F491):
+        self.x = (seed >> 16) & 0xFFFF
+        self.y = seed & 0xFFFF
+        if self.x == 0 and self.y == 0:
+            self.y = 1
+        self.pink_rows = [0] * PINK_ROWS
+        self.pink_total = 0
+        self.pink_counter = 0
+        self._sample = float_buffer(1)
+
+    def white(self, values, start, stop, quality=1):
+        """Unit-variance white noise, the sum of `quality` uniform draws."""
+        x = self.x
+        y = self.y
+        if quality >= GAUSSIAN_QUALITY:
+            table = gaussian_table()
+            for index in range(start, stop):
+                t = (x ^ (x << 5)) & 0xFFFF
+                x = y
+                y = (y ^ (y >> 1)) ^ (t ^ (t >> 3))
+                values[index] = table[y >> GAUSSIAN_TABLE_SHIFT]
+        else:
+            scale = sqrt(12 / quality) / UNIFORM_RANGE
+            offset = quality * UNIFORM_CENTER
+            draws = range(quality)
+            for index in range(start, stop):
+                total = 0
+                for _ in draws:
+                    t = (x ^ (x << 5)) & 0xFFFF
+                    x = y
+                    y = (y ^ (y >> 1)) ^ (t ^ (t >> 3))
+                    total += y
+                values[index] = (total - offset) * scale
+        self.x = x
+        self.y = y
+
+    def pink(self, values, start, stop):
+        """Unit-variance pink (1/f) noise with the Voss-McCartney algorithm.
+
+        Row k of PINK_ROWS is redrawn every 2**k samples, and the output is
+        the sum of all rows plus one fresh white draw.
+        """
+        x = self.x
+        y = self.y
+        rows = self.pink_rows
+        total = self.pink_total
+        counter = self.pink_counter
+        scale = sqrt(12 / (PINK_ROWS + 1)) / UNIFORM_RANGE
+        for index in range(start, stop):
+            counter = (counter + 1) & PINK_COUNTER_MASK
+            if counter:
+                row = 0
+                bits = counter
+                while not bits & 1:
+                    bits >>= 1
+                    row += 1
+                t = (x ^ (x << 5)) & 0xFFFF
+                x = y
+                y = (y ^ (y >> 1)) ^ (t ^ (t >> 3))
+                total += y - UNIFORM_CENTER - rows[row]
+                rows[row] = y - UNIFORM_CENTER
+            t = (x ^ (x << 5)) & 0xFFFF
+            x = y
+            y = (y ^ (y >> 1)) ^ (t ^ (t >> 3))
+            values[index] = (total + y - UNIFORM_CENTER) * scale
+        self.x = x
+        self.y = y
+        self.pink_total = total
+        self.pink_counter = counter
+
+    def white_sample(self, quality=1):
+        self.white(self._sample, 0, 1, quality)
+        return self._sample[0]
+
+    def pink_sample(self):
+        self.pink(self._sample, 0, 1)
+        return self._sample[0]
+
+
+noise_source = NoiseSource()
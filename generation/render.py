@@ -0,0 +1,353 @@
+import sys
+from array import array
+from math import floor
+
+from generation import kernels
+from generation.constants import (
+    MAX_VALUE,
+    MIN_VALUE,
+    RESOLUTION,
+    SUM_OFFSET,
+    ParamNames,
+    WaveformEntries,
+)
+from utils.telemetry import telemetry
+
+# Scratch buffers hold the platform's native float, so the batch path produces
+# exactly the same bytes as the per-sample path: single precision on the Pico,
+# double precision on a host running CPython.
+if sys.implementation.name == "micropython":
+    FLOAT_TYPECODE = "f"
+    FLOAT_SIZE = 4
+else:
+    FLOAT_TYPECODE = "d"
+    FLOAT_SIZE = 8
+
+FRACTIONAL_ROUNDING_OFFSET = 0.5
+COMPONENTS = ("phasemod", "mult", "sum")
+CHUNK_SIZE = 256  # samples rendered between abort checks
+# Parameters applied after the shape is evaluated; changing only these keeps the shape
+LINEAR_PARAMS = (ParamNames.AMPLITUDE, ParamNames.OFFSET)
+
+RENDER_FULL = "full"
+RENDER_SCALE_ONLY = "scale-only"
+RENDER_FIXED = "fixed-point"
+
+_fill_timer = telemetry.timer("render.fill")
+_aborted_renders = telemetry.counter("render.aborted")
+# How many renders took each path, so "stats" shows it with verbose off
+_path_counters = {
+    RENDER_FULL: telemetry.counter("render.path.full"),
+    RENDER_SCALE_ONLY: telemetry.counter("render.path.scale"),
+    RENDER_FIXED: telemetry.counter("render.path.fixed"),
+}
+
+
+def float_buffer(size):
+    return array(FLOAT_TYPECODE, bytearray(size * FLOAT_SIZE))
+
+
+def evaluate_waveform(waveform, parameters, position):
+    amplitude_multiplier, sum_offset, phase_modulation = (
+        1.0,
+        SUM_OFFSET,
+        0.0,
+    )
+
+    if "phasemod" in waveform:
+        phase_modulation = evaluate_waveform(waveform["phasemod"], parameters, position)
+
+    if "mult" in waveform:
+        amplitude_multiplier = evaluate_waveform(waveform["mult"], parameters, position)
+
+    if "sum" in waveform:
+        sum_offset = evaluate_waveform(waveform["sum"], parameters, position)
+
+    position = (
+        position * parameters.get("replicate", 1)
+        - parameters.get("phase", 0)
+        - phase_modulation
+    )
+    position = position - floor(position)  # reduce position to 0.0-1.0 range
+
+    base_amplitude = parameters.get(ParamNames.AMPLITUDE, 1.0)
+
+    value = waveform["function"](position, parameters)
+    value = value * base_amplitude * amplitude_multiplier
+    value = value + parameters.get(ParamNames.OFFSET, 0) + sum_offset
+    return value
+
+
+def fill_positions(
+    values, start, stop, count, duplication_factor, parameters, phase_modulation
+):
+    # Same arithmetic as evaluate_waveform, one pass over values[start:stop]
+    replicate = parameters.get("replicate", 1)
+    phase = parameters.get("phase", 0)
+    for index in range(start, stop):
+        position = (
+            duplication_factor * (index + FRACTIONAL_ROUNDING_OFFSET) / count
+        ) * replicate - phase
+        if phase_modulation is not None:
+            position -= phase_modulation[index]
+        values[index] = position - floor(position)
+
+
+def apply_function(waveform, values, start, stop, parameters):
+    buffer_function = waveform.get(WaveformEntries.BUFFER_FUNCTION)
+    if buffer_function is not None:
+        buffer_function(values, start, stop, parameters)
+        return
+    # Composed waveforms may use plain functions without a buffer variant
+    function = waveform[WaveformEntries.FUNCTION]
+    for index in range(start, stop):
+        values[index] = function(values[index], parameters)
+
+
+def scale_values(values, start, stop, parameters, multiplier, sum_offset):
+    amplitude = parameters.get(ParamNames.AMPLITUDE, 1.0)
+    offset = parameters.get(ParamNames.OFFSET, 0)
+    for index in range(start, stop):
+        value = values[index] * amplitude
+        value = value * (multiplier[index] if multiplier is not None else 1.0)
+        values[index] = (
+            value
+            + offset
+            + (sum_offset[index] if sum_offset is not None else SUM_OFFSET)
+        )
+
+
+def quantize_plain(buffer, values, start, stop, amplitude, offset):
+    for index in range(start, stop):
+        sample = int(RESOLUTION * (values[index] * amplitude + offset + SUM_OFFSET))
+        if sample < MIN_VALUE:
+            sample = MIN_VALUE
+        elif sample > MAX_VALUE:
+            sample = MAX_VALUE
+        buffer[index] = sample
+
+
+_quantize_plain = kernels.select("quantize_plain", quantize_plain)
+
+
+def quantize_values(buffer, values, start, stop, parameters, multiplier, sum_offset):
+    amplitude = parameters.get(ParamNames.AMPLITUDE, 1.0)
+    offset = parameters.get(ParamNames.OFFSET, 0)
+    if multiplier is None and sum_offset is None:
+        _quantize_plain(buffer, values, start, stop, amplitude, offset)
+        return
+
+    for index in range(start, stop):
+        value = values[index] * amplitude
+        value = value * (multiplier[index] if multiplier is not None else 1.0)
+        value = (
+            value
+            + offset
+            + (sum_offset[index] if sum_offset is not None else SUM_OFFSET)
+        )
+        sample = int(RESOLUTION * value)
+        if sample < MIN_VALUE:
+            sample = MIN_VALUE
+        elif sample > MAX_VALUE:
+            sample = MAX_VALUE
+        buffer[index] = sample
+
+
+class SampleRenderer:
+    """Fills a sample buffer in whole-buffer passes instead of per sample.
+
+    Composition (phasemod, mult, sum) is resolved once per buffer: every
+    component is rendered into its own scratch buffer before the parent
+    shape is evaluated. With a WavetableBank, shapes that have a wavetable
+    and no phase modulation are resampled from it instead of evaluated.
+
+    The top-level shape is rendered in chunks so a caller can abort a render
+    that has been superseded.
+
+    The unscaled shape of the last complete render is kept in self.values.
+    When the next render differs only in LINEAR_PARAMS, only the scale,
+    offset and clamp pass is run again.
+
+    With a FixedTableBank, waveforms flagged WaveformEntries.FIXED_POINT and
+    without components skip the float buffer and go from the phase
+    accumulator to DAC codes in integer arithmetic.
+    """
+
+    def __init__(
+        self, max_sample_count, wavetables=None, fixed_tables=None, verbose=False
+    ):
+        self.max_sample_count = max_sample_count
+        self.wavetables = wavetables
+        self.fixed_tables = fixed_tables
+        self.verbose = verbose
+        self.values = float_buffer(max_sample_count)
+        self.last_path = None
+        self._scratch = {}
+        self._shape_key = None
+
+    def _make_shape_key(self, waveform, parameters, sample_count, duplication_factor):
+        for component in COMPONENTS:
+            # Components are scaled by the shared amplitude, so they are not linear
+            if component in waveform:
+                return None
+        shape_params = sorted(
+            item for item in parameters.items() if item[0] not in LINEAR_PARAMS
+        )
+        return (waveform, tuple(shape_params), sample_count, duplication_factor)
+
+    def invalidate(self):
+        """Forget the kept shape so the next render runs in full."""
+        self._shape_key = None
+
+    def _scratch_buffer(self, level, component):
+        key = (level, component)
+        if key not in self._scratch:
+            self._scratch[key] = float_buffer(self.max_sample_count)
+        return self._scratch[key]
+
+    def _render_components(
+        self, waveform, parameters, count, duplication_factor, level
+    ):
+        components = {}
+        for component in COMPONENTS:
+            if component in waveform:
+                component_values = self._scratch_buffer(level, component)
+                self._evaluate_scaled(
+                    waveform[component],
+                    parameters,
+                    component_values,
+                    count,
+                    duplication_factor,
+                    level + 1,
+                )
+                components[component] = component_values
+        return components
+
+    def _fill_from_wavetable(
+        self, waveform, parameters, values, count, duplication_factor, components
+    ):
+        return (
+            "phasemod" not in components
+            and self.wavetables is not None
+            and self.wavetables.fill(
+                waveform, parameters, values, count, duplication_factor
+            )
+        )
+
+    def _fixed_plan(self, waveform, parameters, sample_count, duplication_factor):
+        if self.fixed_tables is None or not waveform.get(WaveformEntries.FIXED_POINT):
+            return None
+        for component in COMPONENTS:
+            if component in waveform:
+                return None
+        return self.fixed_tables.plan(
+            waveform, parameters, sample_count, duplication_factor
+        )
+
+    def _take_path(self, path):
+        self.last_path = path
+        telemetry.increment(_path_counters[path])
+        if self.verbose:
+            print("render:", path)
+
+    def _render_fixed(self, buffer, plan, sample_count, abort):
+        # self.values is not touched, so a kept shape stays valid
+        self._take_path(RENDER_FIXED)
+        started = telemetry.start()
+        for start in range(0, sample_count, CHUNK_SIZE):
+            if abort is not None and abort():
+                telemetry.increment(_aborted_renders)
+                return False
+            stop = min(start + CHUNK_SIZE, sample_count)
+            self.fixed_tables.fill_codes(buffer, start, stop, plan)
+        telemetry.stop(_fill_timer, started)
+        return True
+
+    def _evaluate_scaled(
+        self, waveform, parameters, values, count, duplication_factor, level
+    ):
+        components = self._render_components(
+            waveform, parameters, count, duplication_factor, level
+        )
+        if not self._fill_from_wavetable(
+            waveform, parameters, values, count, duplication_factor, components
+        ):
+            fill_positions(
+                values,
+                0,
+                count,
+                count,
+                duplication_factor,
+                parameters,
+                components.get("phasemod"),
+            )
+            apply_function(waveform, values, 0, count, parameters)
+        scale_values(
+            values, 0, count, parameters, components.get("mult"), components.get("sum")
+        )
+
+    def render(
+        self,
+        buffer,
+        waveform,
+        parameters,
+        sample_count,
+        duplication_factor,
+        abort=None,
+    ):
+        """Render into buffer[:sample_count]; returns False if abort() asked to stop."""
+        plan = self._fixed_plan(waveform, parameters, sample_count, duplication_factor)
+        if plan is not None:
+            return self._render_fixed(buffer, plan, sample_count, abort)
+
+        values = self.values
+        shape_key = self._make_shape_key(
+            waveform, parameters, sample_count, duplication_factor
+        )
+        if shape_key is not None and shape_key == self._shape_key:
+            path = RENDER_SCALE_ONLY
+            phase_modulation = multiplier = sum_offset = None
+            shape_ready = True
+        else:
+            # self.values is about to be overwritten, so the kept shape is lost
+            self._shape_key = None
+            path = RENDER_FULL
+            components = self._render_components(
+                waveform, parameters, sample_count, duplication_factor, 0
+            )
+            phase_modulation = components.get("phasemod")
+            multiplier = components.get("mult")
+            sum_offset = components.get("sum")
+            shape_ready = self._fill_from_wavetable(
+                waveform,
+                parameters,
+                values,
+                sample_count,
+                duplication_factor,
+                components,
+            )
+        self._take_path(path)
+
+        started = telemetry.start()
+        for start in range(0, sample_count, CHUNK_SIZE):
+            if abort is not None and abort():
+                telemetry.increment(_aborted_renders)
+                return False
+            stop = min(start + CHUNK_SIZE, sample_count)
+            if not shape_ready:
+                fill_positions(
+                    values,
+                    start,
+                    stop,
+                    sample_count,
+                    duplication_factor,
+                    parameters,
+                    phase_modulation,
+                )
+                apply_function(waveform, values, start, stop, parameters)
+            quantize_values(
+                buffer, values, start, stop, parameters, multiplier, sum_offset
+            )
+        telemetry.stop(_fill_timer, started)
+        self._shape_key = shape_key
+        return True
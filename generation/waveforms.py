@@ -16,7 +16,19 @@ from generation.functions import (
     gaussian,
     exponential,
     white_noise,
+    pink_noise,
+    sine_buffer,
+    square_buffer,
+    triangle_buffer,
+    sawtooth_buffer,
+    pulse_buffer,
+    sinc_buffer,
+    gaussian_buffer,
+    exponential_buffer,
+    white_noise_buffer,
+    pink_noise_buffer,
 )
+from generation.noise import GAUSSIAN_QUALITY
 
 
 class WaveformParams:
@@ -74,6 +86,7 @@ class WaveformParams:
         ParamNames.OFFSET,
         ParamShortNames.OFFSET,
         min=-5.0,
+        default=0.0,
         max=5.0,
         step=0.1,
     )
@@ -81,7 +94,8 @@ class WaveformParams:
         ParamNames.QUALITY,
         ParamShortNames.QUALITY,
         min=1,
-        max=100,
+        # Every quality from GAUSSIAN_QUALITY up reads the same Gaussian table
+        max=GAUSSIAN_QUALITY,
         step=1,
     )
     RISE_TIME = WaveformControl(
@@ -112,6 +126,9 @@ WAVEFORMS = [
         WaveformEntries.NAME: WaveformNames.SINE,
         WaveformEntries.PARAMS: [WaveformParams.FREQUENCY, WaveformParams.AMPLITUDE],
         WaveformEntries.FUNCTION: sine,
+        WaveformEntries.BUFFER_FUNCTION: sine_buffer,
+        WaveformEntries.WAVETABLE: (),
+        WaveformEntries.FIXED_POINT: True,
     },
     {
         WaveformEntries.NAME: WaveformNames.SQUARE,
@@ -121,16 +138,25 @@ WAVEFORMS = [
             WaveformParams.DUTY_CYCLE,
         ],
         WaveformEntries.FUNCTION: square,
+        WaveformEntries.BUFFER_FUNCTION: square_buffer,
+        WaveformEntries.WAVETABLE: (ParamNames.DUTY_CYCLE,),
+        WaveformEntries.FIXED_POINT: True,
     },
     {
         WaveformEntries.NAME: WaveformNames.TRIANGLE,
         WaveformEntries.PARAMS: [WaveformParams.FREQUENCY, WaveformParams.AMPLITUDE],
         WaveformEntries.FUNCTION: triangle,
+        WaveformEntries.BUFFER_FUNCTION: triangle_buffer,
+        WaveformEntries.WAVETABLE: (),
+        WaveformEntries.FIXED_POINT: True,
     },
     {
         WaveformEntries.NAME: WaveformNames.SAWTOOTH,
         WaveformEntries.PARAMS: [WaveformParams.FREQUENCY, WaveformParams.AMPLITUDE],
         WaveformEntries.FUNCTION: sawtooth,
+        WaveformEntries.BUFFER_FUNCTION: sawtooth_buffer,
+        WaveformEntries.WAVETABLE: (),
+        WaveformEntries.FIXED_POINT: True,
     },
     {
         WaveformEntries.NAME: WaveformNames.PULSE,
@@ -140,6 +166,7 @@ WAVEFORMS = [
             WaveformParams.FALL_TIME,
         ],
         WaveformEntries.FUNCTION: pulse,
+        WaveformEntries.BUFFER_FUNCTION: pulse_buffer,
     },
     {
         WaveformEntries.NAME: WaveformNames.SINC,
@@ -149,6 +176,7 @@ WAVEFORMS = [
             WaveformParams.OFFSET,
         ],
         WaveformEntries.FUNCTION: sinc,
+        WaveformEntries.BUFFER_FUNCTION: sinc_buffer,
     },
     {
         WaveformEntries.NAME: WaveformNames.GAUSSIAN,
@@ -158,6 +186,7 @@ WAVEFORMS = [
             WaveformParams.OFFSET,
         ],
         WaveformEntries.FUNCTION: gaussian,
+        WaveformEntries.BUFFER_FUNCTION: gaussian_buffer,
     },
     {
         WaveformEntries.NAME: WaveformNames.EXPONENTIAL,
@@ -167,10 +196,20 @@ WAVEFORMS = [
             WaveformParams.OFFSET,
         ],
         WaveformEntries.FUNCTION: exponential,
+        WaveformEntries.BUFFER_FUNCTION: exponential_buffer,
     },
     {
         WaveformEntries.NAME: WaveformNames.WHITE_NOISE,
         WaveformEntries.PARAMS: [WaveformParams.AMPLITUDE, WaveformParams.QUALITY],
         WaveformEntries.FUNCTION: white_noise,
+        WaveformEntries.BUFFER_FUNCTION: white_noise_buffer,
+        WaveformEntries.STREAMING: True,
+    },
+    {
+        WaveformEntries.NAME: WaveformNames.PINK_NOISE,
+        WaveformEntries.PARAMS: [WaveformParams.AMPLITUDE],
+        WaveformEntries.FUNCTION: pink_noise,
+        WaveformEntries.BUFFER_FUNCTION: pink_noise_buffer,
+        WaveformEntries.STREAMING: True,
     },
 ]
@@ -0,0 +1,126 @@
+import gc
+from math import floor
+
+from generation.constants import WaveformEntries
+from generation.render import FLOAT_SIZE, float_buffer
+from utils.memory import free_heap
+
+TABLE_BITS = 12
+TABLE_SIZE = 1 << TABLE_BITS
+# 24 bits keep the accumulator a small int on MicroPython, so stepping it
+# never allocates
+PHASE_BITS = 24
+PHASE_ONE = 1 << PHASE_BITS
+PHASE_MASK = PHASE_ONE - 1
+INDEX_SHIFT = PHASE_BITS - TABLE_BITS
+
+MAX_TABLES = 2
+MIN_FREE_BYTES = 32 * 1024
+
+
+def build_table(waveform, parameters, table_size=TABLE_SIZE):
+    """Sample one normalized period at the center of each table slot."""
+    table = float_buffer(table_size)
+    for index in range(table_size):
+        table[index] = (index + 0.5) / table_size
+    buffer_function = waveform.get(WaveformEntries.BUFFER_FUNCTION)
+    if buffer_function is not None:
+        buffer_function(table, 0, table_size, parameters)
+    else:
+        function = waveform[WaveformEntries.FUNCTION]
+        for index in range(table_size):
+            table[index] = function(table[index], parameters)
+    return table
+
+
+def phase_step(count, duplication_factor, parameters):
+    """(first phase, increment) of the accumulator for count samples.
+
+    Positions follow the same layout as fill_positions: sample i sits at
+    duplication_factor * (i + 0.5) / count periods, shifted by replicate
+    and phase.
+    """
+    replicate = parameters.get("replicate", 1)
+    phase_offset = parameters.get("phase", 0)
+    start = (duplication_factor * 0.5 / count) * replicate - phase_offset
+    start -= floor(start)
+    phase = int(start * PHASE_ONE) & PHASE_MASK
+    increment = int(duplication_factor * replicate * PHASE_ONE / count + 0.5)
+    return phase, increment
+
+
+def fill_from_table(values, count, duplication_factor, parameters, table):
+    """Resample a table with a fixed-point phase accumulator."""
+    phase, increment = phase_step(count, duplication_factor, parameters)
+    for index in range(count):
+        values[index] = table[phase >> INDEX_SHIFT]
+        phase = (phase + increment) & PHASE_MASK
+
+
+class WavetableBank:
+    """Lazily built single-period tables for waveforms whose shape does not
+    depend on frequency.
+
+    A table is keyed by the waveform name and the parameters listed in its
+    WaveformEntries.WAVETABLE entry. Tables are dropped, oldest first, when
+    the bank is full or the heap runs low.
+    """
+
+    entry_size = FLOAT_SIZE
+
+    def __init__(
+        self, table_bits=TABLE_BITS, max_tables=MAX_TABLES, min_free=MIN_FREE_BYTES
+    ):
+        self.table_size = 1 << table_bits
+        self.max_tables = max_tables
+        self.min_free = min_free
+        self.tables = {}
+        self._order = []
+
+    def lookup(self, waveform, parameters):
+        shape_params = waveform.get(WaveformEntries.WAVETABLE)
+        if shape_params is None:
+            return None
+        key = (waveform[WaveformEntries.NAME],) + tuple(
+            parameters.get(name) for name in shape_params
+        )
+        if key in self.tables:
+            self._order.remove(key)
+            self._order.append(key)
+            return self.tables[key]
+
+        self._make_room()
+        try:
+            table = self.build(waveform, parameters)
+        except MemoryError:
+            self.release()
+            try:
+                table = self.build(waveform, parameters)
+            except MemoryError:
+                return None
+        self.tables[key] = table
+        self._order.append(key)
+        return table
+
+    def build(self, waveform, parameters):
+        return build_table(waveform, parameters, self.table_size)
+
+    def fill(self, waveform, parameters, values, count, duplication_factor):
+        table = self.lookup(waveform, parameters)
+        if table is None:
+            return False
+        fill_from_table(values, count, duplication_factor, parameters, table)
+        return True
+
+    def _make_room(self):
+        while len(self._order) >= self.max_tables:
+            del self.tables[self._order.pop(0)]
+        free = free_heap()
+        if free is not None and self._order:
+            if free < self.min_free + self.table_size * self.entry_size:
+                self.release()
+
+    def release(self):
+        self.tables = {}
+        self._order = []
+        gc.collect()
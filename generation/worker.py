@@ -0,0 +1,125 @@
+import _thread
+
+import utime
+
+
+class RenderWorker:
+    """Renders sample buffers on a second thread (core 1 on the Pico).
+
+    Jobs are superseded, not queued: submit() replaces any job that has not
+    started and aborts the render in progress. A finished render is held until
+    the control loop collects it with poll(), which applies it to the output
+    on the calling core. Results of superseded jobs are dropped there.
+
+    Only generator.prepare() runs on the worker, and only the control loop
+    calls generator.apply(), so the DMA registers are written from one core.
+    The worker does not start a new job until the previous result has been
+    collected, because both would render into the same idle buffer.
+
+    While a stream plays, the worker also keeps it fed with
+    generator.service(), which only reads the DMA registers: between jobs
+    every generator.service_interval_ms(), and between the chunks of a
+    render, so a new waveform can be prepared without starving the stream.
+
+    notify, if given, is called on the worker thread when a result is ready,
+    so it must be safe to call from the other core (a ThreadSafeFlag's set).
+    """
+
+    def __init__(self, generator, notify=None):
+        self.generator = generator
+        self.notify = notify
+        self.latest_job_id = 0
+        self.completed_jobs = 0
+        self.aborted_jobs = 0
+        self.dropped_results = 0
+        self._lock = _thread.allocate_lock()
+        self._wakeup = _thread.allocate_lock()
+        self._wakeup.acquire()
+        self._pending = None
+        self._result = None
+        self._running = False
+
+    def start(self):
+        self._running = True
+        _thread.start_new_thread(self._run, ())
+
+    def stop(self):
+        with self._lock:
+            self._running = False
+            self.latest_job_id += 1  # aborts the render in progress
+            self._pending = None
+            self._signal()
+
+    def submit(self, waveform):
+        with self._lock:
+            self.latest_job_id += 1
+            self._pending = (self.latest_job_id, waveform)
+            self._signal()
+
+    def poll(self):
+        """Apply a finished render if there is one. Returns True if the output changed."""
+        with self._lock:
+            result = self._result
+            self._result = None
+            if result is None:
+                return False
+            self._signal()
+            if result[0] != self.latest_job_id:
+                self.dropped_results += 1
+                return False
+        self.generator.apply(result[1])
+        with self._lock:
+            # The worker may have gone back to sleep before a stream started
+            self._signal()
+        return True
+
+    def is_busy(self):
+        return self._pending is not None or self._result is not None
+
+    def _signal(self):
+        # Called with self._lock held; releasing an unlocked lock would raise
+        if self._wakeup.locked():
+            self._wakeup.release()
+
+    def _take_job(self):
+        with self._lock:
+            if self._result is not None:
+                return None
+            job = self._pending
+            self._pending = None
+            return job
+
+    def _wait(self):
+        """Wait for a signal, feeding an active stream meanwhile. False if
+        the wait ended without one."""
+        if not self.generator.stream.active:
+            self._wakeup.acquire()
+            return True
+        if self._wakeup.acquire(0):
+            return True
+        self.generator.service()
+        utime.sleep_ms(self.generator.service_interval_ms())
+        return False
+
+    def _run(self):
+        while self._running:
+            if not self._wait():
+                continue
+            job = self._take_job()
+            if job is None:
+                continue
+            job_id, waveform = job
+
+            def abort():
+                self.generator.service()
+                return job_id != self.latest_job_id
+
+            prepared = self.generator.prepare(waveform, abort=abort)
+            with self._lock:
+                if prepared is None:
+                    self.aborted_jobs += 1
+                else:
+                    self.completed_jobs += 1
+                    self._result = (job_id, prepared)
+            if prepared is not None and self.notify is not None:
+                self.notify()
@@ -1,13 +1,66 @@
 import gc
-import utime
+import uasyncio as asyncio
 from machine import freq
 
 from control.button import switch_power_supply_to_pwm
 from control.control import Control, ControlType
 from display.display import DisplayLCD
+from display.updater import DisplayUpdater
 from generation.constants import SYSTEM_FREQUENCY
 from generation.generation import WaveformGenerator
+from generation.worker import RenderWorker
 from utils.helpers import menu_state_tracker
+from utils.memory import collect_if_low
+from utils.scheduler import Scheduler
+from utils.telemetry import SerialConsole
+
+INPUT_REPEAT_MS = 50  # while a button is held, for auto-repeat
+INPUT_IDLE_MS = 1000  # catches edges swallowed by the debounce window
+MENU_POLL_MS = 100
+RENDER_POLL_MS = 100  # fallback if a worker notification is missed
+CONSOLE_POLL_MS = 100  # serial commands such as "stats"; see utils.telemetry
+
+
+def build_scheduler(display, control, worker):
+    scheduler = Scheduler()
+    # Set from the pin interrupts and from the render worker on core 1
+    input_ready = asyncio.ThreadSafeFlag()
+    control.input_events.wake = input_ready.set
+    render_ready = asyncio.ThreadSafeFlag()
+    worker.notify = render_ready.set
+    has_menu_changed = menu_state_tracker(control.menu)
+
+    def handle_input():
+        control.check_buttons()
+        for button in control.buttons:
+            if button.is_held():
+                return INPUT_REPEAT_MS
+        return None
+
+    def check_menu():
+        if has_menu_changed(control.take_apply_request()):
+            worker.submit(control.menu.current_waveform)
+
+    def apply_render():
+        if worker.poll():
+            gc.collect()
+        # The display and render paths do not collect; this task does it
+        collect_if_low()
+
+    def draw_display():
+        display.draw()
+
+    scheduler.add("input", handle_input, interval_ms=INPUT_IDLE_MS, wake=input_ready)
+    scheduler.add("menu", check_menu, interval_ms=MENU_POLL_MS)
+    scheduler.add("render", apply_render, interval_ms=RENDER_POLL_MS, wake=render_ready)
+    scheduler.add(
+        "display",
+        draw_display,
+        wake=display.ready,
+        min_interval_ms=display.frame_interval_ms,
+    )
+    scheduler.add("console", SerialConsole().poll, interval_ms=CONSOLE_POLL_MS)
+    return scheduler
 
 
 def main():
@@ -20,28 +73,26 @@ def main():
         line_count=2,
         column_count=16,
     )
-    control = Control(lcd_display, ControlType.BUTTONS)
+    # Frames are drawn by a task, so button handling never waits for the LCD
+    display = DisplayUpdater(lcd_display)
+    control = Control(display, ControlType.BUTTONS)
     control.update_display()
 
     wave = control.menu.current_waveform
     generator = WaveformGenerator()
+    print(generator.budget)
     generator.start(wave)
+    worker = RenderWorker(generator)
+    worker.start()
 
-    has_menu_changed = menu_state_tracker(control.menu)
-
-    while True:
-        try:
-            control.check_buttons()
-            if control.menu.current_page_index == 0 and has_menu_changed():
-                new_wave = control.menu.current_waveform
-                generator.stop()
-                gc.collect()
-                generator.start(new_wave)
-            utime.sleep_ms(100)
-        except KeyboardInterrupt:
-            generator.stop()
-            break
+    # The worker keeps streaming waveforms fed from core 1
+    scheduler = build_scheduler(display, control, worker)
+    try:
+        asyncio.run(scheduler.run())
+    except KeyboardInterrupt:
+        pass
 
+    worker.stop()
     generator.stop()
 
 
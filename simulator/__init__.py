@@ -0,0 +1,44 @@
+"""Host-side stand-ins for the MicroPython hardware modules.
+
+install() puts simulated machine, rp2, uctypes, utime and micropython modules
+in sys.modules, all backed by one Board. It has to run before anything that
+imports them, including utils.ticks:
+
+    import simulator
+
+    board = simulator.install()
+    from generation.generation import WaveformGenerator
+    ...
+    board.advance_ms(10)
+    board.output.samples()
+"""
+
+import sys
+
+from simulator.board import Board
+
+MODULE_NAMES = ("machine", "micropython", "rp2", "uctypes", "utime")
+
+_board = None
+
+
+def current_board():
+    if _board is None:
+        raise RuntimeError("simulator.install() has not been called")
+    return _board
+
+
+def install(board=None):
+    """Make the simulated modules importable and return the board behind them.
+
+    Calling it again swaps in a fresh board, so each check can start from
+    reset hardware while the modules already imported stay valid.
+    """
+    global _board
+    _board = board if board is not None else Board()
+    from simulator import machine, micropython, rp2, uctypes, utime
+
+    modules = (machine, micropython, rp2, uctypes, utime)
+    for name, module in zip(MODULE_NAMES, modules):
+        sys.modules[name] = module
+    return _board
@@ -0,0 +1,164 @@
+import threading
+from collections import deque
+
+from simulator.dma import Dma
+from simulator.i2c import Hd44780, I2cBus
+from simulator.memory import BusFault, Memory
+from simulator.pio import NO_SOURCE, OutputRecorder, PioBlock
+
+DEFAULT_SYSTEM_FREQUENCY = 125_000_000
+# Simulated time that passes with every call to a utime ticks function, so
+# code that busy-waits on the clock makes progress
+POLL_COST_NS = 1_000
+SCHEDULE_DEPTH = 8  # MICROPY_SCHEDULER_DEPTH
+IRQ_FALLING = 4
+IRQ_RISING = 8
+
+
+class PinState:
+    def __init__(self, number, level=0):
+        self.number = number
+        self.level = level
+        self.handler = None
+        self.trigger = 0
+        self.hard = False
+        self.pin = None
+
+
+class Board:
+    """A simulated Pico: a clock, SRAM, the DMA, both PIO blocks, GPIO and
+    I2C buses.
+
+    Time only moves when the code under test waits on utime, writes to I2C,
+    or a test calls advance_ns(). The hardware is caught up to the current
+    time before every register access, so reads see what the hardware would
+    have done in the meantime.
+    """
+
+    def __init__(self, system_frequency=DEFAULT_SYSTEM_FREQUENCY):
+        self.system_frequency = system_frequency
+        self.now_ns = 0
+        self.poll_cost_ns = POLL_COST_NS
+        self.memory = Memory()
+        self.dma = Dma(self)
+        self.pio = (PioBlock(self, 0), PioBlock(self, 1))
+        self.output = OutputRecorder()
+        self.pins = {}
+        self.i2c_buses = {}
+        self.scheduled = deque()
+        self.irq_disabled = False
+        self.registers = {}
+        # The render worker runs on a second thread, as on core 1
+        self.lock = threading.RLock()
+
+    # Time
+
+    def advance_ns(self, duration_ns):
+        with self.lock:
+            self.now_ns += int(duration_ns)
+            self.sync()
+
+    def advance_us(self, duration_us):
+        self.advance_ns(duration_us * 1_000)
+
+    def advance_ms(self, duration_ms):
+        self.advance_ns(duration_ms * 1_000_000)
+
+    def poll(self):
+        self.advance_ns(self.poll_cost_ns)
+
+    def sync(self):
+        for block in self.pio:
+            block.run_until(self.now_ns)
+
+    def set_frequency(self, frequency):
+        with self.lock:
+            self.sync()
+            self.system_frequency = frequency
+
+    # Bus
+
+    def bus_read(self, address, size=4, master=None):
+        if self.memory.contains(address):
+            return self.memory.read(address, size)
+        if self.dma.handles(address):
+            return self.dma.read(address)
+        for block in self.pio:
+            if block.handles(address):
+                return block.read(address)
+        return self.registers.get(address, 0)
+
+    def bus_write(self, address, value, size=4, master=None):
+        if self.memory.contains(address):
+            self.memory.write(address, value, size)
+        elif self.dma.handles(address):
+            self.dma.write(address, value)
+        else:
+            for block in self.pio:
+                if block.handles(address):
+                    source = NO_SOURCE if master is None else master.read_address
+                    block.write(address, value, source)
+                    return
+            if address < 0x10000000:
+                raise BusFault("write to ROM at 0x%08X" % address)
+            self.registers[address] = value
+
+    def read32(self, address):
+        with self.lock:
+            self.sync()
+            return self.bus_read(address & ~3)
+
+    def write32(self, address, value):
+        with self.lock:
+            self.sync()
+            self.bus_write(address & ~3, value & 0xFFFFFFFF)
+
+    # GPIO
+
+    def pin(self, number):
+        state = self.pins.get(number)
+        if state is None:
+            state = self.pins[number] = PinState(number)
+        return state
+
+    def drive_pin(self, number, level):
+        """Set an input from outside, firing its interrupt on a matching edge."""
+        state = self.pin(number)
+        previous = state.level
+        state.level = 1 if level else 0
+        if state.handler is None or previous == state.level:
+            return
+        edge = IRQ_RISING if state.level else IRQ_FALLING
+        if state.trigger & edge:
+            if state.hard:
+                state.handler(state.pin)
+            else:
+                self.schedule(state.handler, state.pin)
+
+    def schedule(self, function, argument):
+        if len(self.scheduled) >= SCHEDULE_DEPTH:
+            raise RuntimeError("schedule queue full")
+        self.scheduled.append((function, argument))
+
+    def run_scheduled(self):
+        """Run pending soft interrupts and scheduled calls. Returns how many."""
+        count = 0
+        while self.scheduled and not self.irq_disabled:
+            function, argument = self.scheduled.popleft()
+            function(argument)
+            count += 1
+        return count
+
+    # I2C
+
+    def i2c_bus(self, bus_id, frequency=None):
+        bus = self.i2c_buses.get(bus_id)
+        if bus is None:
+            bus = self.i2c_buses[bus_id] = I2cBus(self, bus_id)
+        if frequency is not None:
+            bus.frequency = frequency
+        return bus
+
+    def attach_lcd(self, bus_id, address, line_count=2, column_count=16):
+        """An LCD behind a PCF8574 at address, which records what it shows."""
+        return self.i2c_bus(bus_id).attach(address, Hd44780(line_count, column_count))
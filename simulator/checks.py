@@ -0,0 +1,982 @@
+"""Run the output and display paths on the simulated board and check them.
+
+- hot swap: a buffer change under the running DMA lands at a period boundary
+  without a gap in the output
+- hot swap rate: a swap to a new frequency plays the old buffer at the old
+  rate to its last sample and the new buffer at the new rate from its first,
+  and apply() returns soon after the swap lands
+- streaming: a noise stream is refilled while it plays, the DMA never reads
+  a segment while it is being rendered, the clock is slowed down to what
+  refills sustain but no further than STREAM_MAX_SLOWDOWN, where refills
+  that cannot keep up replay segments instead, the rate played is in the
+  telemetry, and a late refill is counted as an underrun; run at every chunk
+  render cost in CHUNK_RENDER_US_RANGE
+- stream then swap: a waveform prepared while a stream plays is not touched
+  by the stream's refills, and is what plays once applied
+- offset: the Offset set in the menu moves the rendered samples, rescaling
+  the kept shape, which the render.path telemetry counters show
+- render cache: going back to a recent setting plays the cached render, a
+  changed parameter renders anew, and the least recently used render is
+  the one evicted
+- render worker: on a real thread, a job replaced before it starts never
+  runs, a newer submit aborts the render in progress, a result that went
+  stale is dropped by poll() and never applied, an active stream is
+  serviced while the worker waits and between render chunks, and stop()
+  ends the thread
+- held ramp: holding a button steps the value while held, and the release
+  leaves it where a release-only ramp for the same press would
+- two-button press: Increase and Decrease pressed together toggle the
+  backlight once and leave the value alone, however far apart the releases
+- edge replay: bouncing edges fed through the pin interrupts and the soft
+  IRQ queue give one short press, one long press and one two-button press
+- LCD: a redraw sends only the changed characters, one run per transfer
+- display updater: under the scheduler task main.py runs, a burst of
+  render() calls is drawn once as its newest frame, and frames requested
+  faster than the frame rate are drawn at most once per frame interval,
+  ending on the newest
+- steady-state allocation: redrawing the LCD, changed or not, and redrawing
+  the main page with unchanged values create no heap objects
+
+CPython allocates where MicroPython does not (range iterators, large ints),
+so allocation is not measured in bytes. Instead new_objects() traces the
+repository's code and reports every object of a type MicroPython keeps on
+the heap that was created during the call and held in a local or returned.
+A temporary passed straight to a built-in is not seen, so
+Display.render_allocated on the board stays the measure in bytes.
+
+Run from the repository root:
+
+    python -m simulator.checks
+"""
+
+import asyncio
+import contextlib
+import io
+import os
+import sys
+import threading
+import time
+import tracemalloc
+import types
+
+import simulator
+
+simulator.install()
+
+from control.control import Control, ControlType  # noqa: E402
+from control.events import DEBOUNCE_MS  # noqa: E402
+from display.display import DisplayLCD  # noqa: E402
+from display.updater import DisplayUpdater  # noqa: E402
+from generation.constants import (  # noqa: E402
+    MAX_VALUE,
+    MIN_VALUE,
+    RESOLUTION,
+    WaveformEntries,
+    WaveformNames,
+)
+from generation.generation import (  # noqa: E402
+    RETARGET_POLL_MS,
+    STREAM_LOAD_PERCENT,
+    STREAM_MAX_SLOWDOWN,
+    STREAM_SEGMENT_COUNT,
+    SegmentStream,
+    WaveformGenerator,
+)
+from generation.waveforms import WAVEFORMS, WaveformParams  # noqa: E402
+from generation.worker import RenderWorker  # noqa: E402
+from uctypes import addressof  # noqa: E402
+from utils.scheduler import Scheduler  # noqa: E402
+from utils.telemetry import telemetry  # noqa: E402
+import utime  # noqa: E402
+
+SAMPLE_COUNT = 4096
+I2C_BUS = 1
+LCD_ADDRESS = 0x3F
+MAIN_PIN = 19
+INCREASE_PIN = 18
+DECREASE_PIN = 20
+INPUT_POLL_MS = 50  # main.INPUT_REPEAT_MS, how often input is handled while held
+HELD_PRESS_MS = (250, 1100, 2600)
+# (ms since the first edge, pin, level): both buttons down 30 ms apart, held,
+# then released 40 ms apart, each edge handled on its own as main.py does
+TWO_BUTTON_EDGES = (
+    (0, INCREASE_PIN, 0),
+    (30, DECREASE_PIN, 0),
+    (530, INCREASE_PIN, 1),
+    (570, DECREASE_PIN, 1),
+)
+# Edges as a bouncing tact switch makes them, a few 1-3 ms apart at each
+# press and release: a short main press, a long one, then a two-button press
+BOUNCING_PRESS_EDGES = (
+    (0, MAIN_PIN, 0),
+    (1, MAIN_PIN, 1),
+    (2, MAIN_PIN, 0),
+    (4, MAIN_PIN, 1),
+    (5, MAIN_PIN, 0),
+    (150, MAIN_PIN, 1),
+    (151, MAIN_PIN, 0),
+    (153, MAIN_PIN, 1),
+)
+LONG_PRESS_EDGES = (
+    (0, MAIN_PIN, 0),
+    (2, MAIN_PIN, 1),
+    (3, MAIN_PIN, 0),
+    (900, MAIN_PIN, 1),
+    (903, MAIN_PIN, 0),
+    (904, MAIN_PIN, 1),
+)
+BOUNCING_TWO_BUTTON_EDGES = (
+    (0, INCREASE_PIN, 0),
+    (1, INCREASE_PIN, 1),
+    (2, INCREASE_PIN, 0),
+    (30, DECREASE_PIN, 0),
+    (33, DECREASE_PIN, 1),
+    (34, DECREASE_PIN, 0),
+    (500, INCREASE_PIN, 1),
+    (501, INCREASE_PIN, 0),
+    (503, INCREASE_PIN, 1),
+    (540, DECREASE_PIN, 1),
+)
+# (from, to) frequencies in Hz of the hot swaps that change the sample rate
+HOT_SWAP_FREQUENCIES = ((150_000, 151_000), (1000, 100), (100, 1000))
+STREAM_SERVICE_CALLS = 40
+WORKER_CHUNKS = 3  # render chunks of a job in the render worker check
+WORKER_TIMEOUT_S = 5  # real time to wait for the worker thread
+BURST_FRAMES = 20  # render() calls between two draws
+UPDATE_SECONDS = 0.5  # of frames requested every UPDATE_REQUEST_MS
+UPDATE_REQUEST_MS = 2
+CACHED_RENDERS = 2  # full buffers the render cache check has room for
+# Host render time says nothing about the Pico, so every CHUNK_SIZE-sample
+# chunk of a streaming refill is charged simulated time instead, once for
+# each of these costs. They are estimates, not board measurements: 500 us
+# (2 us a sample) is what the native and viper kernels should reach, and
+# 8000 us (31 us a sample) is plain Python boxing a float or two per sample
+# at 125 MHz. On a board, the stream.refill timer of the "stats" command
+# gives the real figure for a whole segment.
+CHUNK_RENDER_US_RANGE = (500, 2000, 6000, 8000)
+ALLOCATION_CALLS = 4
+# Objects of these types are heap allocated on MicroPython; small ints are not
+HEAP_TYPES = (
+    bytes,
+    bytearray,
+    str,
+    list,
+    tuple,
+    dict,
+    set,
+    float,
+    memoryview,
+    types.MethodType,
+)
+# CPython reuses freed floats and tuples without tracemalloc seeing them, so
+# that many of each are held while tracing
+FREELIST_LENGTH = 2000
+MAX_FREELIST_TUPLE = 20
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SIMULATOR_DIR = os.path.join(ROOT, "simulator")
+
+
+def waveform_named(name):
+    for waveform in WAVEFORMS:
+        if waveform[WaveformEntries.NAME] == name:
+            return waveform
+    raise KeyError(name)
+
+
+def new_generator():
+    return WaveformGenerator(SAMPLE_COUNT)
+
+
+def new_display(board):
+    lcd = board.attach_lcd(I2C_BUS, LCD_ADDRESS)
+    display = DisplayLCD(
+        i2c_bus=I2C_BUS,
+        sda_pin=26,
+        scl_pin=27,
+        i2c_frequency=400000,
+        i2c_address=LCD_ADDRESS,
+        line_count=2,
+        column_count=16,
+    )
+    return display, lcd
+
+
+def check_hot_swap():
+    board = simulator.install()
+    generator = new_generator()
+    generator.start(waveform_named(WaveformNames.SINE))
+    board.advance_ms(1)
+    old_start = addressof(generator.buffer[generator.current_buffer_index])
+
+    generator.apply(generator.prepare(waveform_named(WaveformNames.SQUARE)))
+    board.advance_ms(1)
+    new_start = addressof(generator.buffer[generator.current_buffer_index])
+
+    sources = board.output.sources
+    switch = next(
+        index
+        for index, source in enumerate(sources)
+        if new_start <= source < new_start + SAMPLE_COUNT
+    )
+    last_old_word = max(sources[:switch])
+    problems = []
+    if sources[switch] != new_start:
+        problems.append(
+            "the new buffer started at byte %d" % (sources[switch] - new_start)
+        )
+    if not old_start <= sources[switch - 1] < old_start + SAMPLE_COUNT:
+        problems.append("the word before the switch is not from the old buffer")
+    elif sources[switch - 1] != last_old_word:
+        problems.append("the old buffer was cut off mid-period")
+    if board.output.gaps():
+        problems.append("%d gaps in the output" % len(board.output.gaps()))
+    return problems
+
+
+def period_at(output, time_ns):
+    for start, period, data in output.runs:
+        if start <= time_ns < start + len(data) * period:
+            return period
+    return None
+
+
+def check_hot_swap_rate():
+    problems = []
+    for old_frequency, new_frequency in HOT_SWAP_FREQUENCIES:
+        problems.extend(
+            "%d Hz to %d Hz: %s" % (old_frequency, new_frequency, problem)
+            for problem in check_hot_swap_rate_between(old_frequency, new_frequency)
+        )
+    return problems
+
+
+def check_hot_swap_rate_between(old_frequency, new_frequency):
+    board = simulator.install()
+    generator = new_generator()
+    waveform = waveform_named(WaveformNames.SINE)
+    frequency = WaveformParams.FREQUENCY
+    start = frequency.current_value
+    try:
+        frequency.set_value(old_frequency)
+        generator.start(waveform)
+        old_start = addressof(generator.buffer[generator.current_buffer_index])
+        board.advance_ms(1)
+        frequency.set_value(new_frequency)
+        prepared = generator.prepare(waveform)
+    finally:
+        frequency.set_value(start)
+    generator.apply(prepared)
+    returned_ns = board.now_ns
+    board.advance_ms(1)
+
+    new_start = addressof(generator.buffer[generator.current_buffer_index])
+    output = board.output
+    switch = next(
+        index
+        for index, source in enumerate(output.sources)
+        if new_start <= source < new_start + SAMPLE_COUNT
+    )
+    switch_ns = output.word_times[switch]
+    old_period = output.runs[0][1]
+    new_period = output.runs[-1][1]
+    problems = []
+    if old_period == new_period:
+        problems.append("the sample rate did not change")
+    if period_at(output, switch_ns) != new_period:
+        problems.append("the new buffer started at the old sample rate")
+    late = sum(
+        period_at(output, output.word_times[index]) != old_period
+        for index in range(switch)
+        if old_start <= output.sources[index] < old_start + SAMPLE_COUNT
+    )
+    if late:
+        problems.append("%d old-buffer words played at the new rate" % late)
+    # The wait ends within a poll of the swap
+    if returned_ns - switch_ns > 2_000_000 * RETARGET_POLL_MS:
+        problems.append(
+            "apply() returned %.1f ms after the swap"
+            % ((returned_ns - switch_ns) / 1e6)
+        )
+    if returned_ns < switch_ns:
+        problems.append("apply() returned before the swap landed")
+    if output.gaps():
+        problems.append("%d gaps in the output" % len(output.gaps()))
+    return problems
+
+
+def check_streaming():
+    problems = []
+    for chunk_render_us in CHUNK_RENDER_US_RANGE:
+        for problem in check_streaming_at(chunk_render_us):
+            problems.append("%d us a chunk: %s" % (chunk_render_us, problem))
+    return problems
+
+
+def check_streaming_at(chunk_render_us):
+    board = simulator.install()
+    generator = new_generator()
+    stream = generator.stream
+    fill = stream.fill
+    fill_chunk = stream.fill_chunk
+    watched_reads = [0]
+
+    def timed_fill_chunk(chunk, waveform, parameters):
+        # Charge the render time chunk by chunk, with the DMA running
+        fill_chunk(chunk, waveform, parameters)
+        board.advance_us(chunk_render_us)
+
+    def watched_fill(index):
+        address = stream.addresses[index]
+        with board.memory.watch(address, stream.segment_size) as watch:
+            fill(index)
+        watched_reads[0] += watch.reads
+
+    stream.fill_chunk = timed_fill_chunk
+    stream.fill = watched_fill
+    # Started over a running periodic output, as after a menu change
+    generator.start(waveform_named(WaveformNames.SINE))
+    board.advance_ms(1)
+    log = io.StringIO()
+    with contextlib.redirect_stdout(log):
+        generator.start(waveform_named(WaveformNames.WHITE_NOISE))
+    # Serviced the way the render worker does it between jobs
+    for _ in range(STREAM_SERVICE_CALLS):
+        generator.service()
+        board.advance_ms(generator.service_interval_ms())
+
+    problems = []
+    if watched_reads[0]:
+        problems.append(
+            "the DMA read %d words of a segment being rendered" % watched_reads[0]
+        )
+    if stream.overruns:
+        problems.append("%d overruns" % stream.overruns)
+    # Rounded down from the same divider, so one sample a second short at most
+    slowest_rate = stream.requested_rate // STREAM_MAX_SLOWDOWN - 1
+    at_floor = stream.sample_rate <= slowest_rate + 1
+    if stream.sample_rate < slowest_rate:
+        problems.append(
+            "%d S/s played for %d S/s requested"
+            % (stream.sample_rate, stream.requested_rate)
+        )
+    if stream.sample_rate != telemetry.gauge("stream.sample_rate").value:
+        problems.append("the telemetry does not show the rate played")
+    slowed = stream.sample_rate < stream.requested_rate
+    if slowed != ("%d S/s" % stream.sample_rate in log.getvalue()):
+        problems.append("the log says %r" % log.getvalue())
+    if at_floor:
+        if not stream.underruns:
+            problems.append("refills too slow for the floor rate were not counted")
+    else:
+        if stream.underruns:
+            problems.append("%d underruns" % stream.underruns)
+        if stream.refill_us * 100 > STREAM_LOAD_PERCENT * stream.segment_us:
+            problems.append(
+                "a %d us refill for a %d us segment"
+                % (stream.refill_us, stream.segment_us)
+            )
+    # A refill that comes a whole ring late is reported
+    underruns = stream.underruns
+    board.advance_us(STREAM_SEGMENT_COUNT * stream.segment_us)
+    generator.service()
+    if stream.underruns == underruns:
+        problems.append("a starved stream counted no underrun")
+    if stream.refills < STREAM_SERVICE_CALLS // 4:
+        problems.append("only %d refills" % stream.refills)
+    if board.output.gaps():
+        problems.append("%d gaps in the output" % len(board.output.gaps()))
+    return problems
+
+
+def check_stream_then_swap():
+    board = simulator.install()
+    generator = new_generator()
+    generator.start(waveform_named(WaveformNames.WHITE_NOISE))
+    stream = generator.stream
+    board.advance_ms(1)
+    segment_ns = stream.segment_size * 1e9 / board.output.sample_rate()
+
+    prepared = generator.prepare(waveform_named(WaveformNames.SINE))
+    buffer_index, word_count, _, _ = prepared
+    expected = bytes(generator.buffer[buffer_index][: word_count * 4])
+    refills = stream.refills
+    for _ in range(2 * STREAM_SEGMENT_COUNT):
+        board.advance_ns(segment_ns)
+        generator.service()
+    applied = bytes(generator.buffer[buffer_index][: word_count * 4])
+
+    board.output.clear()
+    generator.apply(prepared)
+    board.advance_ms(1)
+    problems = []
+    if stream.refills == refills:
+        problems.append("the stream was not refilled")
+    changed = sum(before != after for before, after in zip(expected, applied))
+    if changed:
+        problems.append("the stream overwrote %d prepared samples" % changed)
+    # The output has settled on looping the prepared buffer
+    played = board.output.samples()[-len(expected) :]
+    if len(played) < len(expected) or played not in expected + expected:
+        problems.append("the output is not the prepared buffer")
+    return problems
+
+
+def prepared_samples(generator, waveform):
+    buffer_index, word_count, _, _ = generator.prepare(waveform)
+    return bytes(generator.buffer[buffer_index][: word_count * 4])
+
+
+def check_offset():
+    simulator.install()
+    generator = new_generator()
+    waveform = waveform_named(WaveformNames.GAUSSIAN)
+    offset = WaveformParams.OFFSET
+    paths = [telemetry.counter("render.path." + name) for name in ("full", "scale")]
+    enabled = telemetry.enabled
+    telemetry.enabled = True
+    try:
+        before = [counter.value for counter in paths]
+        plain = prepared_samples(generator, waveform)
+        # prepare() reads the menu values, so this is the Offset the user sets
+        offset.increase()
+        try:
+            shifted = prepared_samples(generator, waveform)
+            expected = RESOLUTION * offset.current_value
+        finally:
+            offset.decrease()
+        counted = [counter.value - start for counter, start in zip(paths, before)]
+    finally:
+        telemetry.enabled = enabled
+
+    problems = []
+    if counted != [1, 1]:
+        problems.append("counted %d full and %d scale-only renders" % tuple(counted))
+    if offset.current_value != offset.default:
+        problems.append("Offset did not return to %r" % offset.default)
+    moved = [
+        after - before
+        for before, after in zip(plain, shifted)
+        if MIN_VALUE < after < MAX_VALUE
+    ]
+    if not moved:
+        problems.append("every sample was clamped")
+    elif max(abs(shift - expected) for shift in moved) > 1:
+        problems.append(
+            "samples moved by %d to %d codes, not %.1f"
+            % (min(moved), max(moved), expected)
+        )
+    return problems
+
+
+def check_render_cache():
+    board = simulator.install()
+    generator = WaveformGenerator(
+        SAMPLE_COUNT, cache_bytes=CACHED_RENDERS * SAMPLE_COUNT
+    )
+    cache = generator.cache
+    amplitude = WaveformParams.AMPLITUDE
+    start = amplitude.current_value
+    problems = []
+
+    def play(name):
+        prepared = generator.prepare(waveform_named(name))
+        buffer_index, word_count, _, _ = prepared
+        samples = bytes(generator.buffer[buffer_index][: word_count * 4])
+        board.output.clear()
+        generator.apply(prepared)
+        board.advance_ms(1)
+        played = board.output.samples()[-len(samples) :]
+        if len(played) < len(samples) or played not in samples + samples:
+            problems.append("the output is not the %s buffer" % name)
+        return samples
+
+    def expect(step, hits, misses, evictions):
+        stats = cache.stats()
+        counts = (stats["hits"], stats["misses"], stats["evictions"])
+        if counts != (hits, misses, evictions):
+            problems.append(
+                "%s: %d hits, %d misses and %d evictions" % ((step,) + counts)
+            )
+
+    try:
+        sine = play(WaveformNames.SINE)
+        expect("first sine", 0, 1, 0)
+        if play(WaveformNames.SINE) != sine:
+            problems.append("a cache hit played other samples")
+        expect("sine again", 1, 1, 0)
+
+        amplitude.increase()
+        if play(WaveformNames.SINE) == sine:
+            problems.append("a changed Amplitude played the cached samples")
+        expect("louder sine", 1, 2, 0)
+
+        # Back to the first sine, so the louder one is least recently used
+        amplitude.set_value(start)
+        play(WaveformNames.SINE)
+        expect("sine after the louder one", 2, 2, 0)
+        play(WaveformNames.SQUARE)
+        expect("square", 2, 3, 1)
+        play(WaveformNames.SINE)
+        expect("sine after the square", 3, 3, 1)
+        amplitude.increase()
+        play(WaveformNames.SINE)
+        expect("evicted louder sine", 3, 4, 2)
+    finally:
+        amplitude.set_value(start)
+    return problems
+
+
+class SteppedGenerator:
+    """Stands in for WaveformGenerator under RenderWorker. prepare() renders
+    WORKER_CHUNKS chunks, each only once step() lets it, and checks abort()
+    after every chunk. Applying the job "stream" starts a stream."""
+
+    def __init__(self):
+        self.stream = SegmentStream.__new__(SegmentStream)
+        self.stream.active = False
+        self.started = []
+        self.applied = []
+        self.services = 0
+        self.rendering_services = 0
+        self.rendering = False
+        self.chunks = threading.Semaphore(0)
+
+    def step(self, chunks=1):
+        for _ in range(chunks):
+            self.chunks.release()
+
+    def prepare(self, waveform, abort=None):
+        self.started.append(waveform)
+        self.rendering = True
+        try:
+            for _ in range(WORKER_CHUNKS):
+                if not self.chunks.acquire(timeout=WORKER_TIMEOUT_S):
+                    return None
+                if abort is not None and abort():
+                    return None
+            return waveform
+        finally:
+            self.rendering = False
+
+    def apply(self, prepared):
+        self.applied.append(prepared)
+        self.stream.active = prepared == "stream"
+
+    def service(self):
+        self.services += 1
+        if self.rendering:
+            self.rendering_services += 1
+
+    def service_interval_ms(self):
+        return 1
+
+
+def wait_for(condition):
+    """Wait in real time for another thread to make condition() true."""
+    deadline = time.monotonic() + WORKER_TIMEOUT_S
+    while not condition():
+        if time.monotonic() > deadline:
+            return False
+        time.sleep(0.001)
+    return True
+
+
+def check_render_worker():
+    simulator.install()
+    generator = SteppedGenerator()
+    worker = RenderWorker(generator)
+    problems = []
+
+    def expect(condition, problem):
+        if not wait_for(condition):
+            problems.append(problem)
+
+    worker.start()
+    try:
+        worker.submit("a")
+        expect(lambda: generator.started == ["a"], "job a did not start")
+        worker.submit("b")
+        worker.submit("c")
+        generator.step()
+        expect(lambda: worker.aborted_jobs == 1, "job a was not aborted")
+        expect(lambda: generator.started == ["a", "c"], "job c did not start")
+        if "b" in generator.started:
+            problems.append("job b ran although c replaced it before it started")
+
+        generator.step(WORKER_CHUNKS)
+        expect(lambda: worker.completed_jobs == 1, "job c did not finish")
+        worker.submit("stream")
+        if worker.poll():
+            problems.append("poll() applied the stale result of job c")
+        if worker.dropped_results != 1:
+            problems.append("the stale result was not counted as dropped")
+        expect(lambda: generator.started[-1] == "stream", "job stream did not start")
+        generator.step(WORKER_CHUNKS)
+        expect(lambda: worker.completed_jobs == 2, "job stream did not finish")
+        if not worker.poll():
+            problems.append("poll() did not apply job stream")
+        if generator.applied != ["stream"]:
+            problems.append("applied %r, not only job stream" % generator.applied)
+
+        # The stream is fed while the worker waits and while it renders
+        services = generator.services
+        expect(lambda: generator.services > services, "no service() while idle")
+        worker.submit("e")
+        expect(lambda: generator.started[-1] == "e", "job e did not start")
+        generator.step()
+        expect(lambda: generator.rendering_services > 0, "no service() between chunks")
+    finally:
+        worker.stop()
+        generator.step(WORKER_CHUNKS)
+    expect(lambda: worker.aborted_jobs == 2, "stop() did not abort job e")
+    # The thread has ended once it no longer feeds the stream
+    services = generator.services
+    time.sleep(0.05)
+    if generator.services != services:
+        problems.append("the worker kept running after stop()")
+    if worker.poll():
+        problems.append("a render finished after stop()")
+    return problems
+
+
+def new_control(display=None):
+    control = Control(display, control_type=ControlType.BUTTONS)
+    while control.menu.current_page.setting is not WaveformParams.FREQUENCY:
+        control.menu.go_to_next_page()
+    return control
+
+
+def press(board, control, pin, duration_ms):
+    """Hold a button for duration_ms, handling input as main.py does. Returns
+    the press duration the control saw and the values shown while held."""
+    board.drive_pin(pin, 0)
+    board.run_scheduled()
+    pressed_ms = utime.ticks_ms()
+    shown = []
+    setting = control.menu.current_page.setting
+    while utime.ticks_diff(utime.ticks_ms(), pressed_ms) < duration_ms:
+        control.check_buttons()
+        shown.append(setting.current_value)
+        board.advance_ms(INPUT_POLL_MS)
+    board.drive_pin(pin, 1)
+    board.run_scheduled()
+    released_ms = utime.ticks_ms()
+    control.check_buttons()
+    return utime.ticks_diff(released_ms, pressed_ms), shown
+
+
+def check_held_ramp():
+    board = simulator.install()
+    control = new_control()
+    setting = control.menu.current_page.setting
+    start = setting.current_value
+    problems = []
+    try:
+        for duration_ms in HELD_PRESS_MS:
+            setting.set_value(start)
+            board.advance_ms(100)
+            seen_ms, shown = press(board, control, INCREASE_PIN, duration_ms)
+            held = setting.current_value
+            setting.set_value(start)
+            setting.increase(seen_ms)
+            if held != setting.current_value:
+                problems.append(
+                    "a %d ms hold ended at %r, the release-only ramp at %r"
+                    % (seen_ms, held, setting.current_value)
+                )
+            if seen_ms >= setting.check_interval and max(shown) == start:
+                problems.append("a %d ms hold never stepped while held" % seen_ms)
+    finally:
+        setting.set_value(start)
+    return problems
+
+
+def replay(board, control, edges):
+    """Drive recorded edges into the pins, handling input after each one and
+    every INPUT_POLL_MS between them, as main.py does. Edges recorded from
+    the scheduler, such as settle() catching a swallowed edge, run as soon
+    as input handling returns, as they do on the board."""
+    # Clear of the debounce window of the last accepted edge
+    board.advance_ms(DEBOUNCE_MS)
+    start_ms = utime.ticks_ms()
+    for at_ms, pin, level in edges:
+        while utime.ticks_diff(start_ms + at_ms, utime.ticks_ms()) > INPUT_POLL_MS:
+            board.advance_ms(INPUT_POLL_MS)
+            control.check_buttons()
+            board.run_scheduled()
+        wait_ms = utime.ticks_diff(start_ms + at_ms, utime.ticks_ms())
+        if wait_ms > 0:
+            board.advance_ms(wait_ms)
+        board.drive_pin(pin, level)
+        board.run_scheduled()
+        control.check_buttons()
+        board.run_scheduled()
+
+
+def check_two_button_press():
+    board = simulator.install()
+    display, lcd = new_display(board)
+    control = new_control(display)
+    setting = control.menu.current_page.setting
+    start = setting.current_value
+    problems = []
+    try:
+        replay(board, control, TWO_BUTTON_EDGES)
+        if setting.current_value != start:
+            problems.append(
+                "a two-button press moved the value from %r to %r"
+                % (start, setting.current_value)
+            )
+        if display.backlight_on:
+            problems.append("a two-button press did not toggle the backlight once")
+    finally:
+        setting.set_value(start)
+    return problems
+
+
+def check_edge_replay():
+    board = simulator.install()
+    display, lcd = new_display(board)
+    control = new_control(display)
+    menu = control.menu
+    problems = []
+
+    next_page = menu.active_pages[
+        (menu.current_page_index + 1) % len(menu.active_pages)
+    ]
+    replay(board, control, BOUNCING_PRESS_EDGES)
+    if menu.current_page is not next_page:
+        problems.append(
+            "a bouncing main press went to %r, not %r"
+            % (menu.current_page.name, next_page.name)
+        )
+    if not control.input_events.bounces:
+        problems.append("no bounce was rejected")
+    if control.take_apply_request():
+        problems.append("a short main press asked to apply")
+
+    board.advance_ms(100)
+    page = menu.current_page
+    replay(board, control, LONG_PRESS_EDGES)
+    if not control.take_apply_request():
+        problems.append("a long main press did not ask to apply")
+    if menu.current_page is not page:
+        problems.append("a long main press changed the page")
+
+    board.advance_ms(100)
+    setting = menu.current_page.setting
+    start = setting.current_value if setting else None
+    replay(board, control, BOUNCING_TWO_BUTTON_EDGES)
+    if setting and setting.current_value != start:
+        problems.append(
+            "a two-button press moved the value from %r to %r"
+            % (start, setting.current_value)
+        )
+    if display.backlight_on:
+        problems.append("a two-button press did not toggle the backlight once")
+    if control.input_events.overflows:
+        problems.append("%d events overflowed" % control.input_events.overflows)
+    return problems
+
+
+def check_lcd():
+    board = simulator.install()
+    display, lcd = new_display(board)
+    bus = board.i2c_bus(I2C_BUS)
+    problems = []
+
+    bus.clear()
+    display.render(["Sine wave", "F150KHz A0.5"])
+    if lcd.lines() != ["Sine wave       ", "F150KHz A0.5    "]:
+        problems.append("the LCD shows %r" % lcd.lines())
+    first = len(bus.transactions)
+
+    bus.clear()
+    display.render(["Sine wave", "F150KHz A0.5"])
+    if bus.transactions:
+        problems.append("an unchanged frame sent %d transfers" % len(bus.transactions))
+
+    bus.clear()
+    display.render(["Sine wave", "F151KHz A0.5"])
+    # A cursor move and a one-character run, four bytes each
+    if [len(transaction.data) for transaction in bus.transactions] != [4, 4]:
+        problems.append(
+            "one changed character took %r"
+            % [len(transaction.data) for transaction in bus.transactions]
+        )
+    if lcd.lines()[1] != "F151KHz A0.5    ":
+        problems.append("the LCD shows %r" % lcd.lines()[1])
+    # One transfer per line for the first frame, plus its cursor moves
+    if first > 2 * display.line_count:
+        problems.append("the first frame took %d transfers" % first)
+    return problems
+
+
+class RecordingDisplay:
+    def __init__(self):
+        self.frames = []  # (monotonic seconds, lines)
+
+    def render(self, lines):
+        self.frames.append((time.monotonic(), lines))
+
+
+async def drive_updater(updater):
+    """Request frames from updater the way the control loop does, with the
+    display task main.py schedules drawing them."""
+    scheduler = Scheduler()
+    scheduler.add(
+        "display",
+        updater.draw,
+        wake=updater.ready,
+        min_interval_ms=updater.frame_interval_ms,
+    )
+    asyncio.create_task(scheduler.run())
+    await asyncio.sleep(0)
+    for index in range(BURST_FRAMES):
+        updater.render(["burst", str(index)])
+    await asyncio.sleep(updater.frame_interval_ms / 1000)
+    burst = updater.display.frames[:]
+
+    start = time.monotonic()
+    index = 0
+    while time.monotonic() - start < UPDATE_SECONDS:
+        index += 1
+        updater.render(["update", str(index)])
+        await asyncio.sleep(UPDATE_REQUEST_MS / 1000)
+    await asyncio.sleep(2 * updater.frame_interval_ms / 1000)
+    # asyncio.run() cancels the scheduler's tasks on return
+    return burst, updater.display.frames[len(burst) :], ["update", str(index)]
+
+
+def check_display_updater():
+    updater = DisplayUpdater(RecordingDisplay())
+    burst, updates, newest = asyncio.run(drive_updater(updater))
+    problems = []
+
+    if [lines for _, lines in burst] != [["burst", str(BURST_FRAMES - 1)]]:
+        problems.append(
+            "a burst of %d frames drew %r" % (BURST_FRAMES, [f for _, f in burst])
+        )
+    frames = burst + updates
+    # The clock may tick in steps of a millisecond
+    shortest_ms = updater.frame_interval_ms - 1
+    for (earlier, _), (later, _) in zip(frames, frames[1:]):
+        if (later - earlier) * 1000 < shortest_ms:
+            problems.append(
+                "two draws %.1f ms apart, under the %d ms frame interval"
+                % ((later - earlier) * 1000, updater.frame_interval_ms)
+            )
+            break
+    most = UPDATE_SECONDS * 1000 // updater.frame_interval_ms + 2
+    if not updates or len(updates) > most:
+        problems.append(
+            "%d frames over %.1f s drew %d times"
+            % (updater.requests - BURST_FRAMES, UPDATE_SECONDS, len(updates))
+        )
+    elif updates[-1][1] != newest:
+        problems.append("the last frame drawn was %r, not the newest" % updates[-1][1])
+    if updater.coalesced != updater.requests - len(frames):
+        problems.append("coalesced counts %d frames" % updater.coalesced)
+    return problems
+
+
+def new_objects(call, *args):
+    """The heap objects call(*args) created, as "file:line type" where the
+    repository's code first held them."""
+    found = {}
+
+    def note(frame, value):
+        if (
+            isinstance(value, HEAP_TYPES)
+            and id(value) not in found
+            and tracemalloc.get_object_traceback(value) is not None
+        ):
+            found[id(value)] = "%s:%d %s" % (
+                os.path.relpath(frame.f_code.co_filename, ROOT),
+                frame.f_lineno,
+                type(value).__name__,
+            )
+
+    def trace(frame, event, argument):
+        filename = frame.f_code.co_filename
+        if not filename.startswith(ROOT) or filename.startswith(SIMULATOR_DIR):
+            return None
+        for value in frame.f_locals.values():
+            note(frame, value)
+        if event == "return":
+            note(frame, argument)
+        return trace
+
+    held = [index + 0.5 for index in range(FREELIST_LENGTH)]
+    for size in range(1, MAX_FREELIST_TUPLE):
+        held.extend(tuple(range(size)) for _ in range(FREELIST_LENGTH))
+    tracemalloc.start()
+    sys.settrace(trace)
+    try:
+        call(*args)
+    finally:
+        sys.settrace(None)
+        tracemalloc.stop()
+    del held
+    return sorted(set(found.values()))
+
+
+def check_allocation():
+    board = simulator.install()
+    display, lcd = new_display(board)
+    control = Control(display, control_type=ControlType.BUTTONS)
+    setting = WaveformParams.FREQUENCY
+    start = setting.current_value
+    frames = ([b"Sine wave", b"F150KHz A0.5"], [b"Sine wave", b"F151KHz A0.5"])
+    problems = []
+
+    def expect_none(name, call, *args):
+        created = new_objects(call, *args)
+        if created:
+            problem = "%s created %s" % (name, ", ".join(created))
+            if problem not in problems:
+                problems.append(problem)
+
+    try:
+        # A value's text is only rebuilt, and allocated, when the value changes
+        setting.increase()
+        control.update_display()
+        for index in range(ALLOCATION_CALLS):
+            expect_none("a changed LCD frame", display.render, frames[index % 2])
+            expect_none("an unchanged LCD frame", display.render, frames[index % 2])
+            expect_none("the main page", control.update_display)
+    finally:
+        setting.set_value(start)
+    return problems
+
+
+CHECKS = (
+    ("hot swap", check_hot_swap),
+    ("hot swap rate", check_hot_swap_rate),
+    ("streaming", check_streaming),
+    ("stream then swap", check_stream_then_swap),
+    ("offset", check_offset),
+    ("render cache", check_render_cache),
+    ("render worker", check_render_worker),
+    ("held ramp", check_held_ramp),
+    ("two-button press", check_two_button_press),
+    ("edge replay", check_edge_replay),
+    ("LCD transfers", check_lcd),
+    ("display updater", check_display_updater),
+    ("allocation", check_allocation),
+)
+
+
+def main():
+    failed = 0
+    for name, check in CHECKS:
+        problems = check()
+        print("%-20s %s" % (name, "ok" if not problems else "FAILED"))
+        for problem in problems:
+            print("    " + problem)
+        failed += bool(problems)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
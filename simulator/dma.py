@@ -0,0 +1,195 @@
+DMA_BASE = 0x50000000
+CHANNEL_COUNT = 12
+CHANNEL_STRIDE = 0x40
+MULTI_CHAN_TRIGGER = DMA_BASE + 0x430
+CHAN_ABORT = DMA_BASE + 0x444
+
+# Register order of the four aliases of a channel; the last one triggers
+READ_ADDR = "read_address"
+WRITE_ADDR = "write_address"
+TRANS_COUNT = "transfer_count"
+CTRL = "control"
+ALIASES = (
+    (READ_ADDR, WRITE_ADDR, TRANS_COUNT, CTRL),
+    (CTRL, READ_ADDR, WRITE_ADDR, TRANS_COUNT),
+    (CTRL, TRANS_COUNT, READ_ADDR, WRITE_ADDR),
+    (CTRL, WRITE_ADDR, TRANS_COUNT, READ_ADDR),
+)
+
+# CTRL fields
+EN = 1 << 0
+DATA_SIZE_SHIFT = 2
+INCR_READ = 1 << 4
+INCR_WRITE = 1 << 5
+RING_SIZE_SHIFT = 6
+RING_SEL = 1 << 10
+CHAIN_TO_SHIFT = 11
+TREQ_SEL_SHIFT = 15
+BUSY = 1 << 24
+WRITABLE_CTRL = (1 << 24) - 1
+
+TREQ_PIO0_TX0 = 0x00
+TREQ_PIO1_TX0 = 0x08
+TREQ_PERMANENT = 0x3F
+# Chained channels without pacing that keep triggering each other are a hang
+MAX_UNPACED_TRANSFERS = 1 << 20
+
+
+class DmaChannel:
+    def __init__(self, number):
+        self.number = number
+        self.read_address = 0
+        self.write_address = 0
+        # Written TRANS_COUNT is only loaded into remaining on a trigger
+        self.transfer_count = 0
+        self.remaining = 0
+        self.control = 0
+        self.busy = False
+        self.transfers = 0
+        self.triggers = 0
+
+    @property
+    def enabled(self):
+        return bool(self.control & EN)
+
+    @property
+    def treq(self):
+        return (self.control >> TREQ_SEL_SHIFT) & 0x3F
+
+    @property
+    def chain_to(self):
+        return (self.control >> CHAIN_TO_SHIFT) & 0xF
+
+    @property
+    def data_size(self):
+        return 1 << ((self.control >> DATA_SIZE_SHIFT) & 0x3)
+
+    def _step(self, address, increment, wrap):
+        if not increment:
+            return address
+        stepped = address + self.data_size
+        ring_size = (self.control >> RING_SIZE_SHIFT) & 0xF
+        if ring_size and wrap:
+            mask = (1 << ring_size) - 1
+            stepped = (address & ~mask) | (stepped & mask)
+        return stepped & 0xFFFFFFFF
+
+    def advance_addresses(self):
+        ring_on_write = bool(self.control & RING_SEL)
+        self.read_address = self._step(
+            self.read_address, self.control & INCR_READ, not ring_on_write
+        )
+        self.write_address = self._step(
+            self.write_address, self.control & INCR_WRITE, ring_on_write
+        )
+
+
+class Dma:
+    """The DMA channels, moving data as soon as their DREQ allows.
+
+    Transfers take no simulated time: the PIO drains at most one word every
+    four system clocks, while the DMA moves one per clock, so a paced channel
+    keeps its FIFO full exactly as the hardware does. Triggering a channel
+    that is already busy has no effect, and clearing EN pauses a channel
+    without ending its transfer, as on the RP2040.
+    """
+
+    def __init__(self, board):
+        self.board = board
+        self.channels = [DmaChannel(number) for number in range(CHANNEL_COUNT)]
+        self._pumping = False
+
+    def handles(self, address):
+        return DMA_BASE <= address < DMA_BASE + 0x800
+
+    def _decode(self, address):
+        offset = address - DMA_BASE
+        number = offset // CHANNEL_STRIDE
+        if number >= CHANNEL_COUNT:
+            return None, None, False
+        alias, register = divmod(offset % CHANNEL_STRIDE, 16)
+        return self.channels[number], ALIASES[alias][register // 4], register == 12
+
+    def read(self, address):
+        channel, name, _ = self._decode(address)
+        if channel is None:
+            return 0
+        if name == CTRL:
+            return channel.control | (BUSY if channel.busy else 0)
+        if name == TRANS_COUNT:
+            return channel.remaining if channel.busy else channel.transfer_count
+        return getattr(channel, name)
+
+    def write(self, address, value):
+        if address == MULTI_CHAN_TRIGGER:
+            for channel in self.channels:
+                if value & (1 << channel.number):
+                    self.trigger(channel)
+            self.pump()
+            return
+        if address == CHAN_ABORT:
+            for channel in self.channels:
+                if value & (1 << channel.number):
+                    channel.busy = False
+                    channel.remaining = 0
+            return
+        channel, name, triggers = self._decode(address)
+        if channel is None:
+            return
+        if name == CTRL:
+            channel.control = value & WRITABLE_CTRL
+        else:
+            setattr(channel, name, value & 0xFFFFFFFF)
+        # Writing zero to a trigger register is a null trigger
+        if triggers and value:
+            self.trigger(channel)
+        self.pump()
+
+    def trigger(self, channel):
+        if channel.busy:
+            return
+        channel.triggers += 1
+        channel.remaining = channel.transfer_count
+        channel.busy = channel.remaining > 0
+
+    def _dreq(self, channel):
+        treq = channel.treq
+        if treq == TREQ_PERMANENT:
+            return True
+        for base, block in ((TREQ_PIO0_TX0, 0), (TREQ_PIO1_TX0, 1)):
+            if base <= treq < base + 4:
+                return self.board.pio[block].tx_ready(treq - base)
+        return False  # peripherals that are not modelled never request data
+
+    def pump(self):
+        """Run every enabled channel as far as its DREQ allows."""
+        if self._pumping:
+            return  # a channel wrote to a DMA register; the loop below goes on
+        self._pumping = True
+        try:
+            unpaced = 0
+            progress = True
+            while progress:
+                progress = False
+                for channel in self.channels:
+                    while channel.busy and channel.enabled and self._dreq(channel):
+                        self._transfer(channel)
+                        progress = True
+                        if channel.treq == TREQ_PERMANENT:
+                            unpaced += 1
+                            if unpaced > MAX_UNPACED_TRANSFERS:
+                                raise RuntimeError("DMA channels chain without pacing")
+        finally:
+            self._pumping = False
+
+    def _transfer(self, channel):
+        size = channel.data_size
+        value = self.board.bus_read(channel.read_address, size, channel)
+        self.board.bus_write(channel.write_address, value, size, channel)
+        channel.advance_addresses()
+        channel.transfers += 1
+        channel.remaining -= 1
+        if channel.remaining == 0:
+            channel.busy = False
+            if channel.chain_to != channel.number:
+                self.trigger(self.channels[channel.chain_to])
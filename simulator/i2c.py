@@ -0,0 +1,130 @@
+from simulator.memory import BusFault
+
+# Start, address byte and stop around the data; every byte is 8 bits and an ACK
+BITS_PER_BYTE = 9
+
+# PCF8574 backpack wiring, as in display.lcd_driver
+MASK_RS = 0x01
+MASK_E = 0x04
+SHIFT_DATA = 4
+LCD_FUNCTION_4BIT = 0x20
+LCD_DDRAM = 0x80
+LCD_CLR = 0x01
+LCD_HOME = 0x02
+LINE_OFFSETS = (0x00, 0x40, 0x14, 0x54)
+
+
+class Transaction:
+    __slots__ = ("time_ns", "duration_ns", "address", "data")
+
+    def __init__(self, time_ns, duration_ns, address, data):
+        self.time_ns = time_ns
+        self.duration_ns = duration_ns
+        self.address = address
+        self.data = data
+
+
+class Hd44780:
+    """An HD44780 behind a PCF8574, rebuilt from the bytes written to the
+    expander. Nibbles are latched on the falling edge of E; the display starts
+    in 8-bit mode until the 4-bit function set arrives."""
+
+    def __init__(self, line_count=2, column_count=16):
+        self.line_count = line_count
+        self.column_count = column_count
+        self.ddram = bytearray(b" " * 0x80)
+        self.address = 0
+        self.four_bit = False
+        self.high_nibble = None
+        self.last_port = 0
+        self.commands = 0
+        self.characters = 0
+
+    def port_write(self, value):
+        if self.last_port & MASK_E and not value & MASK_E:
+            self._latch(self.last_port)
+        self.last_port = value
+
+    def _latch(self, port):
+        nibble = port >> SHIFT_DATA
+        is_data = bool(port & MASK_RS)
+        if not self.four_bit:
+            if not is_data and nibble << 4 == LCD_FUNCTION_4BIT:
+                self.four_bit = True
+            return
+        if self.high_nibble is None:
+            self.high_nibble = nibble
+            return
+        value = (self.high_nibble << 4) | nibble
+        self.high_nibble = None
+        if is_data:
+            self.characters += 1
+            self.ddram[self.address & 0x7F] = value
+            self.address = (self.address + 1) & 0x7F
+        else:
+            self.commands += 1
+            self._command(value)
+
+    def _command(self, value):
+        if value & LCD_DDRAM:
+            self.address = value & 0x7F
+        elif value == LCD_CLR:
+            self.ddram[:] = b" " * len(self.ddram)
+            self.address = 0
+        elif value == LCD_HOME:
+            self.address = 0
+
+    def line(self, row):
+        start = LINE_OFFSETS[row]
+        return bytes(self.ddram[start : start + self.column_count])
+
+    def lines(self):
+        return [self.line(row).decode() for row in range(self.line_count)]
+
+
+class I2cBus:
+    """Records every transfer on a bus and hands the bytes to the devices on it.
+
+    A write blocks for as long as it takes on the wire, so it advances the
+    simulated clock.
+    """
+
+    def __init__(self, board, bus_id, frequency=400_000):
+        self.board = board
+        self.bus_id = bus_id
+        self.frequency = frequency
+        self.devices = {}
+        self.transactions = []
+
+    def attach(self, address, device):
+        self.devices[address] = device
+        return device
+
+    def duration_ns(self, byte_count):
+        return (byte_count + 1) * BITS_PER_BYTE * 1_000_000_000 // self.frequency
+
+    def writeto(self, address, data, stop=True):
+        device = self.devices.get(address)
+        if device is None:
+            raise OSError(5, "EIO: no device at 0x%02X" % address)  # NACK
+        data = bytes(data)
+        duration = self.duration_ns(len(data))
+        self.transactions.append(
+            Transaction(self.board.now_ns, duration, address, data)
+        )
+        for value in data:
+            device.port_write(value)
+        self.board.advance_ns(duration)
+        return len(data)
+
+    def scan(self):
+        return sorted(self.devices)
+
+    def readfrom(self, address, count, stop=True):
+        raise BusFault("reads from I2C devices are not modelled")
+
+    def clear(self):
+        self.transactions = []
+
+    def byte_count(self):
+        return sum(len(transaction.data) for transaction in self.transactions)
@@ -0,0 +1,96 @@
+"""Simulated `machine`: mem32, freq, interrupts, Pin and I2C."""
+
+from simulator import current_board
+from simulator.board import IRQ_FALLING, IRQ_RISING
+
+
+class _Mem32:
+    def __getitem__(self, address):
+        return current_board().read32(address)
+
+    def __setitem__(self, address, value):
+        current_board().write32(address, value)
+
+
+mem32 = _Mem32()
+
+
+def freq(frequency=None):
+    board = current_board()
+    if frequency is None:
+        return board.system_frequency
+    board.set_frequency(frequency)
+
+
+def disable_irq():
+    board = current_board()
+    state = board.irq_disabled
+    board.irq_disabled = True
+    return state
+
+
+def enable_irq(state=False):
+    current_board().irq_disabled = state
+
+
+class Pin:
+    IN = 0
+    OUT = 1
+    OPEN_DRAIN = 2
+    ALT = 3
+    PULL_UP = 1
+    PULL_DOWN = 2
+    IRQ_FALLING = IRQ_FALLING
+    IRQ_RISING = IRQ_RISING
+
+    def __init__(self, number, mode=-1, pull=-1, value=None):
+        self.number = number
+        self.state = current_board().pin(number)
+        self.state.pin = self
+        self.init(mode, pull, value)
+
+    def init(self, mode=-1, pull=-1, value=None):
+        if mode != -1:
+            self.mode = mode
+        if pull == Pin.PULL_UP:
+            self.state.level = 1
+        elif pull == Pin.PULL_DOWN:
+            self.state.level = 0
+        if value is not None:
+            self.state.level = 1 if value else 0
+
+    def value(self, level=None):
+        if level is None:
+            return self.state.level
+        self.state.level = 1 if level else 0
+
+    def on(self):
+        self.value(1)
+
+    def off(self):
+        self.value(0)
+
+    def toggle(self):
+        self.value(not self.state.level)
+
+    def irq(self, handler=None, trigger=IRQ_FALLING | IRQ_RISING, hard=False):
+        self.state.handler = handler
+        self.state.trigger = trigger
+        self.state.hard = hard
+
+    def __repr__(self):
+        return "Pin(%d)" % self.number
+
+
+class I2C:
+    def __init__(self, bus_id, scl=None, sda=None, freq=400_000):
+        self.bus = current_board().i2c_bus(bus_id, freq)
+
+    def writeto(self, address, data, stop=True):
+        return self.bus.writeto(address, data, stop)
+
+    def readfrom(self, address, count, stop=True):
+        return self.bus.readfrom(address, count, stop)
+
+    def scan(self):
+        return self.bus.scan()
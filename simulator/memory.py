@@ -0,0 +1,139 @@
+import ctypes
+from bisect import bisect_right
+
+SRAM_BASE = 0x20000000
+SRAM_SIZE = 264 * 1024
+# Allocations are word aligned, with a guard word between them so that a
+# DMA running past the end of a buffer faults instead of reading a neighbour
+ALLOCATION_ALIGNMENT = 4
+GUARD_BYTES = 4
+
+
+class BusFault(Exception):
+    """An access to an address that no buffer or register is mapped at."""
+
+
+def host_address(buffer):
+    """Address of a writable buffer in host memory, or None if it is read-only."""
+    view = memoryview(buffer)
+    if view.readonly:
+        return None
+    return ctypes.addressof((ctypes.c_char * view.nbytes).from_buffer(view))
+
+
+class Region:
+    __slots__ = ("address", "size", "buffer", "view", "host_address", "watches")
+
+    def __init__(self, address, buffer):
+        self.buffer = buffer
+        self.view = memoryview(buffer).cast("B")
+        self.address = address
+        self.size = self.view.nbytes
+        self.host_address = host_address(buffer)
+        self.watches = []
+
+
+class Watch:
+    """Counts DMA reads inside [address, address + size) while active."""
+
+    def __init__(self, address, size):
+        self.address = address
+        self.size = size
+        self.active = False
+        self.reads = 0
+
+    def __enter__(self):
+        self.active = True
+        return self
+
+    def __exit__(self, *exc_info):
+        self.active = False
+
+
+class Memory:
+    """SRAM of the simulated board, made of the Python buffers the code under
+    test hands to the hardware.
+
+    uctypes.addressof() maps a buffer into SRAM the first time it is asked
+    for, and the buffer is kept alive from then on, as the DMA may still be
+    reading it. Reads and writes through mem32 and the DMA go straight to the
+    buffer, so the hardware always sees what the code last wrote there.
+    """
+
+    def __init__(self, base=SRAM_BASE, size=SRAM_SIZE):
+        self.base = base
+        self.limit = base + size
+        self.next_address = base
+        self.regions = []
+        self._starts = []
+        self._by_host_address = {}
+        self._by_id = {}
+
+    def address_of(self, buffer):
+        address = host_address(buffer)
+        if address is None:
+            region = self._by_id.get(id(buffer))
+            if region is None:
+                region = self._map(buffer)
+                self._by_id[id(buffer)] = region
+            return region.address
+        region = self._host_region(address)
+        if region is None:
+            # Map the whole underlying object, so slices of it share one region
+            owner = getattr(buffer, "obj", buffer)
+            region = self._map(owner)
+            region = self._host_region(address)
+        return region.address + address - region.host_address
+
+    def _host_region(self, address):
+        for region in self._by_host_address.values():
+            if region.host_address <= address < region.host_address + region.size:
+                return region
+        return None
+
+    def _map(self, buffer):
+        address = self.next_address
+        region = Region(address, buffer)
+        if address + region.size > self.limit:
+            raise MemoryError("simulated SRAM is full")
+        self.next_address = (
+            address + region.size + GUARD_BYTES + ALLOCATION_ALIGNMENT - 1
+        ) & -ALLOCATION_ALIGNMENT
+        index = bisect_right(self._starts, address)
+        self._starts.insert(index, address)
+        self.regions.insert(index, region)
+        if region.host_address is not None:
+            self._by_host_address[region.host_address] = region
+        return region
+
+    def contains(self, address):
+        return self.base <= address < self.limit
+
+    def region_at(self, address, size=1):
+        index = bisect_right(self._starts, address) - 1
+        if index >= 0:
+            region = self.regions[index]
+            if address + size <= region.address + region.size:
+                return region
+        raise BusFault("no buffer mapped at 0x%08X" % address)
+
+    def read(self, address, size=4):
+        region = self.region_at(address, size)
+        offset = address - region.address
+        for watch in region.watches:
+            if watch.active and watch.address <= address < watch.address + watch.size:
+                watch.reads += 1
+        return int.from_bytes(region.view[offset : offset + size], "little")
+
+    def write(self, address, value, size=4):
+        region = self.region_at(address, size)
+        offset = address - region.address
+        region.view[offset : offset + size] = (value & ((1 << 8 * size) - 1)).to_bytes(
+            size, "little"
+        )
+
+    def watch(self, address, size):
+        """A Watch over a mapped range; use it as a context manager."""
+        watch = Watch(address, size)
+        self.region_at(address, size).watches.append(watch)
+        return watch
@@ -0,0 +1,67 @@
+"""Simulated `micropython`: the scheduler queue and the code emitters.
+
+native and viper return the function unchanged, so compiled code runs as
+plain Python. viper also gives the function's module the ptr8, ptr16 and
+ptr32 casts viper code uses as built-ins.
+"""
+
+from simulator import current_board
+
+
+def const(value):
+    return value
+
+
+def schedule(function, argument):
+    current_board().schedule(function, argument)
+
+
+def alloc_emergency_exception_buf(size):
+    pass
+
+
+def opt_level(level=None):
+    return 0 if level is None else None
+
+
+def mem_info(verbose=False):
+    pass
+
+
+class Pointer:
+    """A buffer indexed as viper's pointer casts do. Loads of 8 and 16 bits
+    are unsigned and 32-bit ones signed; stores keep the low bits."""
+
+    def __init__(self, buffer, typecode, bits, signed):
+        self.view = memoryview(buffer).cast("B").cast(typecode)
+        self.mask = (1 << bits) - 1
+        self.sign = 1 << (bits - 1) if signed else 0
+
+    def __getitem__(self, index):
+        return self.view[index]
+
+    def __setitem__(self, index, value):
+        value &= self.mask
+        self.view[index] = (value ^ self.sign) - self.sign
+
+
+def ptr8(buffer):
+    return Pointer(buffer, "B", 8, False)
+
+
+def ptr16(buffer):
+    return Pointer(buffer, "H", 16, False)
+
+
+def ptr32(buffer):
+    return Pointer(buffer, "i", 32, True)
+
+
+def native(function):
+    return function
+
+
+def viper(function):
+    for cast in (ptr8, ptr16, ptr32):
+        function.__globals__.setdefault(cast.__name__, cast)
+    return function
@@ -0,0 +1,264 @@
+from array import array
+from collections import deque
+
+PIO0_BASE = 0x50200000
+PIO1_BASE = 0x50300000
+PIO_SIZE = 0x1000
+STATE_MACHINE_COUNT = 4
+
+CTRL = 0x000
+FSTAT = 0x004
+FDEBUG = 0x008
+FLEVEL = 0x00C
+TXF0 = 0x010
+SM0_CLKDIV = 0x0C8
+SM_STRIDE = 0x18
+
+TX_FIFO_DEPTH = 4
+FDEBUG_TXOVER_SHIFT = 16
+FDEBUG_TXSTALL_SHIFT = 24
+FSTAT_TXFULL_SHIFT = 16
+FSTAT_TXEMPTY_SHIFT = 24
+DEFAULT_CLKDIV = 1 << 16
+
+NO_SOURCE = 0xFFFFFFFF  # words pushed by the CPU rather than the DMA
+
+
+class OutputRecorder:
+    """The samples a state machine drove onto its pins, with their times.
+
+    Samples are kept in runs of equal spacing: a new run starts whenever the
+    clock divider changes or the state machine stalled on an empty FIFO, so
+    every gap between runs is a glitch in the output. For each word the
+    address the DMA read it from is kept, so tests can tell which buffer was
+    playing when.
+    """
+
+    def __init__(self):
+        self.runs = []  # [start_ns, period_ns, bytearray of samples]
+        self.sources = array("L")
+        self.word_times = array("d")
+        self.stalls = []  # (time_ns, duration_ns)
+
+    def clear(self):
+        self.runs = []
+        self.sources = array("L")
+        self.word_times = array("d")
+        self.stalls = []
+
+    def add_word(self, time_ns, source):
+        self.word_times.append(time_ns)
+        self.sources.append(source)
+
+    def add_sample(self, time_ns, period_ns, value):
+        if self.runs:
+            run = self.runs[-1]
+            expected = run[0] + len(run[2]) * run[1]
+            if run[1] == period_ns and abs(expected - time_ns) < period_ns / 2:
+                run[2].append(value)
+                return
+        self.runs.append([time_ns, period_ns, bytearray((value,))])
+
+    def sample_count(self):
+        return sum(len(run[2]) for run in self.runs)
+
+    def samples(self):
+        return b"".join(bytes(run[2]) for run in self.runs)
+
+    def timestamps(self):
+        """Time in nanoseconds of every sample, in order."""
+        for start, period, data in self.runs:
+            for index in range(len(data)):
+                yield start + index * period
+
+    def gaps(self, tolerance=0.5):
+        """(time_ns, duration_ns) of every hole in the output longer than
+        tolerance sample periods, where the pins held their last value."""
+        found = []
+        for previous, run in zip(self.runs, self.runs[1:]):
+            end = previous[0] + len(previous[2]) * previous[1]
+            if run[0] - end > tolerance * previous[1]:
+                found.append((end, run[0] - end))
+        return found
+
+    def sample_rate(self):
+        """Samples per second of the latest run."""
+        return 1e9 / self.runs[-1][1] if self.runs else None
+
+
+class Program:
+    def __init__(self, instructions, options):
+        self.instructions = instructions
+        self.options = options
+
+    def output_width(self):
+        """Bits per sample of an `out(pins, n)` program with autopull."""
+        if (
+            len(self.instructions) != 1
+            or self.instructions[0][0] != "out"
+            or not self.options.get("autopull")
+        ):
+            raise NotImplementedError(
+                "only single-instruction `out(pins, n)` programs with autopull "
+                "are modelled"
+            )
+        return self.instructions[0][1][1]
+
+
+class StateMachineModel:
+    """One state machine running an autopull `out(pins, n)` loop.
+
+    It shifts one sample onto the pins every clock and pulls the next word
+    from its TX FIFO when the output shift register runs empty. With the FIFO
+    empty it stalls, holding the pins, and sets its TXSTALL flag.
+    """
+
+    def __init__(self, block, number):
+        self.block = block
+        self.number = number
+        self.fifo = deque()
+        self.clkdiv = DEFAULT_CLKDIV
+        self.enabled = False
+        self.program = None
+        self.width = 8
+        self.shift_right = True
+        self.pull_threshold = 32
+        self.osr = 0
+        self.osr_bits = 0
+        self.osr_source = NO_SOURCE
+        self.next_cycle_ns = 0.0
+        self.stalled = True
+        self.recorder = None
+
+    def load(self, program, recorder):
+        self.program = program
+        self.width = program.output_width()
+        self.shift_right = program.options.get("out_shiftdir", 1) == 1
+        self.pull_threshold = program.options.get("pull_thresh", 32) or 32
+        self.recorder = recorder
+
+    def period_ns(self):
+        divider = (self.clkdiv >> 16) + ((self.clkdiv >> 8) & 0xFF) / 256
+        if divider == 0:
+            divider = 65536
+        return divider * 1e9 / self.block.board.system_frequency
+
+    def push(self, value, source=NO_SOURCE):
+        if len(self.fifo) >= TX_FIFO_DEPTH:
+            self.block.fdebug |= 1 << (FDEBUG_TXOVER_SHIFT + self.number)
+            return
+        self.fifo.append((value & 0xFFFFFFFF, source))
+        if self.stalled:
+            # Resume on the next clock edge after the data arrived
+            self.next_cycle_ns = max(self.next_cycle_ns, self.block.board.now_ns)
+
+    def run_until(self, end_ns):
+        if not self.enabled or self.program is None:
+            return
+        board = self.block.board
+        mask = (1 << self.width) - 1
+        period = self.period_ns()
+        while self.next_cycle_ns <= end_ns:
+            if self.osr_bits == 0:
+                if not self.fifo:
+                    if not self.stalled:
+                        self.recorder.stalls.append((self.next_cycle_ns, None))
+                    self.stalled = True
+                    self.block.fdebug |= 1 << (FDEBUG_TXSTALL_SHIFT + self.number)
+                    self.next_cycle_ns = end_ns + period
+                    break
+                self.osr, self.osr_source = self.fifo.popleft()
+                self.osr_bits = self.pull_threshold
+                self.recorder.add_word(self.next_cycle_ns, self.osr_source)
+                if self.stalled and self.recorder.stalls:
+                    time, duration = self.recorder.stalls[-1]
+                    if duration is None:
+                        self.recorder.stalls[-1] = (time, self.next_cycle_ns - time)
+                self.stalled = False
+                board.dma.pump()
+                # The DMA may have written the clock divider
+                period = self.period_ns()
+            if self.shift_right:
+                value = self.osr & mask
+                self.osr >>= self.width
+            else:
+                shift = self.pull_threshold - self.width
+                value = (self.osr >> shift) & mask
+                self.osr = (self.osr << self.width) & 0xFFFFFFFF
+            self.osr_bits -= self.width
+            self.recorder.add_sample(self.next_cycle_ns, period, value)
+            self.next_cycle_ns += period
+
+
+class PioBlock:
+    def __init__(self, board, index):
+        self.board = board
+        self.index = index
+        self.base = PIO0_BASE if index == 0 else PIO1_BASE
+        self.state_machines = [
+            StateMachineModel(self, number) for number in range(STATE_MACHINE_COUNT)
+        ]
+        self.fdebug = 0
+        self.registers = {}
+
+    def handles(self, address):
+        return self.base <= address < self.base + PIO_SIZE
+
+    def tx_ready(self, number):
+        return len(self.state_machines[number].fifo) < TX_FIFO_DEPTH
+
+    def run_until(self, end_ns):
+        for state_machine in self.state_machines:
+            state_machine.run_until(end_ns)
+
+    def set_enabled(self, number, enabled):
+        state_machine = self.state_machines[number]
+        if enabled and not state_machine.enabled:
+            state_machine.next_cycle_ns = self.board.now_ns
+        state_machine.enabled = enabled
+
+    def _state_machine_register(self, offset):
+        if SM0_CLKDIV <= offset < SM0_CLKDIV + STATE_MACHINE_COUNT * SM_STRIDE:
+            number, register = divmod(offset - SM0_CLKDIV, SM_STRIDE)
+            if register == 0:
+                return self.state_machines[number]
+        return None
+
+    def read(self, address):
+        offset = address - self.base
+        if offset == CTRL:
+            return sum(1 << sm.number for sm in self.state_machines if sm.enabled)
+        if offset == FSTAT:
+            value = 0
+            for sm in self.state_machines:
+                if len(sm.fifo) >= TX_FIFO_DEPTH:
+                    value |= 1 << (FSTAT_TXFULL_SHIFT + sm.number)
+                if not sm.fifo:
+                    value |= 1 << (FSTAT_TXEMPTY_SHIFT + sm.number)
+            return value
+        if offset == FDEBUG:
+            return self.fdebug
+        if offset == FLEVEL:
+            return sum(len(sm.fifo) << (8 * sm.number) for sm in self.state_machines)
+        state_machine = self._state_machine_register(offset)
+        if state_machine is not None:
+            return state_machine.clkdiv
+        return self.registers.get(offset, 0)
+
+    def write(self, address, value, source=NO_SOURCE):
+        offset = address - self.base
+        if TXF0 <= offset < TXF0 + 4 * STATE_MACHINE_COUNT:
+            self.state_machines[(offset - TXF0) // 4].push(value, source)
+            return
+        if offset == CTRL:
+            for sm in self.state_machines:
+                self.set_enabled(sm.number, bool(value & (1 << sm.number)))
+            return
+        if offset == FDEBUG:
+            self.fdebug &= ~value  # write 1 to clear
+            return
+        state_machine = self._state_machine_register(offset)
+        if state_machine is not None:
+            state_machine.clkdiv = value & 0xFFFFFF00
+            return
+        self.registers[offset] = value
@@ -0,0 +1,131 @@
+"""Simulated `rp2`: PIO programs are recorded by name rather than assembled,
+and StateMachine runs the ones the board can model."""
+
+from simulator import current_board
+from simulator.pio import Program, TX_FIFO_DEPTH
+
+# Time a blocking put() waits for the FIFO before giving up
+PUT_TIMEOUT_NS = 1_000_000_000
+
+
+class PIO:
+    IN_LOW = 0
+    IN_HIGH = 1
+    OUT_LOW = 2
+    OUT_HIGH = 3
+    SHIFT_LEFT = 0
+    SHIFT_RIGHT = 1
+    JOIN_NONE = 0
+    JOIN_TX = 1
+    JOIN_RX = 2
+    IRQ_SM0 = 0x100
+    IRQ_SM1 = 0x200
+    IRQ_SM2 = 0x400
+    IRQ_SM3 = 0x800
+
+    def __init__(self, block):
+        self.block = block
+
+    def state_machine(self, number, program=None, **options):
+        return StateMachine(self.block * 4 + number, program, **options)
+
+
+class _Operand(str):
+    pass
+
+
+class _Instruction:
+    def __init__(self, name, arguments):
+        self.name = name
+        self.arguments = arguments
+
+    def side(self, value):
+        return self
+
+    def __getitem__(self, delay):
+        return self
+
+
+class _Assembler(dict):
+    """Globals for a PIO program body: every instruction is recorded, and
+    every other name is an operand such as pins, x or osr."""
+
+    def __init__(self):
+        super().__init__(__builtins__=__builtins__)
+        self.instructions = []
+
+    def __missing__(self, name):
+        if name in _INSTRUCTIONS:
+            return lambda *arguments: self._emit(name, arguments)
+        return _Operand(name)
+
+    def _emit(self, name, arguments):
+        if name not in ("label", "wrap", "wrap_target"):
+            self.instructions.append((name, arguments))
+        return _Instruction(name, arguments)
+
+
+_INSTRUCTIONS = (
+    "wrap_target",
+    "wrap",
+    "label",
+    "word",
+    "jmp",
+    "wait",
+    "in_",
+    "out",
+    "push",
+    "pull",
+    "mov",
+    "irq",
+    "set",
+    "nop",
+)
+
+
+def asm_pio(**options):
+    def assemble(function):
+        assembler = _Assembler()
+        type(function)(function.__code__, assembler)()
+        return Program(assembler.instructions, options)
+
+    return assemble
+
+
+class StateMachine:
+    def __init__(self, number, program=None, freq=-1, **options):
+        self.number = number
+        board = current_board()
+        self.block = board.pio[number // 4]
+        self.model = self.block.state_machines[number % 4]
+        if program is not None:
+            self.init(program, freq, **options)
+
+    def init(self, program, freq=-1, **options):
+        board = current_board()
+        self.model.load(program, board.output)
+        if freq > 0:
+            divider = board.system_frequency * 256 // freq
+            self.model.clkdiv = divider << 8
+
+    def active(self, value=None):
+        if value is None:
+            return self.model.enabled
+        with current_board().lock:
+            current_board().sync()
+            self.block.set_enabled(self.model.number, bool(value))
+
+    def put(self, value, shift=0):
+        board = current_board()
+        waited = 0
+        while len(self.model.fifo) >= TX_FIFO_DEPTH:
+            if waited > PUT_TIMEOUT_NS:
+                raise RuntimeError("state machine %d never drains" % self.number)
+            board.poll()
+            waited += board.poll_cost_ns
+        with board.lock:
+            board.sync()
+            self.model.push(value >> shift)
+
+    def tx_fifo(self):
+        return len(self.model.fifo)
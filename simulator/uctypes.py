@@ -0,0 +1,13 @@
+"""Simulated `uctypes`: addressof maps a buffer into the board's SRAM."""
+
+from simulator import current_board
+
+
+def addressof(buffer):
+    return current_board().memory.address_of(buffer)
+
+
+def bytearray_at(address, size):
+    region = current_board().memory.region_at(address, size)
+    offset = address - region.address
+    return region.view[offset : offset + size]
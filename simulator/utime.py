@@ -0,0 +1,54 @@
+"""Simulated `utime` on the board clock. Every ticks call costs a little
+simulated time, so loops that wait on the clock always end."""
+
+from simulator import current_board
+
+TICKS_PERIOD = 1 << 30
+TICKS_MAX = TICKS_PERIOD - 1
+TICKS_HALF_PERIOD = TICKS_PERIOD // 2
+
+
+def _now_ns():
+    board = current_board()
+    board.poll()
+    return board.now_ns
+
+
+def ticks_ms():
+    return (_now_ns() // 1_000_000) & TICKS_MAX
+
+
+def ticks_us():
+    return (_now_ns() // 1_000) & TICKS_MAX
+
+
+def ticks_cpu():
+    return (_now_ns() * current_board().system_frequency // 1_000_000_000) & TICKS_MAX
+
+
+def ticks_add(ticks, delta):
+    return (ticks + delta) & TICKS_MAX
+
+
+def ticks_diff(end, start):
+    return ((end - start + TICKS_HALF_PERIOD) & TICKS_MAX) - TICKS_HALF_PERIOD
+
+
+def time_ns():
+    return _now_ns()
+
+
+def time():
+    return _now_ns() // 1_000_000_000
+
+
+def sleep_ms(duration):
+    current_board().advance_ns(duration * 1_000_000)
+
+
+def sleep_us(duration):
+    current_board().advance_ns(duration * 1_000)
+
+
+def sleep(duration):
+    current_board().advance_ns(duration * 1_000_000_000)
@@ -0,0 +1,143 @@
+DEFAULT_WIDTH = 16  # columns of the LCD
+
+SPACE = 0x20
+COMMA = 0x2C
+MINUS = 0x2D
+POINT = 0x2E
+ZERO = 0x30
+KILO = 0x4B
+MEGA = 0x4D
+
+KILO_SCALE = 1_000
+MEGA_SCALE = 1_000_000
+
+SCRATCH_WIDTH = 32
+
+_encoded = {}
+# Text of each control's value, keyed by control and rebuilt when its version changes
+_value_text = {}
+_scratch = None
+
+
+def encoded(text):
+    """Bytes of text, encoded once and then reused."""
+    data = _encoded.get(text)
+    if data is None:
+        data = text.encode()
+        _encoded[text] = data
+    return data
+
+
+class LineFormatter:
+    """Builds one LCD line in a preallocated buffer without allocating.
+
+    Numbers are formatted in fixed point from tenths of a unit: at least
+    1000 is shown in K and at least 1000000 in M, with one decimal, and
+    other values with one decimal unless they are whole. Text past the
+    width is counted but not stored, so fits() tells whether the line had to
+    be cut. The buffer is padded with spaces.
+
+    The text of a control's value is only rebuilt when its version changes,
+    since the float arithmetic behind it allocates on MicroPython.
+    """
+
+    def __init__(self, width=DEFAULT_WIDTH):
+        self.width = width
+        self.buffer = bytearray(width)
+        self.length = 0
+        self.clear()
+
+    def clear(self):
+        buffer = self.buffer
+        for index in range(self.width):
+            buffer[index] = SPACE
+        self.length = 0
+
+    def fits(self):
+        return self.length <= self.width
+
+    def put_byte(self, code):
+        if self.length < self.width:
+            self.buffer[self.length] = code
+        self.length += 1
+
+    def put_text(self, text):
+        buffer = self.buffer
+        width = self.width
+        length = self.length
+        for code in encoded(text) if isinstance(text, str) else text:
+            if length < width:
+                buffer[length] = code
+            length += 1
+        self.length = length
+
+    def put_int(self, number):
+        """Write a non-negative integer with thousands separators."""
+        digits = 1
+        divisor = 1
+        while divisor * 10 <= number:
+            divisor *= 10
+            digits += 1
+        buffer = self.buffer
+        width = self.width
+        length = self.length
+        while divisor:
+            if length < width:
+                buffer[length] = ZERO + number // divisor % 10
+            length += 1
+            divisor //= 10
+            digits -= 1
+            if digits and digits % 3 == 0:
+                if length < width:
+                    buffer[length] = COMMA
+                length += 1
+        self.length = length
+
+    def put_tenths(self, tenths, whole=False, unit=""):
+        """Write a value given in tenths, scaled to K or M when large."""
+        if tenths < 0:
+            self.put_byte(MINUS)
+            tenths = -tenths
+        suffix = 0
+        if tenths >= MEGA_SCALE * 10:
+            tenths = (tenths + MEGA_SCALE // 2) // MEGA_SCALE
+            suffix = MEGA
+        elif tenths >= KILO_SCALE * 10:
+            tenths = (tenths + KILO_SCALE // 2) // KILO_SCALE
+            suffix = KILO
+        self.put_int(tenths // 10)
+        if suffix or not whole:
+            self.put_byte(POINT)
+            self.put_byte(ZERO + tenths % 10)
+        if suffix:
+            self.put_byte(suffix)
+        self.put_text(unit)
+
+    def put_control_value(self, control):
+        cached = _value_text.get(control)
+        if cached is None or cached[0] != control.version:
+            cached = (control.version, _format_value(control))
+            _value_text[control] = cached
+        self.put_text(cached[1])
+
+
+def _format_value(control):
+    global _scratch
+    if _scratch is None:
+        _scratch = LineFormatter(SCRATCH_WIDTH)
+    _scratch.clear()
+    value = control.current_value
+    tenths = int((-value if value < 0 else value) * 10 + 0.5)
+    _scratch.put_tenths(-tenths if value < 0 else tenths, value % 1 == 0, control.unit)
+    return bytes(_scratch.buffer[: min(_scratch.length, SCRATCH_WIDTH)])
+
+
+def format_params_line(formatter, params):
+    """Write "<short name><value>" for every parameter. Returns True if it fits."""
+    formatter.clear()
+    for index in range(len(params)):
+        if index:
+            formatter.put_byte(SPACE)
+        formatter.put_text(params[index].short_name)
+        formatter.put_control_value(params[index])
+    return formatter.fits()
@@ -0,0 +1,24 @@
+import gc
+
+GC_FREE_THRESHOLD = 16 * 1024
+
+
+def free_heap():
+    """Free heap in bytes, or None where the runtime cannot report it (CPython)."""
+    mem_free = getattr(gc, "mem_free", None)
+    return mem_free() if mem_free is not None else None
+
+
+def allocated_heap():
+    """Allocated heap in bytes, or None where the runtime cannot report it (CPython)."""
+    mem_alloc = getattr(gc, "mem_alloc", None)
+    return mem_alloc() if mem_alloc is not None else None
+
+
+def collect_if_low(threshold=GC_FREE_THRESHOLD):
+    """Collect when the free heap is below threshold. Returns True if it ran."""
+    free = free_heap()
+    if free is None or free >= threshold:
+        return False
+    gc.collect()
+    return True
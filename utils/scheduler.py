@@ -0,0 +1,70 @@
+try:
+    import uasyncio as asyncio
+except ImportError:
+    import asyncio
+
+from utils.telemetry import telemetry
+
+
+class Task:
+    def __init__(self, name, step, interval_ms=None, wake=None, min_interval_ms=0):
+        self.name = name
+        self.step = step
+        self.interval_ms = interval_ms
+        self.wake = wake
+        self.min_interval_ms = min_interval_ms
+        # Read over the serial console with "stats"; see utils.telemetry
+        self.timer = telemetry.timer("task." + name)
+
+
+class Scheduler:
+    """Cooperative scheduler on top of asyncio that times every task.
+
+    A task is a plain function that is called when its wake event is set or
+    its interval has passed, whichever comes first. A task without a wake
+    event runs every interval_ms, and one without an interval only runs when
+    woken. A step may return a number of milliseconds to wait before the
+    next run instead of interval_ms. min_interval_ms spaces runs out even
+    when wake events arrive faster.
+
+    wake can be an asyncio Event or, on MicroPython, a ThreadSafeFlag, which
+    may be set from an interrupt or the other core.
+    """
+
+    def __init__(self):
+        self.tasks = []
+
+    def add(self, name, step, interval_ms=None, wake=None, min_interval_ms=0):
+        task = Task(name, step, interval_ms, wake, min_interval_ms)
+        self.tasks.append(task)
+        return task
+
+    async def _wait(self, task, delay_ms):
+        if task.wake is None:
+            await asyncio.sleep(delay_ms / 1000)
+            return
+        if delay_ms is None:
+            await task.wake.wait()
+        else:
+            try:
+                await asyncio.wait_for(task.wake.wait(), delay_ms / 1000)
+            except asyncio.TimeoutError:
+                return
+        task.wake.clear()
+
+    async def _run(self, task):
+        delay_ms = task.interval_ms
+        while True:
+            await self._wait(task, delay_ms)
+            started = telemetry.start()
+            next_delay_ms = task.step()
+            telemetry.stop(task.timer, started)
+            delay_ms = task.interval_ms if next_delay_ms is None else next_delay_ms
+            if task.min_interval_ms:
+                await asyncio.sleep(task.min_interval_ms / 1000)
+
+    async def run(self):
+        for task in self.tasks:
+            asyncio.create_task(self._run(task))
+        while True:
+            await asyncio.sleep(3600)
@@ -0,0 +1,221 @@
+"""Named timers and counters for the hot paths, dumped over USB serial.
+
+Instrumented code keeps the Timer or Counter it registered and brackets the
+work with start() and stop(). While telemetry is disabled, start() returns
+None and stop() returns at once, so the cost is two calls per site.
+
+The dump is a compact line protocol, one record per line:
+
+    T <name> <count> <min us> <mean us> <max us>
+    C <name> <value>
+    M <free bytes> <min free bytes> <allocated bytes> <collections>
+    E
+
+Gauges, which hold a level such as a sample rate rather than a count,
+are C records too; they are set whether or not telemetry is enabled, and
+reset leaves them alone.
+
+Memory numbers are -1 where the runtime cannot report them. Collections
+are counted from drops in the allocated heap between samples, so they are
+a lower bound.
+"""
+
+import gc
+import sys
+
+from utils.memory import allocated_heap, free_heap
+from utils.ticks import ticks_diff, ticks_us
+
+try:
+    import select
+except ImportError:
+    import uselect as select
+
+UNKNOWN = -1
+END_OF_LINE = (0x0A, 0x0D)
+
+
+class Timer:
+    __slots__ = ("name", "count", "total_us", "min_us", "max_us")
+
+    def __init__(self, name):
+        self.name = name
+        self.reset()
+
+    def reset(self):
+        self.count = 0
+        self.total_us = 0
+        self.min_us = 0
+        self.max_us = 0
+
+    def add(self, elapsed_us):
+        if self.count == 0 or elapsed_us < self.min_us:
+            self.min_us = elapsed_us
+        if elapsed_us > self.max_us:
+            self.max_us = elapsed_us
+        self.count += 1
+        self.total_us += elapsed_us
+
+    def mean_us(self):
+        return self.total_us // self.count if self.count else 0
+
+
+class Counter:
+    __slots__ = ("name", "value")
+
+    def __init__(self, name):
+        self.name = name
+        self.value = 0
+
+    def reset(self):
+        self.value = 0
+
+
+class Telemetry:
+    def __init__(self, enabled=False):
+        self.enabled = enabled
+        self.timers = []
+        self.counters = []
+        self.gauges = []
+        self.reset_memory()
+
+    def _find(self, items, name, kind):
+        for item in items:
+            if item.name == name:
+                return item
+        item = kind(name)
+        items.append(item)
+        return item
+
+    def timer(self, name):
+        """The Timer called name, registered on first use."""
+        return self._find(self.timers, name, Timer)
+
+    def counter(self, name):
+        """The Counter called name, registered on first use."""
+        return self._find(self.counters, name, Counter)
+
+    def gauge(self, name):
+        """The gauge called name, a Counter that set() writes, registered on first use."""
+        return self._find(self.gauges, name, Counter)
+
+    def start(self):
+        return ticks_us() if self.enabled else None
+
+    def stop(self, timer, started):
+        if started is not None:
+            timer.add(ticks_diff(ticks_us(), started))
+
+    def record(self, timer, elapsed_us):
+        """Add a duration that was measured anyway, such as a stream refill."""
+        if self.enabled:
+            timer.add(elapsed_us)
+
+    def increment(self, counter, amount=1):
+        if self.enabled:
+            counter.value += amount
+
+    def set(self, gauge, value):
+        gauge.value = value
+
+    def reset_memory(self):
+        self.free = UNKNOWN
+        self.min_free = UNKNOWN
+        self.allocated = UNKNOWN
+        self.collections = 0
+        self._last_allocated = None
+        self._gc_stats_base = self._gc_stats_total()
+
+    def _gc_stats_total(self):
+        # CPython counts its collections; MicroPython has no such statistic
+        get_stats = getattr(gc, "get_stats", None)
+        if get_stats is None:
+            return None
+        return sum(generation["collections"] for generation in get_stats())
+
+    def sample_memory(self):
+        free = free_heap()
+        if free is not None:
+            self.free = free
+            if self.min_free == UNKNOWN or free < self.min_free:
+                self.min_free = free
+        allocated = allocated_heap()
+        if allocated is not None:
+            if self._last_allocated is not None and allocated < self._last_allocated:
+                self.collections += 1
+            self._last_allocated = allocated
+            self.allocated = allocated
+        elif self._gc_stats_base is not None:
+            self.collections = self._gc_stats_total() - self._gc_stats_base
+
+    def reset(self):
+        for item in self.timers + self.counters:
+            item.reset()
+        self.reset_memory()
+
+    def lines(self):
+        for timer in self.timers:
+            yield "T {} {} {} {} {}".format(
+                timer.name, timer.count, timer.min_us, timer.mean_us(), timer.max_us
+            )
+        for counter in self.counters + self.gauges:
+            yield "C {} {}".format(counter.name, counter.value)
+        yield "M {} {} {} {}".format(
+            self.free, self.min_free, self.allocated, self.collections
+        )
+        yield "E"
+
+    def dump(self, write=print):
+        self.sample_memory()
+        for line in self.lines():
+            write(line)
+
+
+telemetry = Telemetry()
+
+
+class SerialConsole:
+    """Reads commands from the USB serial port without blocking.
+
+    Commands, one per line: "stats" dumps the telemetry, "reset" clears it,
+    and "on" and "off" enable and disable it. poll() also samples the heap
+    while telemetry is enabled.
+    """
+
+    def __init__(self, telemetry=telemetry, stream=None, write=print):
+        self.telemetry = telemetry
+        stream = stream if stream is not None else sys.stdin
+        # Read bytes below any buffering, or buffered input would sit unseen
+        # while poll() reports nothing left to read
+        reader = getattr(stream, "buffer", stream)
+        self.reader = getattr(reader, "raw", reader)
+        self.write = write
+        self.poller = select.poll()
+        self.poller.register(stream, select.POLLIN)
+        self.line = bytearray()
+
+    def poll(self):
+        if self.telemetry.enabled:
+            self.telemetry.sample_memory()
+        while self.poller.poll(0):
+            data = self.reader.read(1)
+            if not data:
+                break
+            if data[0] in END_OF_LINE:
+                if self.line:
+                    self.execute(self.line.decode().strip())
+                    self.line = bytearray()
+            else:
+                self.line.append(data[0])
+
+    def execute(self, command):
+        if command == "stats":
+            self.telemetry.dump(self.write)
+        elif command == "reset":
+            self.telemetry.reset()
+            self.write("E")
+        elif command in ("on", "off"):
+            self.telemetry.enabled = command == "on"
+            self.write("E")
+        else:
+            self.write("? " + command)
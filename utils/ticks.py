@@ -0,0 +1,20 @@
+try:
+    from utime import sleep_ms, ticks_add, ticks_diff, ticks_ms, ticks_us
+except ImportError:
+    # CPython, for checks and benchmarks on a host
+    import time
+
+    def ticks_ms():
+        return time.monotonic_ns() // 1_000_000
+
+    def ticks_us():
+        return time.monotonic_ns() // 1_000
+
+    def ticks_add(ticks, delta):
+        return ticks + delta
+
+    def ticks_diff(end, start):
+        return end - start
+
+    def sleep_ms(duration):
+        time.sleep(duration / 1000)